@@ -9,7 +9,21 @@ from flask import (
     abort,
 )
 from functools import wraps
-from utils.database import execute_query, call_stored_procedure, User
+from utils.database import execute_query, execute_batch, call_stored_procedure, User
+from utils.pagination import keyset_paginate
+from utils.inventory import get_inventory
+from utils.dashboard import get_dashboard_summary
+from utils.images import get_image_pipeline
+from utils.users import get_user_cache, session_user_active
+from utils.contacts import get_contact_index
+from utils.passwords import HasherBusy
+from utils.bulk import (
+    ESTADOS,
+    deactivate_clients,
+    import_vehicles,
+    parse_ids,
+    set_vehicles_status,
+)
 
 # Blueprint único para admin
 admin_bp = Blueprint("admin", __name__)
@@ -24,6 +38,11 @@ def admin_required(f):
         if not session.get("es_administrador"):
             flash("Acceso restringido a administradores.", "danger")
             return redirect(url_for("auth.login"))
+        # Registro cacheado (utils.users): desactivado o sin rol de admin -> fuera
+        if not session_user_active(is_admin=True):
+            session.clear()
+            flash("Tu cuenta ya no tiene acceso de administrador.", "warning")
+            return redirect(url_for("auth.login"))
         return f(*args, **kwargs)
 
     return wrapper
@@ -35,84 +54,9 @@ def admin_required(f):
 @admin_bp.route("/dashboard")
 @admin_required
 def dashboard():
-    stats = {}
-
-    # Conteos básicos
-    stats["vehiculos"] = execute_query(
-        "SELECT COUNT(*) AS total FROM Vehiculos"
-    )[0]["total"]
-
-    stats["clientes"] = execute_query(
-        "SELECT COUNT(*) AS total FROM Clientes WHERE activo = 1"
-    )[0]["total"]
-
-    stats["ventas"] = execute_query(
-        "SELECT COUNT(*) AS total FROM Ventas"
-    )[0]["total"]
-
-    # Ingresos totales (puede ser NULL si no hay ventas)
-    row_ingresos = execute_query(
-        "SELECT SUM(total_venta) AS total FROM Ventas"
-    )[0]
-    stats["total_ingresos"] = row_ingresos["total"] or 0
-
-    # Ventas recientes para la tabla
-    ventas_recientes = execute_query(
-        """
-        SELECT TOP 10
-            v.venta_id,
-            v.fecha_venta,
-            v.total_venta,
-            v.metodo_pago,
-            v.estado_venta,
-            c.nombre_completo AS cliente,
-            e.nombre_completo AS empleado
-        FROM Ventas v
-        JOIN Clientes c ON v.cliente_id = c.cliente_id
-        JOIN Empleados e ON v.empleado_id = e.empleado_id
-        ORDER BY v.fecha_venta DESC
-        """
-    )
-
-    # Datos agregados para Chart.js: ventas por mes (últimos 12 meses)
-    ventas_por_mes = execute_query(
-        """
-        SELECT
-            FORMAT(v.fecha_venta, 'yyyy-MM') AS periodo,
-            SUM(v.total_venta) AS total
-        FROM Ventas v
-        GROUP BY FORMAT(v.fecha_venta, 'yyyy-MM')
-        ORDER BY periodo
-        """
-    )
-    ventas_por_mes_labels = [row["periodo"] for row in ventas_por_mes]
-    ventas_por_mes_valores = [float(row["total"]) for row in ventas_por_mes]
-
-    # Top 5 modelos vendidos
-    top_modelos = execute_query(
-        """
-        SELECT TOP 5
-            CONCAT(ve.marca, ' ', ve.modelo, ' ', ve.anio) AS etiqueta,
-            COUNT(*) AS unidades
-        FROM Ventas v
-        JOIN Detalle_Ventas dv ON v.venta_id = dv.venta_id
-        JOIN Vehiculos ve      ON dv.vehiculo_id = ve.vehiculo_id
-        GROUP BY ve.marca, ve.modelo, ve.anio
-        ORDER BY unidades DESC
-        """
-    )
-    top_modelos_labels = [row["etiqueta"] for row in top_modelos]
-    top_modelos_valores = [int(row["unidades"]) for row in top_modelos]
-
-    return render_template(
-        "admin/dashboard.html",
-        stats=stats,
-        ventas_recientes=ventas_recientes,
-        ventas_por_mes_labels=ventas_por_mes_labels,
-        ventas_por_mes_valores=ventas_por_mes_valores,
-        top_modelos_labels=top_modelos_labels,
-        top_modelos_valores=top_modelos_valores,
-    )
+    # KPIs, gráficas y ventas recientes desde el resumen materializado
+    datos = get_dashboard_summary().snapshot()
+    return render_template("admin/dashboard.html", **datos)
 
 # ============================
 # CRUD VEHÍCULOS
@@ -120,15 +64,66 @@ def dashboard():
 @admin_bp.route("/vehiculos")
 @admin_required
 def vehiculos_list():
-    vehiculos = execute_query(
+    pagina = keyset_paginate(
         """
         SELECT vehiculo_id, marca, modelo, anio, precio, color, tipo,
-               estado_disponibilidad, fecha_ingreso
+               estado_disponibilidad, imagen_url, fecha_ingreso
         FROM Vehiculos
-        ORDER BY fecha_ingreso DESC, vehiculo_id DESC
-    """
+    """,
+        keys=("fecha_ingreso", "vehiculo_id"),
+    )
+    return render_template(
+        "admin/vehiculos/list.html", vehiculos=pagina.items, pagina=pagina,
+        estados=[e for e in ESTADOS if e != "Vendido"],
     )
-    return render_template("admin/vehiculos/list.html", vehiculos=vehiculos)
+
+
+@admin_bp.route("/vehiculos/importar", methods=["GET", "POST"])
+@admin_required
+def vehiculos_importar():
+    # Alta masiva desde CSV/JSON (ver utils.bulk); muestra el reporte por fila
+    reporte = None
+    if request.method == "POST":
+        archivo = request.files.get("archivo")
+        if not archivo or not archivo.filename:
+            flash("Selecciona un archivo CSV o JSON.", "danger")
+            return redirect(url_for("admin.vehiculos_importar"))
+        try:
+            reporte = import_vehicles(archivo.stream, archivo.filename)
+        except ValueError as e:
+            flash(str(e), "danger")
+            return redirect(url_for("admin.vehiculos_importar"))
+
+        categoria = "success" if not reporte.rejected else (
+            "warning" if reporte.inserted else "danger"
+        )
+        flash(
+            f"{reporte.inserted} vehículos importados, {reporte.rejected} filas rechazadas.",
+            categoria,
+        )
+
+    return render_template("admin/vehiculos/importar.html", reporte=reporte)
+
+
+@admin_bp.route("/vehiculos/estado", methods=["POST"])
+@admin_required
+def vehiculos_estado_masivo():
+    # Un solo UPDATE para todos los vehículos seleccionados
+    try:
+        ids = parse_ids(request.form.getlist("ids"))
+        cambiados = set_vehicles_status(ids, request.form.get("estado"))
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("admin.vehiculos_list"))
+
+    if not ids:
+        flash("No seleccionaste vehículos.", "warning")
+        return redirect(url_for("admin.vehiculos_list"))
+
+    get_inventory().vehicles_changed(ids)
+    get_dashboard_summary().invalidate()
+    flash(f"Estado actualizado en {cambiados} vehículos.", "success")
+    return redirect(url_for("admin.vehiculos_list"))
 
 
 @admin_bp.route("/vehiculos/nuevo", methods=["GET", "POST"])
@@ -163,6 +158,9 @@ def vehiculos_nuevo():
             (marca, modelo, anio, precio, color, tipo, estado, descripcion, imagen_url),
             fetch=False,
         )
+        get_inventory().vehicles_added()
+        get_dashboard_summary().invalidate()
+        get_image_pipeline().schedule(imagen_url)
 
         flash("Vehículo creado correctamente.", "success")
         return redirect(url_for("admin.vehiculos_list"))
@@ -214,6 +212,9 @@ def vehiculos_editar(vehiculo_id):
             ),
             fetch=False,
         )
+        get_inventory().vehicle_changed(vehiculo_id)
+        get_dashboard_summary().invalidate()
+        get_image_pipeline().schedule(imagen_url)
 
         flash("Vehículo actualizado correctamente.", "success")
         return redirect(url_for("admin.vehiculos_list"))
@@ -239,6 +240,8 @@ def vehiculos_eliminar(vehiculo_id):
             (vehiculo_id,),
             fetch=False,
         )
+        get_inventory().vehicle_removed(vehiculo_id)
+        get_dashboard_summary().invalidate()
         flash("Vehículo eliminado correctamente.", "success")
     except Exception as e:
         # En caso de FK (vehículo con ventas)
@@ -252,16 +255,40 @@ def vehiculos_eliminar(vehiculo_id):
 @admin_bp.route("/clientes")
 @admin_required
 def clientes_list():
-    clientes = execute_query(
+    pagina = keyset_paginate(
         """
         SELECT cliente_id, nombre_completo, email, telefono,
                direccion, tipo_documento, numero_documento,
                activo, fecha_registro
         FROM Clientes
-        ORDER BY cliente_id DESC
-    """
+    """,
+        keys=("cliente_id",),
+    )
+    return render_template(
+        "admin/clientes/list.html", clientes=pagina.items, pagina=pagina
     )
-    return render_template("admin/clientes/list.html", clientes=clientes)
+
+
+@admin_bp.route("/clientes/desactivar", methods=["POST"])
+@admin_required
+def clientes_desactivar_masivo():
+    # Baja lógica de todos los seleccionados en un solo UPDATE
+    try:
+        ids = parse_ids(request.form.getlist("ids"))
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for("admin.clientes_list"))
+
+    if not ids:
+        flash("No seleccionaste clientes.", "warning")
+        return redirect(url_for("admin.clientes_list"))
+
+    cambiados = deactivate_clients(ids)
+    get_dashboard_summary().invalidate()
+    get_user_cache().invalidate_many(False, ids)
+
+    flash(f"{cambiados} clientes desactivados.", "info")
+    return redirect(url_for("admin.clientes_list"))
 
 
 @admin_bp.route("/clientes/nuevo", methods=["GET", "POST"])
@@ -282,7 +309,13 @@ def clientes_nuevo():
                 "admin/clientes/form.html", modo="nuevo", cliente=request.form
             )
 
-        password_hash = User.hash_password(password)
+        try:
+            password_hash = User.hash_password(password)
+        except HasherBusy:
+            flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+            return render_template(
+                "admin/clientes/form.html", modo="nuevo", cliente=request.form
+            ), 503
 
         execute_query(
             """
@@ -294,6 +327,8 @@ def clientes_nuevo():
             (nombre, email, telefono, direccion, tipo_doc, num_doc, password_hash),
             fetch=False,
         )
+        get_dashboard_summary().invalidate()
+        get_contact_index().add(email, telefono)
 
         flash("Cliente creado correctamente.", "success")
         return redirect(url_for("admin.clientes_list"))
@@ -318,6 +353,18 @@ def clientes_editar(cliente_id):
             flash("Nombre y email son obligatorios.", "danger")
             return redirect(url_for("admin.clientes_editar", cliente_id=cliente_id))
 
+        # El hash va antes de cualquier UPDATE: si el pool está saturado no se guarda nada
+        password_hash = None
+        if password:
+            try:
+                password_hash = User.hash_password(password)
+            except HasherBusy:
+                flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+                return render_template(
+                    "admin/clientes/form.html", modo="editar",
+                    cliente=dict(request.form, activo=activo),
+                ), 503
+
         execute_query(
             """
             UPDATE Clientes
@@ -328,9 +375,9 @@ def clientes_editar(cliente_id):
             (nombre, email, telefono, direccion, tipo_doc, num_doc, activo, cliente_id),
             fetch=False,
         )
+        get_dashboard_summary().invalidate()
 
-        if password:
-            password_hash = User.hash_password(password)
+        if password_hash:
             execute_query(
                 """
                 UPDATE Clientes
@@ -341,6 +388,9 @@ def clientes_editar(cliente_id):
                 fetch=False,
             )
 
+        get_user_cache().invalidate(False, cliente_id)
+        get_contact_index().add(email, telefono)
+
         flash("Cliente actualizado correctamente.", "success")
         return redirect(url_for("admin.clientes_list"))
 
@@ -367,6 +417,8 @@ def clientes_eliminar(cliente_id):
         (cliente_id,),
         fetch=False,
     )
+    get_dashboard_summary().invalidate()
+    get_user_cache().invalidate(False, cliente_id)
 
     flash("Cliente desactivado correctamente.", "info")
     return redirect(url_for("admin.clientes_list"))
@@ -378,15 +430,17 @@ def clientes_eliminar(cliente_id):
 @admin_bp.route("/empleados")
 @admin_required
 def empleados_list():
-    empleados = execute_query(
+    pagina = keyset_paginate(
         """
         SELECT empleado_id, nombre_completo, email, puesto,
                es_administrador, activo, fecha_contratacion
         FROM Empleados
-        ORDER BY empleado_id DESC
-    """
+    """,
+        keys=("empleado_id",),
+    )
+    return render_template(
+        "admin/empleados/list.html", empleados=pagina.items, pagina=pagina
     )
-    return render_template("admin/empleados/list.html", empleados=empleados)
 
 
 @admin_bp.route("/empleados/nuevo", methods=["GET", "POST"])
@@ -405,7 +459,14 @@ def empleados_nuevo():
                 "admin/empleados/form.html", modo="nuevo", empleado=request.form
             )
 
-        password_hash = User.hash_password(password)
+        try:
+            password_hash = User.hash_password(password)
+        except HasherBusy:
+            flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+            return render_template(
+                "admin/empleados/form.html", modo="nuevo",
+                empleado=dict(request.form, es_administrador=es_admin),
+            ), 503
 
         execute_query(
             """
@@ -441,6 +502,18 @@ def empleados_editar(empleado_id):
                 url_for("admin.empleados_editar", empleado_id=empleado_id)
             )
 
+        # El hash va antes de cualquier UPDATE: si el pool está saturado no se guarda nada
+        password_hash = None
+        if password:
+            try:
+                password_hash = User.hash_password(password)
+            except HasherBusy:
+                flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+                return render_template(
+                    "admin/empleados/form.html", modo="editar",
+                    empleado=dict(request.form, activo=activo, es_administrador=es_admin),
+                ), 503
+
         execute_query(
             """
             UPDATE Empleados
@@ -452,8 +525,7 @@ def empleados_editar(empleado_id):
             fetch=False,
         )
 
-        if password:
-            password_hash = User.hash_password(password)
+        if password_hash:
             execute_query(
                 """
                 UPDATE Empleados
@@ -464,6 +536,8 @@ def empleados_editar(empleado_id):
                 fetch=False,
             )
 
+        get_user_cache().invalidate(True, empleado_id)
+
         flash("Empleado actualizado correctamente.", "success")
         return redirect(url_for("admin.empleados_list"))
 
@@ -499,6 +573,7 @@ def empleados_eliminar(empleado_id):
         (empleado_id,),
         fetch=False,
     )
+    get_user_cache().invalidate(True, empleado_id)
 
     flash("Empleado desactivado correctamente.", "info")
     return redirect(url_for("admin.empleados_list"))
@@ -510,7 +585,8 @@ def empleados_eliminar(empleado_id):
 @admin_bp.route("/ventas")
 @admin_required
 def ventas_list():
-    ventas = execute_query(
+    # venta_id desempata ventas con la misma fecha
+    pagina = keyset_paginate(
         """
         SELECT 
             v.venta_id,
@@ -523,48 +599,63 @@ def ventas_list():
         FROM Ventas v
         JOIN Clientes c ON v.cliente_id = c.cliente_id
         JOIN Empleados e ON v.empleado_id = e.empleado_id
-        ORDER BY v.fecha_venta DESC
-    """
+    """,
+        keys=("fecha_venta", "venta_id"),
     )
-    return render_template("admin/ventas/list.html", ventas=ventas)
+    return render_template("admin/ventas/list.html", ventas=pagina.items, pagina=pagina)
 
 
 @admin_bp.route("/ventas/<int:venta_id>")
 @admin_required
 def ventas_detail(venta_id):
-    rows = execute_query(
-        """
-        SELECT TOP 1
-            v.venta_id,
-            v.fecha_venta,
-            v.total_venta,
-            v.metodo_pago,
-            v.estado_venta,
-            c.nombre_completo AS cliente,
-            c.email           AS cliente_email,
-            e.nombre_completo AS empleado,
-            e.email           AS empleado_email,
-            ve.marca,
-            ve.modelo,
-            ve.anio,
-            ve.color,
-            ve.tipo
-        FROM Ventas v
-        JOIN Detalle_Ventas dv ON v.venta_id = dv.venta_id
-        JOIN Vehiculos ve      ON dv.vehiculo_id = ve.vehiculo_id
-        JOIN Clientes c        ON v.cliente_id = c.cliente_id
-        JOIN Empleados e       ON v.empleado_id = e.empleado_id
-        WHERE v.venta_id = ?
-    """,
-        (venta_id,),
+    # Encabezado de la venta y sus vehículos en un solo viaje
+    encabezado, vehiculos = execute_batch(
+        [
+            (
+                """
+                SELECT
+                    v.venta_id,
+                    v.fecha_venta,
+                    v.total_venta,
+                    v.metodo_pago,
+                    v.estado_venta,
+                    c.nombre_completo AS cliente,
+                    c.email           AS cliente_email,
+                    e.nombre_completo AS empleado,
+                    e.email           AS empleado_email
+                FROM Ventas v
+                JOIN Clientes c        ON v.cliente_id = c.cliente_id
+                JOIN Empleados e       ON v.empleado_id = e.empleado_id
+                WHERE v.venta_id = ?
+                """,
+                (venta_id,),
+            ),
+            (
+                """
+                SELECT
+                    ve.vehiculo_id,
+                    ve.marca,
+                    ve.modelo,
+                    ve.anio,
+                    ve.color,
+                    ve.tipo
+                FROM Detalle_Ventas dv
+                JOIN Vehiculos ve      ON dv.vehiculo_id = ve.vehiculo_id
+                WHERE dv.venta_id = ?
+                """,
+                (venta_id,),
+            ),
+        ]
     )
 
-    if not rows:
+    if not encabezado:
         flash("Venta no encontrada.", "warning")
         return redirect(url_for("admin.ventas_list"))
 
-    venta = rows[0]
-    return render_template("admin/ventas/detail.html", venta=venta)
+    venta = encabezado[0]
+    return render_template(
+        "admin/ventas/details.html", venta=venta, vehiculos=vehiculos
+    )
 
 
 @admin_bp.route("/ventas/<int:venta_id>/cancelar", methods=["POST"])
@@ -572,6 +663,8 @@ def ventas_detail(venta_id):
 def ventas_cancelar(venta_id):
     try:
         call_stored_procedure("sp_CancelarVenta", [venta_id])
+        get_inventory().sale_changed(venta_id)
+        get_dashboard_summary().invalidate()
         flash(f"Venta #{venta_id} cancelada correctamente.", "success")
     except Exception as e:
         flash(f"Error al cancelar la venta: {e}", "danger")
@@ -4,22 +4,41 @@ import logging
 from flask import Flask, render_template, session, redirect, url_for, flash
 from dotenv import load_dotenv
 from config import Config
-from utils.database import init_app as init_database, execute_query
+from utils.database import init_app as init_database
+from utils.passwords import init_app as init_passwords
+from utils.ratelimit import init_app as init_ratelimit
+from utils.users import init_app as init_users
+from utils.contacts import init_app as init_contacts
+from utils.bulk import init_app as init_bulk
+from utils.shared_cache import init_app as init_shared_cache
+from utils.inventory import init_app as init_inventory
+from utils.dashboard import init_app as init_dashboard
+from utils.audit import init_app as init_audit, record_error
+from utils.instrumentation import init_app as init_instrumentation
+from utils.metrics import init_app as init_metrics
+from utils.images import init_app as init_images
+from utils.assets import init_app as init_assets
+from utils.http import init_app as init_http
+from utils.fragments import init_app as init_fragments
+from utils.health import init_app as init_health, check_audit_tables
 from auth.routes import auth_bp
 from admin.routes import admin_bp
 from client.routes import client_bp
+from client.purchases import init_app as init_purchases
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def create_app():
+def create_app(config_overrides=None):
     # Cargar variables de entorno desde .env
     load_dotenv()
 
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config_overrides:
+        app.config.update(config_overrides)
 
     # Asegurar que exista SECRET_KEY (por si Config no la puso)
     if not app.config.get("SECRET_KEY"):
@@ -27,6 +46,23 @@ def create_app():
 
     # Inicializar SQL Server
     init_database(app)
+    init_passwords(app)
+    init_health(app)
+    init_audit(app)
+    init_instrumentation(app)
+    init_shared_cache(app)
+    init_ratelimit(app)
+    init_users(app)
+    init_contacts(app)
+    init_inventory(app)
+    init_dashboard(app)
+    init_purchases(app)
+    init_images(app)
+    init_bulk(app)
+    init_assets(app)
+    init_http(app)
+    init_fragments(app)
+    init_metrics(app)
 
     # Registrar blueprints
     app.register_blueprint(auth_bp, url_prefix="/auth")
@@ -74,39 +110,24 @@ def create_app():
 
     @app.errorhandler(500)
     def internal_error(error):
-        # Registrar error en auditoría
-        try:
-            execute_query(
-                """
-                INSERT INTO Auditoria_Errores (procedimiento, mensaje_error, usuario)
-                VALUES (?, ?, ?)
-            """,
-                ("app.internal_error", str(error), session.get("user_name", "Anónimo")),
-            )
-        except Exception:
-            # No romper la app si falla el log en BD
-            pass
+        # Registrar error en auditoría (encolado; no toca la BD en la petición)
+        record_error(
+            "app.internal_error", error, usuario=session.get("user_name", "Anónimo")
+        )
         return render_template("errors/500.html"), 500
 
     return app
 
 
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py wsgi:app
     app = create_app()
 
     # Verificar estructura de base de datos
     with app.app_context():
         try:
-            # Verificar que las tablas de auditoría existan
-            tables = execute_query(
-                """
-                SELECT TABLE_NAME 
-                FROM INFORMATION_SCHEMA.TABLES 
-                WHERE TABLE_NAME IN ('Auditoria_Ventas', 'Auditoria_Vehiculos', 'Auditoria_Errores')
-            """
-            )
-
-            if len(tables) == 3:
+            faltan = check_audit_tables()
+            if not faltan:
                 logger.info("✅ Todas las tablas de auditoría presentes")
             else:
                 logger.warning("⚠️ Algunas tablas de auditoría faltan")
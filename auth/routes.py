@@ -1,8 +1,10 @@
+import math
 import re
 
 # auth/routes.py
 from flask import (
     Blueprint,
+    make_response,
     render_template,
     request,
     redirect,
@@ -10,7 +12,10 @@ from flask import (
     session,
     flash,
 )
-from utils.database import execute_query  # Asegúrate de que existe esta función
+from utils.database import User
+from utils.contacts import register_client
+from utils.passwords import HasherBusy
+from utils.ratelimit import client_ip, get_login_limiter
 
 auth_bp = Blueprint("auth", __name__)  # nombre = 'auth'
 def is_strong_password(pwd: str) -> bool:
@@ -42,68 +47,34 @@ def login():
             flash("Por favor completa todos los campos.", "danger")
             return render_template("auth/login.html")
 
+        # Límite de intentos por IP y por email, antes de tocar SQL o hashes
+        limiter = get_login_limiter()
+        if limiter is not None:
+            admitido, espera = limiter.hit(ip=client_ip(), email=email)
+            if not admitido:
+                flash("Demasiados intentos de inicio de sesión. Espera un momento e intenta de nuevo.", "warning")
+                response = make_response(render_template("auth/login.html"), 429)
+                response.headers["Retry-After"] = str(math.ceil(espera))
+                return response
+
         # =====================================================================
         # AUTENTICACIÓN CONTRA SQL SERVER
-        # Para este proyecto se asume que:
-        # - En Empleados.password_hash y Clientes.password_hash está guardada
-        #   la contraseña tal cual se debe escribir en el login (plaintext),
-        #   por ejemplo: 'hashed_password_123'.
+        # User.authenticate compara la contraseña con password_hash en el
+        # pool de utils.passwords (no en este hilo). Las contraseñas
+        # heredadas en texto plano se aceptan y se migran a hash.
         # =====================================================================
+        try:
+            user = User.authenticate(email, password, is_admin=user_type == "admin")
+        except HasherBusy:
+            flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+            return render_template("auth/login.html"), 503
 
-        if user_type == "admin":
-            query = """
-                SELECT 
-                    empleado_id AS id,
-                    nombre_completo,
-                    email,
-                    puesto,
-                    es_administrador
-                FROM Empleados
-                WHERE email = ? 
-                  AND password_hash = ?
-                  AND activo = 1
-                  AND es_administrador = 1;
-            """
-        else:
-            query = """
-                SELECT 
-                    cliente_id AS id,
-                    nombre_completo,
-                    email
-                FROM Clientes
-                WHERE email = ?
-                  AND password_hash = ?
-                  AND activo = 1;
-            """
-
-        rows = execute_query(query, (email, password), fetch=True)
-
-        if not rows:
+        if not user:
             flash("Credenciales incorrectas o usuario inactivo.", "danger")
             return render_template("auth/login.html")
 
-        # Normalizar el resultado tanto si viene como dict como si viene como tupla
-        row = rows[0]
-
-        def get_val(r, idx, key):
-            try:
-                return r[key]
-            except (TypeError, KeyError, AttributeError):
-                return r[idx]
-
-        if user_type == "admin":
-            user = {
-                "id": get_val(row, 0, "id"),
-                "nombre_completo": get_val(row, 1, "nombre_completo"),
-                "email": get_val(row, 2, "email"),
-                "puesto": get_val(row, 3, "puesto"),
-            }
-        else:
-            user = {
-                "id": get_val(row, 0, "id"),
-                "nombre_completo": get_val(row, 1, "nombre_completo"),
-                "email": get_val(row, 2, "email"),
-            }
+        if limiter is not None:
+            limiter.reset("email", email)
 
         # =====================================================================
         # SESIÓN
@@ -156,43 +127,31 @@ def register():
             return render_template("auth/register.html")
 
         try:
-            # 3) Verificar si ya existe el correo
-            query_email = "SELECT 1 AS existe FROM Clientes WHERE email = ?;"
-            rows_email = execute_query(query_email, (email,), fetch=True)
-            if rows_email:
-                flash("Ya existe una cuenta registrada con ese correo.", "warning")
-                return render_template("auth/register.html")
-
-            # 4) Verificar si ya existe el teléfono
-            query_tel = "SELECT 1 AS existe FROM Clientes WHERE telefono = ?;"
-            rows_tel = execute_query(query_tel, (telefono,), fetch=True)
-            if rows_tel:
-                flash("El teléfono ingresado ya está registrado en otra cuenta.", "warning")
-                return render_template("auth/register.html")
-
-            # 5) Manejo interno de documento (ya no se pide al usuario)
+            # 3) Manejo interno de documento (ya no se pide al usuario)
             #    Cumplimos con NOT NULL + UNIQUE(tipo_documento, numero_documento)
             tipo_documento = "AUTOGEN"
             numero_documento = f"TEL-{telefono}"
 
-            # 6) Insertar nuevo cliente
-            #    (Seguimos guardando password en texto plano en password_hash
-            #     para no cambiar la lógica de login todavía.)
-            insert_query = """
-                INSERT INTO Clientes 
-                    (nombre_completo, email, telefono, tipo_documento, 
-                     numero_documento, password_hash)
-                VALUES (?, ?, ?, ?, ?, ?);
-            """
-            execute_query(
-                insert_query,
-                (nombre, email, telefono, tipo_documento, numero_documento, password),
-                fetch=False,
+            # 4) Verificar correo/teléfono e insertar
+            #    (utils.contacts descarta sin consultar los que seguro no existen
+            #     y sólo calcula el hash si no hay duplicado)
+            _, conflicto = register_client(
+                nombre, email, telefono, tipo_documento, numero_documento,
+                lambda: User.hash_password(password),
             )
+            if conflicto == "email":
+                flash("Ya existe una cuenta registrada con ese correo.", "warning")
+                return render_template("auth/register.html")
+            if conflicto == "telefono":
+                flash("El teléfono ingresado ya está registrado en otra cuenta.", "warning")
+                return render_template("auth/register.html")
 
-            # 7) Mostrar pantalla de éxito con animación y luego redirigir a login
+            # 5) Mostrar pantalla de éxito con animación y luego redirigir a login
             return render_template("auth/register_success.html", nombre=nombre)
 
+        except HasherBusy:
+            flash("El servidor está ocupado, intenta de nuevo en unos segundos.", "warning")
+            return render_template("auth/register.html"), 503
         except Exception as e:
             flash(f"Error en el registro: {str(e)}", "danger")
 
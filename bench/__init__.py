@@ -0,0 +1 @@
+"""Benchmark y prueba de carga de la app contra un sustituto local de SQL Server."""
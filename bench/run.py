@@ -0,0 +1,358 @@
+"""
+Benchmark / prueba de carga de Rust-Eze.
+
+Levanta la app con ``create_app`` contra una base SQLite sintética (ver
+``bench/seed.py``) usando el sustituto de pyodbc de ``bench/standin.py``,
+y la ejercita con varios hilos de clientes de prueba de Flask: login,
+catálogo (HTML y JSON), dashboards, listados de administración y compra.
+
+Al final imprime, por endpoint, peticiones, errores, throughput y
+latencias p50/p95/p99, y opcionalmente compara contra una línea base.
+
+Uso:
+    python -m bench.run                          # escala small, 20 s, 8 hilos
+    python -m bench.run --scale full --duration 60
+    python -m bench.run --save-baseline          # guarda bench/baseline.json
+    python -m bench.run --baseline bench/baseline.json --tolerance 0.2
+
+Los números son relativos a la máquina y al sustituto SQLite: sirven para
+comparar versiones de la app entre sí, no para estimar SQL Server.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+from bench import standin
+from bench.seed import ADMIN_EMAIL, CLIENT_EMAIL_PATTERN, PASSWORD, SCALES, prepare_database
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BENCH_DIR, ".data")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+# (nombre, peso, rol) — el peso es la probabilidad relativa de cada flujo
+FLOWS = [
+    ("login_cliente", 4, "client"),
+    ("client_dashboard", 10, "client"),
+    ("catalogo", 20, "client"),
+    ("catalogo_filtrado", 15, "client"),
+    ("catalogo_api", 15, "client"),
+    ("comprar", 3, "client"),
+    ("login_admin", 2, "admin"),
+    ("admin_dashboard", 8, "admin"),
+    ("admin_vehiculos", 5, "admin"),
+    ("admin_clientes", 5, "admin"),
+    ("admin_empleados", 3, "admin"),
+    ("admin_ventas", 6, "admin"),
+    ("admin_venta_detalle", 4, "admin"),
+]
+
+# Con menos muestras que esto el p95 es ruido y no se compara
+MIN_SAMPLES = 20
+
+MARCAS = ["Toyota", "Nissan", "Honda", "Chevrolet", "Ford", "Volkswagen", "Mazda", "Kia"]
+ORDENES = ["recientes", "precio_asc", "precio_desc", "anio_desc", "marca"]
+
+
+# -------------------------------------------------------------------
+# App bajo prueba
+# -------------------------------------------------------------------
+def build_app(db_path):
+    """Crear la app apuntando a la base sintética."""
+    try:
+        import pyodbc  # noqa: F401
+    except ImportError:
+        # Sin driver ODBC: utils.database importa pyodbc, así que se usa
+        # el sustituto (mismo módulo que DB_CONNECT_FACTORY)
+        sys.modules["pyodbc"] = standin
+
+    from app import create_app
+
+    app = create_app(
+        {
+            "TESTING": True,
+            "DB_CONNECTION_STRING": db_path,
+            "DB_CONNECT_FACTORY": standin.connect,
+            "AUDIT_SPILL_PATH": os.path.join(DATA_DIR, "auditoria_errores.jsonl"),
+            # Todos los usuarios virtuales comparten la IP del cliente de
+            # pruebas: con el límite de login activo se mediría el limitador
+            "LOGIN_RATE_LIMIT_ENABLED": False,
+        }
+    )
+    return app
+
+
+# -------------------------------------------------------------------
+# Usuarios virtuales
+# -------------------------------------------------------------------
+class VirtualUser:
+    """Un hilo con su propio cliente de pruebas (y su cookie de sesión)."""
+
+    def __init__(self, app, rng, sizes, ids):
+        self.app = app
+        self.rng = rng
+        self.sizes = sizes
+        self.ids = ids
+        self.client_http = app.test_client()
+        self.admin_http = app.test_client()
+        self.cliente_num = rng.randint(1, sizes["clientes"])
+
+    def login(self, role):
+        if role == "admin":
+            email, http = ADMIN_EMAIL, self.admin_http
+        else:
+            email, http = CLIENT_EMAIL_PATTERN.format(self.cliente_num), self.client_http
+        return http.post(
+            "/auth/login",
+            data={"email": email, "password": PASSWORD, "user_type": role},
+        )
+
+    def request(self, flow):
+        rng = self.rng
+        if flow == "login_cliente":
+            return self.login("client"), 302
+        if flow == "login_admin":
+            return self.login("admin"), 302
+        if flow == "client_dashboard":
+            return self.client_http.get("/client/dashboard"), 200
+        if flow == "catalogo":
+            page = rng.randint(1, 5)
+            return self.client_http.get(f"/client/catalogo?page={page}"), 200
+        if flow == "catalogo_filtrado":
+            query = {
+                "marca": rng.choice(MARCAS),
+                "precio_max": rng.choice([300000, 500000, 800000]),
+                "orden": rng.choice(ORDENES),
+            }
+            return self.client_http.get("/client/catalogo", query_string=query), 200
+        if flow == "catalogo_api":
+            query = {"marca": rng.choice(MARCAS), "page": rng.randint(1, 3)}
+            return self.client_http.get("/client/api/catalogo", query_string=query), 200
+        if flow == "comprar":
+            vehiculo_id = rng.choice(self.ids["disponibles"])
+            return self.client_http.post(f"/client/comprar/{vehiculo_id}"), 302
+        if flow == "admin_dashboard":
+            return self.admin_http.get("/admin/dashboard"), 200
+        if flow == "admin_vehiculos":
+            return self.admin_http.get("/admin/vehiculos"), 200
+        if flow == "admin_clientes":
+            return self.admin_http.get("/admin/clientes"), 200
+        if flow == "admin_empleados":
+            return self.admin_http.get("/admin/empleados"), 200
+        if flow == "admin_ventas":
+            return self.admin_http.get("/admin/ventas"), 200
+        if flow == "admin_venta_detalle":
+            venta_id = rng.randint(1, self.sizes["ventas"])
+            return self.admin_http.get(f"/admin/ventas/{venta_id}"), 200
+        raise ValueError(flow)
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_load(app, duration, threads, warmup, sizes, seed=7):
+    """Ejecutar la carga y devolver {flujo: [latencias_ms], ...} y errores."""
+    with app.app_context():
+        from utils.database import execute_query
+
+        ids = {
+            "disponibles": [
+                r["vehiculo_id"]
+                for r in execute_query(
+                    "SELECT vehiculo_id FROM Vehiculos WHERE estado_disponibilidad = 'Disponible'"
+                )
+            ]
+        }
+
+    names = [f[0] for f in FLOWS]
+    weights = [f[1] for f in FLOWS]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    start_event = threading.Event()
+    stop_at = [0.0]
+    measure_from = [0.0]
+
+    def worker(n):
+        rng = random.Random(seed * 1000 + n)
+        user = VirtualUser(app, rng, sizes, ids)
+        user.login("client")
+        user.login("admin")
+        local = {name: [] for name in names}
+        local_errors = {name: 0 for name in names}
+        start_event.wait()
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at[0]:
+                break
+            flow = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            try:
+                response, expected = user.request(flow)
+                ok = response.status_code == expected
+                response.close()
+            except Exception:
+                ok = False
+            elapsed = (time.perf_counter() - t0) * 1000
+            if t0 < measure_from[0]:
+                continue  # calentamiento
+            local[flow].append(elapsed)
+            if not ok:
+                local_errors[flow] += 1
+        with lock:
+            for name in names:
+                latencies[name].extend(local[name])
+                errors[name] += local_errors[name]
+
+    workers = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(threads)]
+    for w in workers:
+        w.start()
+    inicio = time.perf_counter()
+    measure_from[0] = inicio + warmup
+    stop_at[0] = measure_from[0] + duration
+    start_event.set()
+    for w in workers:
+        w.join()
+    return latencies, errors
+
+
+def summarize(latencies, errors, duration):
+    """Resumen por endpoint (ms y peticiones/s)."""
+    results = {}
+    total = []
+    for name, values in latencies.items():
+        values = sorted(values)
+        total.extend(values)
+        results[name] = {
+            "requests": len(values),
+            "errors": errors[name],
+            "rps": round(len(values) / duration, 2),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "p99_ms": round(_percentile(values, 99), 2),
+        }
+    total.sort()
+    results["TOTAL"] = {
+        "requests": len(total),
+        "errors": sum(errors.values()),
+        "rps": round(len(total) / duration, 2),
+        "p50_ms": round(_percentile(total, 50), 2),
+        "p95_ms": round(_percentile(total, 95), 2),
+        "p99_ms": round(_percentile(total, 99), 2),
+    }
+    return results
+
+
+def print_report(results, baseline=None, tolerance=0.2):
+    """Imprimir la tabla de resultados; devuelve los endpoints con regresión."""
+    header = f"{'endpoint':<22}{'reqs':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'p95 base':>10}{'Δ p95':>9}"
+    print(header)
+    print("-" * len(header))
+
+    regresiones = []
+    for name, r in results.items():
+        line = (
+            f"{name:<22}{r['requests']:>8}{r['errors']:>6}{r['rps']:>9.1f}"
+            f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+        )
+        base = (baseline or {}).get(name)
+        if base and base.get("p95_ms"):
+            delta = r["p95_ms"] / base["p95_ms"] - 1
+            line += f"{base['p95_ms']:>10.2f}{delta:>+8.0%}"
+            if delta > tolerance and r["requests"] >= MIN_SAMPLES:
+                line += "  ⚠️"
+                regresiones.append(name)
+        print(line)
+    print("(latencias en ms)")
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de carga de Rust-Eze")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos medidos")
+    parser.add_argument("--warmup", type=float, default=3.0, help="segundos de calentamiento")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--fresh", action="store_true", help="regenerar la base sintética")
+    parser.add_argument("--baseline", help="JSON de línea base contra el que comparar")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE,
+                        help=f"guardar los resultados como línea base (por defecto {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="aumento máximo de p95 frente a la base antes de marcar regresión")
+    parser.add_argument("--output", help="guardar los resultados completos en este JSON")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    db_path = prepare_database(DATA_DIR, args.scale, fresh=args.fresh)
+    try:
+        app = build_app(db_path)
+        print(
+            f"🚗 Benchmark '{args.scale}': {args.threads} hilos, "
+            f"{args.warmup:.0f}s calentamiento + {args.duration:.0f}s medidos"
+        )
+        latencies, errors = run_load(
+            app, args.duration, args.threads, args.warmup, SCALES[args.scale]
+        )
+        with app.app_context():
+            pool_stats = app.extensions["sqlserver_pool"].stats()
+        app.extensions["audit_sink"].close()
+        app.extensions["sqlserver_pool"].close_all()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    results = summarize(latencies, errors, args.duration)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+    regresiones = print_report(results, baseline, args.tolerance)
+    print(
+        f"pool: {pool_stats['connections_opened']} conexiones abiertas, "
+        f"{pool_stats['checkouts']} préstamos, {pool_stats['waits']} esperas, "
+        f"{pool_stats['timeouts']} timeouts"
+    )
+
+    report = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "scale": args.scale,
+        "threads": args.threads,
+        "duration": args.duration,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pool": pool_stats,
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {path}")
+
+    if regresiones:
+        print(f"❌ Regresión de p95 en: {', '.join(regresiones)}")
+        return 1
+    if results["TOTAL"]["errors"]:
+        print(f"⚠️ {results['TOTAL']['errors']} peticiones con respuesta inesperada")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Esquema y datos sintéticos para el benchmark.
+
+Genera una agencia "realista" sobre SQLite con el mismo esquema que usan
+las rutas (Vehiculos, Clientes, Empleados, Ventas, Detalle_Ventas y las
+tablas de auditoría). Los datos son deterministas (semilla fija) para que
+las corridas sean comparables entre versiones.
+
+Escalas:
+    small  ->   ~500 vehículos disponibles,  2.000 clientes,  10.000 ventas
+    full   -> ~5.000 vehículos disponibles, 20.000 clientes, 200.000 ventas
+
+Cada venta tiene un vehículo vendido propio, así que la tabla Vehiculos
+contiene además un vehículo "Vendido" por venta.
+"""
+
+import os
+import random
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from config import Config
+
+SCALES = {
+    "small": {"disponibles": 500, "clientes": 2_000, "empleados": 20, "ventas": 10_000},
+    "full": {"disponibles": 5_000, "clientes": 20_000, "empleados": 60, "ventas": 200_000},
+}
+
+# Credenciales de los usuarios sintéticos. password_hash guarda un hash
+# PBKDF2 con las iteraciones configuradas (PASSWORD_HASH_ITERATIONS), como
+# los usuarios que crea la app: así el login no agenda un rehash.
+ADMIN_EMAIL = "admin@rusteze.test"
+CLIENT_EMAIL_PATTERN = "cliente{:05d}@rusteze.test"
+PASSWORD = "Bench#2024"
+
+SCHEMA = """
+CREATE TABLE Empleados (
+    empleado_id        INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_completo    TEXT NOT NULL,
+    email              TEXT NOT NULL UNIQUE,
+    puesto             TEXT,
+    password_hash      TEXT,
+    es_administrador   INTEGER NOT NULL DEFAULT 0,
+    activo             INTEGER NOT NULL DEFAULT 1,
+    fecha_contratacion DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Clientes (
+    cliente_id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    nombre_completo  TEXT NOT NULL,
+    email            TEXT NOT NULL UNIQUE,
+    telefono         TEXT,
+    direccion        TEXT,
+    tipo_documento   TEXT,
+    numero_documento TEXT,
+    password_hash    TEXT,
+    activo           INTEGER NOT NULL DEFAULT 1,
+    fecha_registro   DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Vehiculos (
+    vehiculo_id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    marca                 TEXT NOT NULL,
+    modelo                TEXT NOT NULL,
+    anio                  INTEGER NOT NULL,
+    precio                DECIMAL(12, 2) NOT NULL,
+    color                 TEXT,
+    tipo                  TEXT,
+    estado_disponibilidad TEXT NOT NULL DEFAULT 'Disponible',
+    descripcion           TEXT,
+    imagen_url            TEXT,
+    fecha_ingreso         DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Ventas (
+    venta_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    cliente_id   INTEGER NOT NULL REFERENCES Clientes (cliente_id),
+    empleado_id  INTEGER NOT NULL REFERENCES Empleados (empleado_id),
+    fecha_venta  DATETIME NOT NULL,
+    total_venta  DECIMAL(12, 2) NOT NULL,
+    metodo_pago  TEXT,
+    estado_venta TEXT NOT NULL DEFAULT 'Activa'
+);
+CREATE TABLE Detalle_Ventas (
+    detalle_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    venta_id        INTEGER NOT NULL REFERENCES Ventas (venta_id),
+    vehiculo_id     INTEGER NOT NULL REFERENCES Vehiculos (vehiculo_id),
+    precio_unitario DECIMAL(12, 2) NOT NULL
+);
+CREATE TABLE Auditoria_Errores (
+    error_id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    procedimiento TEXT,
+    mensaje_error TEXT,
+    numero_error  INTEGER,
+    usuario       TEXT,
+    fecha         DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Auditoria_Ventas (
+    auditoria_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    venta_id     INTEGER,
+    accion       TEXT,
+    fecha        DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE Auditoria_Vehiculos (
+    auditoria_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vehiculo_id  INTEGER,
+    accion       TEXT,
+    fecha        DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IX_Vehiculos_Estado ON Vehiculos (estado_disponibilidad, vehiculo_id);
+CREATE INDEX IX_Vehiculos_Ingreso ON Vehiculos (fecha_ingreso, vehiculo_id);
+CREATE INDEX IX_Ventas_Fecha ON Ventas (fecha_venta, venta_id);
+CREATE INDEX IX_Detalle_Venta ON Detalle_Ventas (venta_id);
+CREATE INDEX IX_Clientes_Telefono ON Clientes (telefono);
+"""
+
+MODELOS = {
+    "Toyota": ["Corolla", "Camry", "RAV4", "Hilux", "Yaris"],
+    "Nissan": ["Sentra", "Versa", "X-Trail", "Frontier", "Kicks"],
+    "Honda": ["Civic", "Accord", "CR-V", "HR-V", "Fit"],
+    "Chevrolet": ["Aveo", "Onix", "Tracker", "Silverado", "Cavalier"],
+    "Ford": ["Focus", "Mustang", "Escape", "Ranger", "Explorer"],
+    "Volkswagen": ["Jetta", "Vento", "Tiguan", "Polo", "Virtus"],
+    "Mazda": ["Mazda 2", "Mazda 3", "CX-3", "CX-5", "MX-5"],
+    "Kia": ["Rio", "Forte", "Sportage", "Seltos", "Soul"],
+}
+TIPOS = {
+    "Hilux": "Pickup", "Frontier": "Pickup", "Silverado": "Pickup", "Ranger": "Pickup",
+    "RAV4": "SUV", "X-Trail": "SUV", "Kicks": "SUV", "CR-V": "SUV", "HR-V": "SUV",
+    "Tracker": "SUV", "Escape": "SUV", "Explorer": "SUV", "Tiguan": "SUV",
+    "CX-3": "SUV", "CX-5": "SUV", "Sportage": "SUV", "Seltos": "SUV",
+    "Mustang": "Deportivo", "MX-5": "Deportivo",
+    "Yaris": "Hatchback", "Fit": "Hatchback", "Polo": "Hatchback", "Mazda 2": "Hatchback",
+    "Soul": "Hatchback", "Onix": "Hatchback",
+}
+COLORES = ["Blanco", "Negro", "Gris", "Plata", "Rojo", "Azul", "Verde", "Arena"]
+METODOS_PAGO = ["Tarjeta", "Efectivo", "Transferencia", "Crédito"]
+NOMBRES = ["Ana", "Luis", "María", "Carlos", "Sofía", "Jorge", "Lucía", "Miguel",
+           "Valeria", "Diego", "Camila", "Andrés", "Paula", "Raúl", "Elena", "Tomás"]
+APELLIDOS = ["García", "Martínez", "López", "Hernández", "González", "Pérez",
+             "Sánchez", "Ramírez", "Torres", "Flores", "Rivera", "Gómez"]
+
+
+def _vehiculo(rng, fecha, estado):
+    marca = rng.choice(list(MODELOS))
+    modelo = rng.choice(MODELOS[marca])
+    anio = rng.randint(2012, 2025)
+    precio = round(rng.uniform(120_000, 950_000), 2)
+    color = rng.choice(COLORES)
+    descripcion = (
+        f"{marca} {modelo} {anio} color {color.lower()}, "
+        f"{rng.randint(5, 180) * 1000} km, un solo dueño, mantenimiento en agencia. "
+    ) * 2
+    return (
+        marca, modelo, anio, precio, color, TIPOS.get(modelo, "Sedán"), estado,
+        descripcion, f"/static/img/vehiculos/{marca.lower()}-{rng.randint(1, 12)}.jpg", fecha,
+    )
+
+
+def create_database(path, scale="small", seed=2024, iterations=None):
+    """Crear la base sintética en ``path`` (se sobrescribe si existe)."""
+    sizes = SCALES[scale]
+    rng = random.Random(seed)
+    inicio = datetime(2020, 1, 1)
+    dias = (datetime(2025, 6, 30) - inicio).days
+
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    # Un solo hash para todos: calcularlo por usuario tomaría minutos
+    iterations = iterations or Config.PASSWORD_HASH_ITERATIONS
+    password_hash = generate_password_hash(PASSWORD, method=f"pbkdf2:sha256:{iterations}")
+
+    empleados = [("Admin Benchmark", ADMIN_EMAIL, "Gerente", password_hash, 1, 1)]
+    for i in range(1, sizes["empleados"]):
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+        empleados.append((nombre, f"empleado{i:03d}@rusteze.test", "Vendedor", password_hash, 0, 1))
+    conn.executemany(
+        """
+        INSERT INTO Empleados (nombre_completo, email, puesto, password_hash, es_administrador, activo)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        empleados,
+    )
+
+    clientes = []
+    for i in range(1, sizes["clientes"] + 1):
+        nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        telefono = f"55{i:08d}"
+        clientes.append((
+            nombre, CLIENT_EMAIL_PATTERN.format(i), telefono,
+            f"Calle {rng.randint(1, 999)}, Col. Centro", "TEL", f"TEL-{telefono}",
+            password_hash, inicio + timedelta(days=rng.randrange(dias)),
+        ))
+    conn.executemany(
+        """
+        INSERT INTO Clientes (nombre_completo, email, telefono, direccion, tipo_documento,
+                              numero_documento, password_hash, fecha_registro)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        clientes,
+    )
+
+    insert_vehiculo = """
+        INSERT INTO Vehiculos (marca, modelo, anio, precio, color, tipo, estado_disponibilidad,
+                               descripcion, imagen_url, fecha_ingreso)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # Un vehículo vendido por venta, en orden cronológico
+    fechas = sorted(inicio + timedelta(minutes=rng.randrange(dias * 24 * 60))
+                    for _ in range(sizes["ventas"]))
+    vendidos, ventas, detalle = [], [], []
+    for venta_id, fecha in enumerate(fechas, start=1):
+        vehiculo = _vehiculo(rng, fecha - timedelta(days=rng.randint(5, 120)), "Vendido")
+        vendidos.append(vehiculo)
+        ventas.append((
+            rng.randint(1, sizes["clientes"]), rng.randint(1, sizes["empleados"]),
+            fecha, vehiculo[3], rng.choice(METODOS_PAGO),
+            "Cancelada" if rng.random() < 0.03 else "Activa",
+        ))
+        detalle.append((venta_id, venta_id, vehiculo[3]))
+    conn.executemany(insert_vehiculo, vendidos)
+    conn.executemany(
+        """
+        INSERT INTO Ventas (cliente_id, empleado_id, fecha_venta, total_venta, metodo_pago, estado_venta)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        ventas,
+    )
+    conn.executemany(
+        "INSERT INTO Detalle_Ventas (venta_id, vehiculo_id, precio_unitario) VALUES (?, ?, ?)",
+        detalle,
+    )
+
+    conn.executemany(
+        insert_vehiculo,
+        [
+            _vehiculo(rng, inicio + timedelta(days=dias - rng.randrange(365)), "Disponible")
+            for _ in range(sizes["disponibles"])
+        ],
+    )
+
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def prepare_database(workdir, scale="small", fresh=False, iterations=None):
+    """
+    Devolver la ruta de una copia lista para usar de la base sintética.
+
+    La base "plantilla" se genera una sola vez por escala en ``workdir``;
+    cada corrida trabaja sobre una copia para que las compras de una
+    corrida no afecten a la siguiente.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    # Una plantilla por costo de hash: cambiar PASSWORD_HASH_ITERATIONS la regenera
+    iterations = iterations or Config.PASSWORD_HASH_ITERATIONS
+    template = os.path.join(workdir, f"agencia-{scale}-pbkdf2-{iterations}.sqlite3")
+    if fresh or not os.path.exists(template):
+        inicio = time.perf_counter()
+        print(f"🛠️  Generando base sintética '{scale}' en {template}...")
+        create_database(template, scale, iterations=iterations)
+        print(f"   lista en {time.perf_counter() - inicio:.1f}s")
+
+    run_db = os.path.join(workdir, f"run-{scale}-{os.getpid()}.sqlite3")
+    shutil.copyfile(template, run_db)
+    return run_db
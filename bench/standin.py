@@ -0,0 +1,345 @@
+"""
+Sustituto local de SQL Server para el benchmark.
+
+Implementa el subconjunto de la API de pyodbc que usa la app (connect,
+cursor, execute/executemany, fetch*, nextset, commit/rollback, Error)
+sobre SQLite, traduciendo el T-SQL que emite la app (TOP, OFFSET/FETCH,
+DECLARE, LEFT, YEAR/MONTH, EXEC de los procedimientos almacenados...).
+No pretende ser un motor T-SQL completo: sólo lo necesario para correr
+las rutas de la app contra datos sintéticos sin un SQL Server real.
+"""
+
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+try:  # Si pyodbc está disponible, los errores deben poder capturarse como pyodbc.Error
+    from pyodbc import Error as _BaseError
+except ImportError:  # pragma: no cover - depende del entorno
+    _BaseError = Exception
+
+
+class Error(_BaseError):
+    """Error del sustituto (equivalente a pyodbc.Error)."""
+
+
+version = "standin-1.0"
+
+sqlite3.register_adapter(Decimal, float)
+sqlite3.register_adapter(datetime, lambda d: d.isoformat(" "))
+sqlite3.register_converter("DATETIME", lambda b: datetime.fromisoformat(b.decode()))
+sqlite3.register_converter("DECIMAL", lambda b: Decimal(b.decode()))
+
+
+# -------------------------------------------------------------------
+# Traducción T-SQL -> SQLite
+# -------------------------------------------------------------------
+_TOP = re.compile(r"^(\s*SELECT\s+(?:DISTINCT\s+)?)TOP\s*\(?\s*(\d+)\s*\)?", re.I)
+_OFFSET_FETCH = re.compile(
+    r"OFFSET\s+(\?|\d+)\s+ROWS\s+FETCH\s+NEXT\s+(\?|\d+)\s+ROWS\s+ONLY", re.I
+)
+_DECLARE = re.compile(r"^\s*DECLARE\s+@(\w+)\s+[\w()]+\s*=\s*(.+)$", re.I | re.S)
+_EXEC = re.compile(r"^\s*EXEC\s+(?:dbo\.)?(\w+)\s*(.*)$", re.I | re.S)
+_OUTPUT = re.compile(
+    r"\bOUTPUT\s+((?:INSERTED\.\w+\s*,\s*)*INSERTED\.\w+)\s+(VALUES|SELECT)", re.I
+)
+_REPLACEMENTS = [
+    (re.compile(r"\bLEFT\s*\(", re.I), "TSQL_LEFT("),
+    (re.compile(r"\bISNULL\s*\(", re.I), "IFNULL("),
+    (re.compile(r"@@VERSION", re.I), "('SQLite ' || sqlite_version() || ' (standin)')"),
+    (
+        re.compile(r"\bINFORMATION_SCHEMA\.TABLES\b", re.I),
+        "(SELECT name AS TABLE_NAME FROM sqlite_master WHERE type = 'table')",
+    ),
+    (re.compile(r"\bdbo\.", re.I), ""),
+    # SQLite daría afinidad numérica al CAST; las fechas ya son texto ISO
+    (re.compile(r"\bCAST\(\s*\?\s+AS\s+DATETIME\s*\)", re.I), "?"),
+    (re.compile(r"\bWITH\s*\(\s*(?:UPDLOCK|ROWLOCK|HOLDLOCK|NOLOCK|READPAST)(?:\s*,\s*\w+)*\s*\)", re.I), ""),
+]
+
+
+def _split_statements(sql):
+    """Separar un batch por ';' fuera de literales de texto."""
+    statements, current, in_quote = [], [], False
+    for ch in sql:
+        if ch == "'":
+            in_quote = not in_quote
+        if ch == ";" and not in_quote:
+            statements.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    statements.append("".join(current))
+    return [s for s in statements if s.strip()]
+
+
+def _literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def translate(sql, variables=None):
+    """Traducir una sentencia T-SQL al dialecto de SQLite."""
+    for name, value in (variables or {}).items():
+        sql = re.sub(rf"@{name}\b", _literal(value), sql)
+    for pattern, replacement in _REPLACEMENTS:
+        sql = pattern.sub(replacement, sql)
+
+    sql = _OFFSET_FETCH.sub(r"LIMIT \1, \2", sql)
+    output = _OUTPUT.search(sql)
+    if output:
+        columns = output.group(1).replace("INSERTED.", "").replace("inserted.", "")
+        sql = sql[: output.start()] + output.group(2) + sql[output.end():]
+        sql = sql.rstrip().rstrip(";") + f" RETURNING {columns}"
+    top = _TOP.match(sql)
+    if top:
+        sql = top.group(1) + sql[top.end():]
+        sql = sql.rstrip().rstrip(";") + f" LIMIT {top.group(2)}"
+    return sql
+
+
+def _year(value):
+    return None if value is None else int(str(value)[:4])
+
+
+def _month(value):
+    return None if value is None else int(str(value)[5:7])
+
+
+def _format(value, fmt):
+    if value is None:
+        return None
+    value = datetime.fromisoformat(str(value))
+    return value.strftime(fmt.replace("yyyy", "%Y").replace("MM", "%m").replace("dd", "%d"))
+
+
+def _concat(*args):
+    return "".join("" if a is None else str(a) for a in args)
+
+
+def _left(value, n):
+    return None if value is None else str(value)[: int(n)]
+
+
+def _getdate():
+    return datetime.now().isoformat(" ", timespec="seconds")
+
+
+def _to_decimal(row):
+    # SQL Server devuelve DECIMAL/MONEY como Decimal; aquí no hay columnas FLOAT
+    return tuple(Decimal(repr(v)) if isinstance(v, float) else v for v in row)
+
+
+# -------------------------------------------------------------------
+# Procedimientos almacenados
+# -------------------------------------------------------------------
+def _sp_registrar_venta(conn, cliente_id, empleado_id, vehiculo_id, metodo_pago):
+    row = conn.execute(
+        "SELECT precio, estado_disponibilidad FROM Vehiculos WHERE vehiculo_id = ?",
+        (vehiculo_id,),
+    ).fetchone()
+    if row is None or row[1] != "Disponible":
+        return ["resultado", "mensaje", "venta_id"], [("Error", "El vehículo no está disponible.", None)]
+
+    precio = row[0]
+    cur = conn.execute(
+        """
+        INSERT INTO Ventas (cliente_id, empleado_id, fecha_venta, total_venta, metodo_pago, estado_venta)
+        VALUES (?, ?, ?, ?, ?, 'Activa')
+        """,
+        (cliente_id, empleado_id, datetime.now(), precio, metodo_pago),
+    )
+    venta_id = cur.lastrowid
+    conn.execute(
+        "INSERT INTO Detalle_Ventas (venta_id, vehiculo_id, precio_unitario) VALUES (?, ?, ?)",
+        (venta_id, vehiculo_id, precio),
+    )
+    conn.execute(
+        "UPDATE Vehiculos SET estado_disponibilidad = 'Vendido' WHERE vehiculo_id = ?",
+        (vehiculo_id,),
+    )
+    return ["resultado", "mensaje", "venta_id"], [
+        ("Éxito", f"Venta #{venta_id} registrada correctamente.", venta_id)
+    ]
+
+
+def _sp_cancelar_venta(conn, venta_id):
+    conn.execute(
+        "UPDATE Ventas SET estado_venta = 'Cancelada' WHERE venta_id = ?", (venta_id,)
+    )
+    conn.execute(
+        """
+        UPDATE Vehiculos SET estado_disponibilidad = 'Disponible'
+        WHERE vehiculo_id IN (SELECT vehiculo_id FROM Detalle_Ventas WHERE venta_id = ?)
+        """,
+        (venta_id,),
+    )
+    return None, None
+
+
+PROCEDURES = {
+    "sp_registrarventa": _sp_registrar_venta,
+    "sp_cancelarventa": _sp_cancelar_venta,
+}
+
+
+# -------------------------------------------------------------------
+# API tipo pyodbc
+# -------------------------------------------------------------------
+class Cursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.fast_executemany = False
+        self.rowcount = -1
+        self._results = []  # [(description, rows)]
+        self._current = 0
+        self._pos = 0
+
+    @property
+    def description(self):
+        if self._current < len(self._results):
+            return self._results[self._current][0]
+        return None
+
+    def _run(self, sql, params):
+        conn = self.connection._conn
+        variables = {}
+        params = list(params or ())
+        results = []
+        rowcount = -1
+
+        for statement in _split_statements(sql):
+            if re.match(r"^\s*SET\s+NOCOUNT\s", statement, re.I):
+                continue
+
+            count = statement.count("?")
+            stmt_params, params = params[:count], params[count:]
+
+            declare = _DECLARE.match(statement)
+            if declare:
+                name, expr = declare.groups()
+                expr = translate(expr, variables)
+                variables[name] = conn.execute(f"SELECT {expr}", stmt_params).fetchone()[0]
+                continue
+
+            exec_match = _EXEC.match(statement)
+            if exec_match:
+                proc = PROCEDURES.get(exec_match.group(1).lower())
+                if proc is None:
+                    raise Error(f"Procedimiento no soportado: {exec_match.group(1)}")
+                columns, rows = proc(conn, *stmt_params)
+                if columns is not None:
+                    results.append(([(c, None, None, None, None, None, None) for c in columns], rows))
+                continue
+
+            cur = conn.execute(translate(statement, variables), stmt_params)
+            if cur.description:
+                results.append((cur.description, [_to_decimal(r) for r in cur.fetchall()]))
+            else:
+                rowcount = cur.rowcount
+
+        self._results = results
+        self._current = 0
+        self._pos = 0
+        self.rowcount = rowcount
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        try:
+            with self.connection._lock:
+                self._run(sql, params)
+        except sqlite3.Error as e:
+            raise Error(f"[standin] {e}") from e
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        try:
+            with self.connection._lock:
+                cur = self.connection._conn.executemany(translate(sql), list(seq_of_params))
+                self.rowcount = cur.rowcount
+        except sqlite3.Error as e:
+            raise Error(f"[standin] {e}") from e
+        self._results = []
+
+    def _rows(self):
+        if self._current < len(self._results):
+            return self._results[self._current][1]
+        raise Error("No hay resultset")
+
+    def fetchall(self):
+        rows = self._rows()[self._pos:]
+        self._pos += len(rows)
+        return rows
+
+    def fetchmany(self, size=1):
+        rows = self._rows()[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def nextset(self):
+        self._current += 1
+        self._pos = 0
+        return True if self._current < len(self._results) else None
+
+    def close(self):
+        self._results = []
+
+
+class Connection:
+    def __init__(self, path, timeout=0):
+        self._conn = sqlite3.connect(
+            path,
+            timeout=max(timeout or 0, 30),
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        for name, nargs, fn in (
+            ("YEAR", 1, _year),
+            ("MONTH", 1, _month),
+            ("FORMAT", 2, _format),
+            ("CONCAT", -1, _concat),
+            ("TSQL_LEFT", 2, _left),
+            ("GETDATE", 0, _getdate),
+        ):
+            self._conn.create_function(name, nargs, fn, deterministic=name != "GETDATE")
+        self._lock = threading.RLock()
+        self.autocommit = False
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(connection_string, timeout=0, **kwargs):
+    """
+    Abrir una conexión. ``connection_string`` es la ruta al archivo SQLite
+    (o ``Database=<ruta>;`` al estilo ODBC).
+    """
+    match = re.search(r"Database=([^;]+)", connection_string, re.I)
+    path = match.group(1) if match else connection_string
+    try:
+        return Connection(path, timeout)
+    except sqlite3.Error as e:
+        raise Error(f"[standin] {e}") from e
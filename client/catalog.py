@@ -0,0 +1,129 @@
+"""
+Búsqueda del catálogo en el servidor: filtros, orden y paginación.
+
+La usa tanto la página HTML ``/client/catalogo`` como el endpoint JSON
+``/client/api/catalogo``; así el navegador sólo recibe la página pedida
+en lugar de todo el inventario. Las consultas se resuelven contra el
+índice en memoria de utils.inventory, sin ir a SQL Server.
+"""
+
+from flask import request, url_for
+
+from utils.inventory import get_inventory
+
+DEFAULT_PER_PAGE = 24
+MAX_PER_PAGE = 96
+
+DEFAULT_SORT = "recientes"
+
+SORT_LABELS = {
+    "recientes": "Más recientes",
+    "precio_asc": "Precio: menor a mayor",
+    "precio_desc": "Precio: mayor a menor",
+    "anio_desc": "Año: más nuevo",
+    "anio_asc": "Año: más antiguo",
+    "marca": "Marca (A-Z)",
+}
+
+
+def parse_catalog_filters(args):
+    """Leer filtros, orden y paginación desde request.args."""
+    def text(name):
+        value = (args.get(name) or "").strip()
+        return value or None
+
+    filtros = {
+        "marca": text("marca"),
+        "modelo": text("modelo"),
+        "tipo": text("tipo"),
+        "color": text("color"),
+        "anio_min": args.get("anio_min", type=int),
+        "anio_max": args.get("anio_max", type=int),
+        "precio_min": args.get("precio_min", type=float),
+        "precio_max": args.get("precio_max", type=float),
+    }
+
+    # Valores "todas"/"todos" que mandaba el formulario anterior
+    if filtros["marca"] and filtros["marca"].lower() == "todas":
+        filtros["marca"] = None
+    if filtros["tipo"] and filtros["tipo"].lower() == "todos":
+        filtros["tipo"] = None
+
+    orden = args.get("orden", DEFAULT_SORT)
+    if orden not in SORT_LABELS:
+        orden = DEFAULT_SORT
+
+    page = max(1, args.get("page", 1, type=int) or 1)
+    per_page = args.get("per_page", DEFAULT_PER_PAGE, type=int) or DEFAULT_PER_PAGE
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+
+    return filtros, orden, page, per_page
+
+
+def _vehiculo_json(vehiculo):
+    data = vehiculo._asdict()
+    data.pop("fecha_ingreso", None)
+    data["precio"] = float(data["precio"]) if data["precio"] is not None else None
+    return data
+
+
+class CatalogPage:
+    """Página de resultados del catálogo."""
+
+    def __init__(self, items, total, page, per_page, filtros, orden):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.filtros = filtros
+        self.orden = orden
+
+    @property
+    def pages(self):
+        return max(1, -(-self.total // self.per_page))
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    def _url(self, page):
+        args = request.args.to_dict()
+        args["page"] = page
+        return url_for(request.endpoint, **args)
+
+    @property
+    def prev_url(self):
+        return self._url(self.page - 1) if self.has_prev else None
+
+    @property
+    def next_url(self):
+        return self._url(self.page + 1) if self.has_next else None
+
+    def to_dict(self):
+        return {
+            "items": [_vehiculo_json(v) for v in self.items],
+            "total": self.total,
+            "page": self.page,
+            "per_page": self.per_page,
+            "pages": self.pages,
+            "orden": self.orden,
+            "filtros": {k: v for k, v in self.filtros.items() if v is not None},
+        }
+
+
+def search_catalog(filtros, orden=DEFAULT_SORT, page=1, per_page=DEFAULT_PER_PAGE):
+    """Buscar vehículos disponibles con filtros, orden y paginación."""
+    items, total = get_inventory().search(
+        filtros, orden, offset=(page - 1) * per_page, limit=per_page
+    )
+    return CatalogPage(items, total, page, per_page, filtros, orden)
+
+
+def catalog_facets():
+    """Marcas y tipos disponibles con su conteo: [('Toyota', 12), ...]."""
+    inventario = get_inventory()
+    return inventario.facet_counts("marca"), inventario.facet_counts("tipo")
@@ -0,0 +1,137 @@
+"""
+Compra de un vehículo desde el catálogo (``client.comprar``).
+
+Cuidados frente a doble clic, reintentos del navegador y muchos clientes
+comprando el mismo auto a la vez (preventas, ofertas):
+
+- Idempotencia: cada formulario de compra lleva un ``idempotency_key``
+  aleatorio (lo genera static/js/main.js; también se acepta la cabecera
+  ``Idempotency-Key``). La primera petición con esa clave reserva un
+  recibo en la caché de utils.shared_cache; las repetidas no vuelven a
+  llamar a ``sp_RegistrarVenta`` y devuelven el mismo resultado (o
+  "se está procesando" si la primera aún no termina). Sólo se recuerdan
+  las compras exitosas; tras un rechazo la clave se libera para poder
+  reintentar. Sin clave se usa el vehículo: un cliente no puede comprar
+  dos veces el mismo auto.
+- Disponibilidad en memoria: si el índice de inventario ya sabe que el
+  vehículo no está disponible, se responde sin ir a SQL Server; y dentro
+  de cada proceso sólo una compra por vehículo llega al procedimiento a
+  la vez (las demás reciben "otro cliente lo está comprando").
+- Interbloqueos y esperas de bloqueo se reintentan en
+  utils.database.call_stored_procedure (``DB_DEADLOCK_RETRIES``).
+"""
+
+import re
+import threading
+from contextlib import contextmanager
+
+from flask import current_app
+
+from utils.cache import LRUCache
+from utils.database import call_stored_procedure
+
+# Recibo provisional mientras la primera petición está en curso
+PENDING = ("info", "Tu compra ya se está procesando; revisa tu historial en unos segundos.")
+
+_KEY_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+class PurchaseDesk:
+    """Registra compras evitando duplicados y llamadas inútiles al SP."""
+
+    def __init__(self, receipts, inventory, dashboard, empleado_id,
+                 pending_ttl=30, receipt_ttl=600):
+        self.receipts = receipts  # get / set / add / delete
+        self.inventory = inventory
+        self.dashboard = dashboard
+        self.empleado_id = empleado_id
+        self.pending_ttl = pending_ttl
+        self.receipt_ttl = receipt_ttl
+        self._en_compra = set()  # vehículos con una compra en curso en este proceso
+        self._lock = threading.Lock()
+
+    def buy(self, cliente_id, vehiculo_id, idempotency_key=None, metodo_pago="Tarjeta"):
+        """``(categoría, mensaje)`` para flash; la misma clave da el mismo resultado."""
+        if not idempotency_key or not _KEY_RE.match(idempotency_key):
+            idempotency_key = f"vehiculo-{vehiculo_id}"
+        clave = f"{cliente_id}:{idempotency_key}"
+
+        if not self.receipts.add(clave, PENDING, self.pending_ttl):
+            return self.receipts.get(clave) or PENDING
+
+        try:
+            resultado = self._register(cliente_id, vehiculo_id, metodo_pago)
+        except Exception:
+            # Error inesperado: se libera la clave para que el cliente pueda reintentar
+            self.receipts.delete(clave)
+            raise
+        if resultado[0] == "success":
+            self.receipts.set(clave, resultado, self.receipt_ttl)
+        else:
+            # Un rechazo puede ser pasajero (índice desactualizado, otro
+            # comprador, error del SP): no debe bloquear el reintento
+            self.receipts.delete(clave)
+        return resultado
+
+    @contextmanager
+    def _reserve(self, vehiculo_id):
+        with self._lock:
+            libre = vehiculo_id not in self._en_compra
+            if libre:
+                self._en_compra.add(vehiculo_id)
+        try:
+            yield libre
+        finally:
+            if libre:
+                with self._lock:
+                    self._en_compra.discard(vehiculo_id)
+
+    def _register(self, cliente_id, vehiculo_id, metodo_pago):
+        if not self.inventory.is_available(vehiculo_id):
+            return ("warning", "El vehículo ya no está disponible.")
+
+        with self._reserve(vehiculo_id) as libre:
+            if not libre:
+                return ("warning", "Otro cliente está comprando este vehículo en este momento.")
+
+            result = call_stored_procedure(
+                "sp_RegistrarVenta",
+                (cliente_id, self.empleado_id, vehiculo_id, metodo_pago),
+            )
+            row = result[0] if isinstance(result, list) and result else {}
+
+            # Vendido o no, el índice debe reflejar el estado real del vehículo
+            self.inventory.vehicle_changed(vehiculo_id)
+            if row.get("resultado") != "Éxito" or not row.get("mensaje"):
+                motivo = row.get("mensaje") or "El procedimiento no devolvió un resultado de éxito."
+                return ("danger", f"Error al registrar la venta: {motivo}")
+
+            self.dashboard.invalidate()
+            return ("success", row["mensaje"])
+
+
+def init_app(app):
+    """Registrar el mostrador de compras en la app."""
+    app.config.setdefault("ONLINE_SALES_EMPLOYEE_ID", 2)
+    app.config.setdefault("PURCHASE_PENDING_TTL", 30)
+    app.config.setdefault("PURCHASE_RECEIPT_TTL", 600)
+
+    manager = app.extensions.get("cache_manager")
+    if manager is not None:
+        receipts = manager.cache("compras", max_entries=4096)
+    else:
+        receipts = LRUCache(max_entries=4096)
+
+    app.extensions["purchase_desk"] = PurchaseDesk(
+        receipts,
+        app.extensions["inventory_index"],
+        app.extensions["dashboard_summary"],
+        empleado_id=app.config["ONLINE_SALES_EMPLOYEE_ID"],
+        pending_ttl=app.config["PURCHASE_PENDING_TTL"],
+        receipt_ttl=app.config["PURCHASE_RECEIPT_TTL"],
+    )
+
+
+def get_purchase_desk():
+    """Mostrador de compras de la app actual."""
+    return current_app.extensions["purchase_desk"]
@@ -1,5 +1,10 @@
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request
-from utils.database import execute_query, call_stored_procedure
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
+from utils.database import User
+from utils.inventory import get_inventory
+from utils.http import conditional, inventory_validator
+from utils.users import session_user_active
+from client.catalog import parse_catalog_filters, search_catalog, catalog_facets, SORT_LABELS
+from client.purchases import get_purchase_desk
 
 client_bp = Blueprint("client", __name__)
 
@@ -11,33 +16,24 @@ client_bp = Blueprint("client", __name__)
 def require_client_login():
     if "user_id" not in session or session.get("es_administrador"):
         return redirect(url_for("auth.login"))
+    # Registro cacheado (utils.users): una cuenta desactivada pierde la sesión
+    if not session_user_active(is_admin=False):
+        session.clear()
+        flash("Tu cuenta ya no está activa.", "warning")
+        return redirect(url_for("auth.login"))
 
 
 # -------------------------------------------------------------------
 # Dashboard de cliente
 # -------------------------------------------------------------------
 @client_bp.route("/dashboard")
+@conditional(inventory_validator)
 def dashboard():
     cliente_id = session.get("user_id")
 
-    # Vehículos disponibles
-    vehiculos = execute_query(
-        """
-        SELECT
-            vehiculo_id,
-            marca,
-            modelo,
-            anio,
-            precio,
-            color,
-            tipo,
-            estado_disponibilidad,
-            imagen_url
-        FROM Vehiculos
-        WHERE estado_disponibilidad = 'Disponible'
-        ORDER BY marca, modelo
-        """
-    )
+    # Vehículos disponibles (desde el índice en memoria)
+    inventario = get_inventory()
+    vehiculos, _ = inventario.search({}, orden="marca")
 
         # Resumen rápido (cuántos disponibles)
     resumen = {
@@ -52,6 +48,10 @@ def dashboard():
         vehiculos=vehiculos,
         resumen=resumen,
         populares=populares,
+        marcas=[v for v, _ in inventario.facet_counts("marca")],
+        modelos=[v for v, _ in inventario.facet_counts("modelo")],
+        anios=sorted((v for v, _ in inventario.facet_counts("anio")), reverse=True),
+        tipos=[v for v, _ in inventario.facet_counts("tipo")],
     )
 
 
@@ -59,38 +59,35 @@ def dashboard():
 # Catálogo de vehículos
 # -------------------------------------------------------------------
 @client_bp.route("/catalogo")
+@conditional(inventory_validator)
 def catalogo():
-    vehiculos = execute_query(
-        """
-        SELECT
-            vehiculo_id,
-            marca,
-            modelo,
-            anio,
-            precio,
-            color,
-            tipo,
-            estado_disponibilidad,
-            descripcion,
-            imagen_url
-        FROM Vehiculos
-        WHERE estado_disponibilidad = 'Disponible'
-        ORDER BY fecha_ingreso DESC, vehiculo_id DESC;
-        """
-    )
+    filtros, orden, page, per_page = parse_catalog_filters(request.args)
+    pagina = search_catalog(filtros, orden, page, per_page)
 
     # Para filtros
-    marcas = sorted({v["marca"] for v in vehiculos})
-    tipos = sorted({v["tipo"] for v in vehiculos})
+    marcas, tipos = catalog_facets()
 
     return render_template(
         "client/catalogo.html",
-        vehiculos=vehiculos,
+        vehiculos=pagina.items,
+        pagina=pagina,
+        filtros=filtros,
+        orden=orden,
+        ordenes=SORT_LABELS,
         marcas=marcas,
         tipos=tipos,
     )
 
 
+@client_bp.route("/api/catalogo")
+@conditional(inventory_validator)
+def catalogo_api():
+    """Misma búsqueda del catálogo, en JSON."""
+    filtros, orden, page, per_page = parse_catalog_filters(request.args)
+    pagina = search_catalog(filtros, orden, page, per_page)
+    return jsonify(pagina.to_dict())
+
+
 # -------------------------------------------------------------------
 # Comprar vehículo
 # -------------------------------------------------------------------
@@ -100,26 +97,12 @@ def comprar(vehiculo_id):
     if not cliente_id:
         return redirect(url_for("auth.login"))
 
-    # Empleado fijo de ejemplo
-    empleado_id = 2
-    metodo_pago = "Tarjeta"
+    # Clave del formulario (static/js/main.js) o de clientes que usan la cabecera
+    clave = request.form.get("idempotency_key") or request.headers.get("Idempotency-Key")
 
     try:
-        result = call_stored_procedure(
-            "sp_RegistrarVenta",
-            (cliente_id, empleado_id, vehiculo_id, metodo_pago),
-        )
-
-        mensaje_flash = None
-        if isinstance(result, list) and result:
-            row = result[0]
-            if row.get("resultado") == "Éxito":
-                mensaje_flash = row.get("mensaje")
-
-        if not mensaje_flash:
-            raise RuntimeError("El procedimiento no devolvió un resultado de éxito.")
-
-        flash(mensaje_flash, "success")
+        categoria, mensaje = get_purchase_desk().buy(cliente_id, vehiculo_id, clave)
+        flash(mensaje, categoria)
     except Exception as e:
         flash(f"Error al registrar la venta: {e}", "danger")
 
@@ -135,25 +118,9 @@ def perfil():
     if not cliente_id:
         return redirect(url_for("auth.login"))
 
-    filas = execute_query(
-        """
-        SELECT
-            cliente_id,
-            nombre_completo,
-            email,
-            telefono,
-            direccion,
-            fecha_registro
-        FROM Clientes
-        WHERE cliente_id = ?
-        """,
-        (cliente_id,),
-    )
-
-    if not filas:
+    cliente = User.get_by_id(cliente_id)
+    if not cliente:
         flash("No se encontró información del cliente.", "warning")
         return redirect(url_for("client.dashboard"))
 
-    cliente = filas[0]
-
     return render_template("client/perfil.html", cliente=cliente)
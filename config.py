@@ -20,6 +20,111 @@ class Config:
         }
     }
     
+    # Cadena ODBC usada por utils.database (pool de conexiones pyodbc)
+    DB_CONNECTION_STRING = os.environ.get('DB_CONNECTION_STRING') or (
+        'DRIVER={ODBC Driver 17 for SQL Server};'
+        'SERVER=localhost\\SQLEXPRESS;'
+        'DATABASE=RustEze_Agency;'
+        'Trusted_Connection=yes;'
+    )
+
+    # Pool de conexiones (pre_ping / recycle se toman de SQLALCHEMY_ENGINE_OPTIONS)
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+    # Reintentos de procedimientos ante interbloqueo / espera de bloqueo
+    DB_DEADLOCK_RETRIES = int(os.environ.get('DB_DEADLOCK_RETRIES', 2))
+    DB_RETRY_BACKOFF = float(os.environ.get('DB_RETRY_BACKOFF', 0.05))
+
+    # Arranque sin conectarse: la base se verifica en segundo plano (utils.health)
+    DB_LAZY_INIT = os.environ.get('DB_LAZY_INIT', '1') == '1'
+    HEALTH_LIVE_PATH = os.environ.get('HEALTH_LIVE_PATH', '/health')
+    HEALTH_READY_PATH = os.environ.get('HEALTH_READY_PATH', '/ready')
+    HEALTH_CACHE_SECONDS = float(os.environ.get('HEALTH_CACHE_SECONDS', 5))
+    HEALTH_PING_TIMEOUT = float(os.environ.get('HEALTH_PING_TIMEOUT', 1))
+    WARMUP_TIMEOUT = float(os.environ.get('WARMUP_TIMEOUT', 10))
+
+    # Índice de inventario en memoria: recarga completa cada N segundos
+    INVENTORY_REFRESH_SECONDS = int(os.environ.get('INVENTORY_REFRESH_SECONDS', 300))
+
+    # Dashboard de admin: caché de la vista y recarga completa del resumen
+    DASHBOARD_CACHE_TTL = int(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+    DASHBOARD_SUMMARY_MAX_AGE = int(os.environ.get('DASHBOARD_SUMMARY_MAX_AGE', 3600))
+
+    # Compras desde el catálogo (client.purchases)
+    ONLINE_SALES_EMPLOYEE_ID = int(os.environ.get('ONLINE_SALES_EMPLOYEE_ID', 2))
+    PURCHASE_PENDING_TTL = int(os.environ.get('PURCHASE_PENDING_TTL', 30))
+    PURCHASE_RECEIPT_TTL = int(os.environ.get('PURCHASE_RECEIPT_TTL', 600))
+
+    # Auditoría de errores asíncrona (utils.audit)
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 1000))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 50))
+    AUDIT_FLUSH_INTERVAL = float(os.environ.get('AUDIT_FLUSH_INTERVAL', 1.0))
+    AUDIT_OVERFLOW = os.environ.get('AUDIT_OVERFLOW', 'spill')  # 'spill' o 'drop'
+
+    # Instrumentación de consultas (utils.instrumentation)
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))  # 0 = desactivado
+    QUERY_COUNT_WARNING = int(os.environ.get('QUERY_COUNT_WARNING', 25))
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', '1') == '1'
+
+    # Endpoint de métricas Prometheus (utils.metrics); con token se exige
+    # "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_PATH = os.environ.get('METRICS_PATH', '/metrics')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+    # Variantes redimensionadas de las fotos (utils.images, requiere Pillow)
+    IMAGE_WEBP = os.environ.get('IMAGE_WEBP', '1') == '1'
+    IMAGE_QUALITY = int(os.environ.get('IMAGE_QUALITY', 80))
+
+    # Estáticos con huella en la URL + gzip/brotli precomprimidos (utils.assets)
+    STATIC_FINGERPRINT = os.environ.get('STATIC_FINGERPRINT', '1') == '1'
+    STATIC_PRECOMPRESS = os.environ.get('STATIC_PRECOMPRESS', '1') == '1'
+
+    # Compresión de respuestas y ETag/304 en páginas de sólo lectura (utils.http)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', '1') == '1'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_QUALITY = int(os.environ.get('COMPRESS_BR_QUALITY', 4))
+    CONDITIONAL_GET = os.environ.get('CONDITIONAL_GET', '1') == '1'
+
+    # Caché compartida entre workers e invalidación entre procesos (utils.shared_cache)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_DIR = os.environ.get('CACHE_DIR') or None
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_LOCAL_TTL = int(os.environ.get('CACHE_LOCAL_TTL', 60))
+
+    # Caché de fragmentos de plantilla, {% cache %} (utils.fragments)
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', '1') == '1'
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 512))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))
+
+    # Hash de contraseñas en un pool de procesos (utils.passwords)
+    PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 600000))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 4))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_ALLOW_PLAINTEXT = os.environ.get('PASSWORD_ALLOW_PLAINTEXT', '1') == '1'
+
+    # Límite de intentos de login por IP y por email, "capacidad/segundos" (utils.ratelimit)
+    LOGIN_RATE_LIMIT_ENABLED = os.environ.get('LOGIN_RATE_LIMIT_ENABLED', '1') == '1'
+    LOGIN_RATE_IP = os.environ.get('LOGIN_RATE_IP', '20/60')
+    LOGIN_RATE_EMAIL = os.environ.get('LOGIN_RATE_EMAIL', '5/300')
+    LOGIN_RATE_BACKEND = os.environ.get('LOGIN_RATE_BACKEND', 'local')  # 'local' o 'shared'
+    LOGIN_RATE_TRUSTED_PROXIES = int(os.environ.get('LOGIN_RATE_TRUSTED_PROXIES', 0))
+
+    # Registros de usuario de la sesión cacheados por (rol, id) (utils.users)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+
+    # Filtros de Bloom de emails/teléfonos para el registro (utils.contacts)
+    CONTACT_INDEX_REFRESH_SECONDS = int(os.environ.get('CONTACT_INDEX_REFRESH_SECONDS', 3600))
+    CONTACT_INDEX_ERROR_RATE = float(os.environ.get('CONTACT_INDEX_ERROR_RATE', 0.01))
+
+    # Importación masiva de vehículos desde CSV/JSON (utils.bulk)
+    BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', 1000))
+    BULK_IMPORT_MAX_ERRORS = int(os.environ.get('BULK_IMPORT_MAX_ERRORS', 500))
+
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'rust-eze-super-secret-key-2025'
     
     # Configuración de sesión
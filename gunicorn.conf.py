@@ -0,0 +1,57 @@
+"""
+Configuración de gunicorn (Linux/macOS):
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Workers con hilos (``gthread``): las peticiones pasan la mayor parte del
+tiempo esperando a SQL Server, así que varios hilos por proceso rinden
+más que muchos procesos. Cada hilo usa una conexión del pool, por lo que
+``DB_POOL_MAX_SIZE`` debe ser al menos ``GUNICORN_THREADS``.
+
+Con más de un worker la caché pasa a ``CACHE_BACKEND=filesystem`` (si no
+se eligió otra) para que los workers compartan datos e invalidaciones
+(ver utils.shared_cache).
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_class = "gthread"
+
+# Reciclar workers cada N peticiones (con jitter para que no reinicien todos a la vez)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 200))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# preload: la app se importa una vez en el maestro y los workers la
+# heredan (arranque más rápido y menos memoria); sin preload cada worker
+# la crea por su cuenta.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+errorlog = "-"
+
+if workers > 1:
+    os.environ.setdefault("CACHE_BACKEND", "filesystem")
+
+
+def when_ready(server):
+    # Con preload la app ya existe en el maestro: sus conexiones no deben
+    # heredarse (un socket ODBC compartido entre procesos se corrompe)
+    if preload_app:
+        from utils.lifecycle import before_fork
+
+        before_fork(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    # Se ejecuta en el worker ya inicializado y antes de aceptar conexiones
+    from utils.lifecycle import warmup
+
+    warmup(worker.wsgi)
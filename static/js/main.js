@@ -103,6 +103,19 @@ function formatCurrency(amount) {
     }).format(amount);
 }
 
+/**
+ * Clave aleatoria para formularios idempotentes (compras)
+ * @returns {string} Clave de 32 caracteres hexadecimales
+ */
+function newIdempotencyKey() {
+    if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+        return window.crypto.randomUUID().replace(/-/g, '');
+    }
+    var bytes = new Uint8Array(16);
+    window.crypto.getRandomValues(bytes);
+    return Array.from(bytes, function(b) { return b.toString(16).padStart(2, '0'); }).join('');
+}
+
 // ================================================
 // INICIALIZACIÓN
 // ================================================
@@ -128,6 +141,20 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }, 5000);
 
+    // Formularios de compra: una clave por formulario (el servidor ignora
+    // los envíos repetidos con la misma clave) y botón deshabilitado al enviar
+    document.querySelectorAll('form[data-idempotente]').forEach(function(form) {
+        var input = form.querySelector('input[name="idempotency_key"]');
+        if (input && !input.value) {
+            input.value = newIdempotencyKey();
+        }
+        form.addEventListener('submit', function() {
+            form.querySelectorAll('button[type="submit"]').forEach(function(boton) {
+                boton.disabled = true;
+            });
+        });
+    });
+
     // Agregar estilo para animaciones de notificación
     if (!document.querySelector('#notification-styles')) {
         var style = document.createElement('style');
@@ -0,0 +1,203 @@
+"""
+Archivos estáticos con huella, caché de larga duración y precompresión.
+
+Al iniciar la app se calcula un hash del contenido de cada archivo de
+``static/`` y ``url_for('static', filename='css/styles.css')`` pasa a
+generar ``/static/css/styles.3f2a9c1b7d4e.css``. Como la URL cambia
+cuando cambia el contenido, esas respuestas se sirven con
+``Cache-Control: public, max-age=31536000, immutable`` y el navegador no
+vuelve a validarlas.
+
+Los archivos de texto (CSS, JS, SVG...) se comprimen una sola vez con
+gzip y, si está instalado el paquete ``brotli``, también con brotli; se
+guardan en ``STATIC_CACHE_DIR`` y se elige la variante según
+``Accept-Encoding``.
+
+Las variantes de fotos de utils.images ya llevan un hash en el nombre,
+así que también se sirven como inmutables.
+
+En modo debug no se reescriben las URLs (para que editar un CSS se vea
+al recargar).
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+from flask import current_app, request, send_file, send_from_directory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Sólo vale la pena precomprimir texto; JPEG/PNG/WebP ya están comprimidos
+COMPRESSIBLE = {".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".ico", ".xml"}
+MIN_COMPRESS_SIZE = 1024
+
+# Directorios cuyos nombres ya incluyen un hash de contenido
+PREHASHED_DIRS = ("images/variants/",)
+
+
+class StaticAssets:
+    """Manifiesto ``original -> con huella`` y copias precomprimidas."""
+
+    def __init__(self, static_folder, cache_dir, precompress=True):
+        self.static_folder = os.path.realpath(static_folder)
+        self.cache_dir = cache_dir
+        self.precompress = precompress
+        self.manifest = {}  # "css/styles.css" -> "css/styles.<hash>.css"
+        self._originals = {}  # inverso
+        self._compressed = {}  # "css/styles.<hash>.css" -> {"br": ruta, "gzip": ruta}
+        self._lock = threading.Lock()
+
+    def build(self):
+        """Recorrer static/ y calcular huellas (y precompresión)."""
+        manifest, originals, compressed = {}, {}, {}
+        for carpeta, _, archivos in os.walk(self.static_folder):
+            for nombre in archivos:
+                full = os.path.join(carpeta, nombre)
+                rel = os.path.relpath(full, self.static_folder).replace(os.sep, "/")
+                if rel.startswith(PREHASHED_DIRS) or nombre.startswith("."):
+                    continue
+                hashed = _hashed_name(rel, _file_hash(full))
+                manifest[rel] = hashed
+                originals[hashed] = rel
+                if self.precompress:
+                    variantes = self._precompress(full, hashed)
+                    if variantes:
+                        compressed[hashed] = variantes
+
+        with self._lock:
+            self.manifest, self._originals, self._compressed = manifest, originals, compressed
+        logger.info(
+            f"🗂️ Estáticos con huella: {len(manifest)} archivos, "
+            f"{len(compressed)} precomprimidos"
+        )
+
+    def _precompress(self, full, hashed):
+        ext = os.path.splitext(full)[1].lower()
+        size = os.path.getsize(full)
+        if ext not in COMPRESSIBLE or size < MIN_COMPRESS_SIZE:
+            return None
+
+        variantes = {}
+        data = None
+        encoders = [("gzip", ".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.insert(0, ("br", ".br", lambda d: brotli.compress(d, quality=11)))
+
+        for encoding, suffix, compress in encoders:
+            destino = os.path.join(self.cache_dir, *(hashed + suffix).split("/"))
+            if os.path.exists(destino + ".skip"):
+                continue  # ya se comprobó que no compensa
+            if not os.path.exists(destino):
+                if data is None:
+                    with open(full, "rb") as fh:
+                        data = fh.read()
+                comprimido = compress(data)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                if len(comprimido) >= size * 0.9:
+                    # No compensa; se recuerda para no recomprimir en cada arranque
+                    open(destino + ".skip", "wb").close()
+                    continue
+                tmp = f"{destino}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as fh:
+                    fh.write(comprimido)
+                os.replace(tmp, destino)
+            variantes[encoding] = destino
+        return variantes
+
+    def hashed(self, filename):
+        return self.manifest.get(filename)
+
+    def resolve(self, filename):
+        """Nombre original de un archivo con huella (o None)."""
+        return self._originals.get(filename)
+
+    def compressed(self, hashed):
+        return self._compressed.get(hashed, {})
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1 << 16), b""):
+            digest.update(bloque)
+    return digest.hexdigest()[:12]
+
+
+def _hashed_name(rel, digest):
+    base, ext = os.path.splitext(rel)
+    return f"{base}.{digest}{ext}"
+
+
+def _negotiate(variantes):
+    """Elegir br/gzip según Accept-Encoding (None = sin comprimir)."""
+    aceptadas = request.accept_encodings
+    for encoding in ("br", "gzip"):
+        if encoding in variantes and aceptadas.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def serve_static(filename):
+    """Reemplazo de la vista ``static`` de Flask."""
+    app = current_app
+    assets = app.extensions["static_assets"]
+    original = assets.resolve(filename)
+
+    if original is None:
+        response = send_from_directory(
+            app.static_folder, filename, max_age=app.get_send_file_max_age(filename)
+        )
+        if filename.startswith(PREHASHED_DIRS):
+            response.headers["Cache-Control"] = IMMUTABLE
+        return response
+
+    variantes = assets.compressed(filename)
+    encoding = _negotiate(variantes) if variantes else None
+    if encoding:
+        mimetype = mimetypes.guess_type(original)[0] or "application/octet-stream"
+        response = send_file(variantes[encoding], mimetype=mimetype, conditional=True)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_from_directory(app.static_folder, original)
+    if variantes:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+
+def init_app(app):
+    """Calcular huellas de static/ y reemplazar la vista de estáticos."""
+    app.config.setdefault("STATIC_FINGERPRINT", True)
+    app.config.setdefault("STATIC_PRECOMPRESS", True)
+    app.config.setdefault("STATIC_CACHE_DIR", os.path.join(app.instance_path, "static-cache"))
+
+    if not app.config["STATIC_FINGERPRINT"] or not app.static_folder:
+        return
+
+    assets = StaticAssets(
+        app.static_folder,
+        app.config["STATIC_CACHE_DIR"],
+        precompress=app.config["STATIC_PRECOMPRESS"],
+    )
+    assets.build()
+    app.extensions["static_assets"] = assets
+    app.view_functions["static"] = serve_static
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint != "static" or current_app.debug:
+            return
+        hashed = assets.hashed(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
@@ -0,0 +1,202 @@
+"""
+Escritura asíncrona y por lotes en Auditoria_Errores.
+
+Antes, cada error de SQL abría otro cursor sobre la misma conexión que
+acababa de fallar para insertar en Auditoria_Errores, duplicando la carga
+justo cuando el servidor está en problemas. Ahora los errores se encolan
+(cola acotada) y un hilo en segundo plano los inserta por lotes con
+``executemany``. Si la cola se llena o la base no responde, los registros
+se guardan en un archivo JSONL local (o se descartan, según
+``AUDIT_OVERFLOW``). Al terminar el proceso se vacía la cola.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+_INSERT = """
+    INSERT INTO Auditoria_Errores (procedimiento, mensaje_error, numero_error, usuario)
+    VALUES (?, ?, ?, ?)
+"""
+
+
+class AuditSink:
+    """Cola acotada + hilo escritor para Auditoria_Errores."""
+
+    def __init__(self, pool, spill_path, max_queue=1000, batch_size=50,
+                 flush_interval=1.0, overflow="spill", retry_after=30.0):
+        self.pool = pool
+        self.spill_path = spill_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.retry_after = retry_after
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._db_down_until = 0.0
+
+        self.stats = {"enqueued": 0, "written": 0, "spilled": 0, "dropped": 0}
+        self.por_procedimiento = Counter()  # errores recibidos (para métricas)
+
+    # ---------------------------------------------------------------
+    # Productor
+    # ---------------------------------------------------------------
+    def submit(self, procedimiento, mensaje_error, numero_error=0, usuario="SYSTEM"):
+        """Encolar un error; nunca bloquea ni lanza excepciones."""
+        record = (procedimiento, str(mensaje_error)[:4000], numero_error, usuario)
+        self.por_procedimiento[procedimiento] += 1
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+            self.stats["enqueued"] += 1
+        except queue.Full:
+            if self.overflow == "drop":
+                self.stats["dropped"] += 1
+            else:
+                self._spill([record])
+
+    def queue_depth(self):
+        """Registros pendientes de escribir."""
+        return self._queue.qsize()
+
+    def _ensure_started(self):
+        # El hilo se crea en el proceso que lo usa (seguro tras fork en workers)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="audit-sink", daemon=True
+            )
+            self._thread.start()
+
+    # ---------------------------------------------------------------
+    # Consumidor
+    # ---------------------------------------------------------------
+    def _drain(self, first=None):
+        batch = [] if first is None else [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write(self._drain(first))
+
+    def _write(self, batch):
+        if not batch:
+            return
+        if time.monotonic() < self._db_down_until:
+            self._spill(batch)
+            return
+
+        try:
+            conn = self.pool.acquire()
+        except Exception as e:
+            logger.warning(f"⚠️ Auditoría sin conexión, se guarda en archivo: {e}")
+            self._db_down_until = time.monotonic() + self.retry_after
+            self._spill(batch)
+            return
+
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.fast_executemany = True
+                cursor.executemany(_INSERT, batch)
+                conn.commit()
+            finally:
+                cursor.close()
+            self.stats["written"] += len(batch)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo escribir Auditoria_Errores, se guarda en archivo: {e}")
+            self._db_down_until = time.monotonic() + self.retry_after
+            self._spill(batch)
+        finally:
+            self.pool.release(conn)
+
+    def _spill(self, batch):
+        """Guardar registros en el archivo local (JSONL)."""
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as fh:
+                    fecha = datetime.now().isoformat(timespec="seconds")
+                    for procedimiento, mensaje, numero, usuario in batch:
+                        fh.write(json.dumps({
+                            "fecha": fecha,
+                            "procedimiento": procedimiento,
+                            "mensaje_error": mensaje,
+                            "numero_error": numero,
+                            "usuario": usuario,
+                        }, ensure_ascii=False) + "\n")
+            self.stats["spilled"] += len(batch)
+        except Exception as e:
+            self.stats["dropped"] += len(batch)
+            logger.error(f"❌ No se pudo guardar auditoría en {self.spill_path}: {e}")
+
+    def close(self, timeout=5.0):
+        """Detener el hilo y vaciar la cola (al apagar el proceso)."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        while True:
+            batch = self._drain()
+            if not batch:
+                break
+            self._write(batch)
+
+
+def init_app(app):
+    """Registrar el escritor de auditoría en la app."""
+    app.config.setdefault("AUDIT_QUEUE_SIZE", 1000)
+    app.config.setdefault("AUDIT_BATCH_SIZE", 50)
+    app.config.setdefault("AUDIT_FLUSH_INTERVAL", 1.0)
+    app.config.setdefault("AUDIT_OVERFLOW", "spill")
+    app.config.setdefault(
+        "AUDIT_SPILL_PATH", os.path.join(app.instance_path, "auditoria_errores.jsonl")
+    )
+
+    sink = AuditSink(
+        app.extensions["sqlserver_pool"],
+        app.config["AUDIT_SPILL_PATH"],
+        max_queue=app.config["AUDIT_QUEUE_SIZE"],
+        batch_size=app.config["AUDIT_BATCH_SIZE"],
+        flush_interval=app.config["AUDIT_FLUSH_INTERVAL"],
+        overflow=app.config["AUDIT_OVERFLOW"],
+    )
+    app.extensions["audit_sink"] = sink
+    atexit.register(sink.close)
+
+
+def record_error(procedimiento, mensaje_error, numero_error=0, usuario="SYSTEM"):
+    """Registrar un error en Auditoria_Errores sin bloquear la petición."""
+    sink = current_app.extensions.get("audit_sink") if has_app_context() else None
+    if sink is None:
+        return
+    sink.submit(procedimiento, mensaje_error, numero_error, usuario)
@@ -0,0 +1,441 @@
+"""
+Importación masiva de vehículos y acciones masivas del panel de admin.
+
+Los proveedores mandan el inventario en hojas de cálculo; capturarlo con
+``admin.vehiculos_nuevo`` es un INSERT (y un POST) por vehículo. Aquí:
+
+- ``read_rows`` recorre un archivo CSV, JSON (arreglo de objetos) o JSON
+  Lines sin cargarlo completo: el archivo subido se lee por bloques.
+- ``validate_vehicle`` aplica las mismas reglas que el formulario y
+  ``VehicleImporter`` inserta las filas válidas en bloques de
+  ``BULK_IMPORT_CHUNK_SIZE`` con ``executemany`` y ``fast_executemany``
+  (pyodbc manda el bloque completo como un arreglo de parámetros en lugar
+  de un viaje por fila). Si SQL Server rechaza un bloque, ese bloque se
+  reintenta fila por fila para señalar cuál falló.
+- El resultado (``ImportReport``) indica cuántas filas se insertaron y el
+  motivo de cada fila rechazada, con su número de línea en el archivo.
+
+Las acciones masivas (desactivar clientes, cambiar la disponibilidad de
+vehículos) son un solo UPDATE con ``IN (...)`` para todos los IDs
+seleccionados, hasta ``MAX_IDS`` (SQL Server acepta 2100 parámetros).
+
+También disponible por consola::
+
+    flask importar-vehiculos proveedor.csv
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import re
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import click
+from flask import current_app
+
+from utils.database import execute_query, get_cursor, pyodbc
+from utils.instrumentation import record_query
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ("Disponible", "Vendido", "Reservado", "Mantenimiento")
+
+# Encabezados alternativos frecuentes en las hojas de los proveedores
+ALIASES = {
+    "año": "anio",
+    "ano": "anio",
+    "estado": "estado_disponibilidad",
+    "imagen": "imagen_url",
+}
+
+REQUIRED = ("marca", "modelo", "anio", "precio", "color", "tipo")
+
+# "25000", "25000.5" o "25,000.50": la coma sólo como separador de miles y
+# a lo más dos decimales. "25.000" o "25.000,50" se rechazan en vez de
+# adivinar (guardarlos como 25.00 sería corromper el precio en silencio).
+PRECIO_RE = re.compile(r"(\d+|\d{1,3}(?:,\d{3})+)(\.\d{1,2})?")
+
+MAX_IDS = 2000
+
+_INSERT = """
+    INSERT INTO Vehiculos
+        (marca, modelo, anio, precio, color, tipo,
+         estado_disponibilidad, descripcion, imagen_url)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# -------------------------------------------------------------------
+# Lectura del archivo
+# -------------------------------------------------------------------
+class InvalidRow(ValueError):
+    """Registro que no se pudo decodificar (se reporta como fila rechazada)."""
+
+
+def _iter_json_array(text, chunk_size=64 * 1024):
+    """Elementos de un arreglo JSON, decodificados conforme llegan los bloques."""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    esperado = "["  # "[", "valor" (o "]" si es el primero), "," (o "]")
+    primero = True
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+        leer = pos >= len(buffer)
+        if not leer and esperado == "valor" and not (primero and buffer[pos] == "]"):
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                obj, end = None, None
+            # Un valor sólo está completo si lo sigue "," o "]": un número
+            # cortado por el bloque ("123" de "1234567", "12." de "12.5")
+            # también decodifica
+            siguiente = end
+            while siguiente is not None and siguiente < len(buffer) and buffer[siguiente].isspace():
+                siguiente += 1
+            leer = end is None or siguiente >= len(buffer) or (
+                type(obj) in (int, float) and buffer[siguiente] not in ",]"
+            )
+        if leer and not eof:
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        caracter = buffer[pos] if pos < len(buffer) else ""
+        if esperado == "[":
+            if caracter != "[":
+                raise ValueError("Se esperaba un arreglo JSON de objetos")
+            pos, esperado = pos + 1, "valor"
+        elif caracter == "]" and (esperado == "," or primero):
+            return
+        elif not caracter:
+            raise ValueError("JSON inválido o incompleto")
+        elif esperado == ",":
+            if caracter != ",":
+                raise ValueError("JSON inválido: se esperaba ',' o ']' entre elementos")
+            pos, esperado = pos + 1, "valor"
+        else:
+            if end is None:
+                raise ValueError("JSON inválido o incompleto")
+            yield obj
+            pos, esperado, primero = end, ",", False
+
+
+def read_rows(stream, filename):
+    """
+    ``(línea, dict)`` por cada registro de ``stream`` (binario). El formato
+    se toma de la extensión: ``.csv``, ``.json`` o ``.jsonl``/``.ndjson``.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in READERS:
+        raise ValueError("Formato no soportado: usa .csv, .json o .jsonl")
+    return READERS[extension](io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+
+
+def _read_csv(text):
+    muestra = text.read(4096)
+    try:
+        dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.DictReader(_prepend(muestra, text), dialect=dialecto)
+    for row in lector:
+        yield lector.line_num, row
+
+
+def _read_json_lines(text):
+    for numero, linea in enumerate(text, start=1):
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except ValueError as e:
+            # Cada línea es independiente: se rechaza sólo esta
+            yield numero, InvalidRow(f"JSON inválido: {e}")
+
+
+def _read_json(text):
+    yield from enumerate(_iter_json_array(text), start=1)
+
+
+def _prepend(head, text):
+    """Las líneas de ``head`` (ya leído) seguidas del resto de ``text``."""
+    yield from io.StringIO(head + text.readline())
+    yield from text
+
+
+READERS = {
+    ".csv": _read_csv,
+    ".json": _read_json,
+    ".jsonl": _read_json_lines,
+    ".ndjson": _read_json_lines,
+}
+
+
+# -------------------------------------------------------------------
+# Validación
+# -------------------------------------------------------------------
+def _normalize_keys(row):
+    normalizado = {}
+    for key, value in row.items():
+        if key is None:
+            continue  # columnas de más en una fila CSV
+        key = str(key).strip().lower()
+        key = ALIASES.get(key, key)
+        if isinstance(value, str):
+            value = value.strip()
+        normalizado[key] = value
+    return normalizado
+
+
+def _optional(value):
+    return None if value in (None, "") else str(value)
+
+
+def validate_vehicle(row):
+    """``(params, None)`` listos para el INSERT o ``(None, motivo)``."""
+    if isinstance(row, InvalidRow):
+        return None, str(row)
+    if not isinstance(row, dict):
+        return None, "El registro no es un objeto"
+    row = _normalize_keys(row)
+
+    faltantes = [c for c in REQUIRED if row.get(c) in (None, "")]
+    if faltantes:
+        return None, f"Faltan campos obligatorios: {', '.join(faltantes)}"
+
+    try:
+        # Las hojas de cálculo suelen exportar el año como "2021.0"
+        anio = Decimal(str(row["anio"]))
+        if anio != anio.to_integral_value():
+            raise InvalidOperation
+        anio = int(anio)
+    except (InvalidOperation, ValueError):
+        return None, f"Año inválido: {row['anio']!r}"
+    if not 2000 <= anio <= date.today().year + 1:
+        return None, f"Año fuera de rango: {anio}"
+
+    texto = str(row["precio"]).replace("$", "").strip()
+    if not PRECIO_RE.fullmatch(texto):
+        return None, (
+            f"Precio inválido: {row['precio']!r} "
+            "(usa 25000.50 o 25,000.50, con a lo más dos decimales)"
+        )
+    precio = Decimal(texto.replace(",", ""))
+    if precio <= 0:
+        return None, f"El precio debe ser mayor a cero: {row['precio']!r}"
+
+    estado = row.get("estado_disponibilidad") or "Disponible"
+    estado = next((e for e in ESTADOS if e.lower() == str(estado).lower()), None)
+    if estado is None:
+        return None, f"Estado inválido: {row['estado_disponibilidad']!r} (usa {', '.join(ESTADOS)})"
+
+    return (
+        str(row["marca"]),
+        str(row["modelo"]),
+        anio,
+        precio.quantize(Decimal("0.01")),
+        str(row["color"]),
+        str(row["tipo"]),
+        estado,
+        _optional(row.get("descripcion")),
+        _optional(row.get("imagen_url")),
+    ), None
+
+
+# -------------------------------------------------------------------
+# Importación
+# -------------------------------------------------------------------
+class ImportReport:
+    """Resultado de una importación."""
+
+    def __init__(self):
+        self.total = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []  # [(línea, motivo)], hasta max_errors
+        self.image_urls = set()
+
+    @property
+    def truncated(self):
+        return self.rejected > len(self.errors)
+
+
+class VehicleImporter:
+    """Valida e inserta vehículos por bloques con ``fast_executemany``."""
+
+    def __init__(self, chunk_size=1000, max_errors=500):
+        self.chunk_size = max(1, chunk_size)
+        self.max_errors = max_errors
+
+    def _reject(self, report, linea, motivo):
+        report.rejected += 1
+        if len(report.errors) < self.max_errors:
+            report.errors.append((linea, motivo))
+
+    def run(self, rows):
+        """Importar ``rows`` (``(línea, dict)``, ver ``read_rows``)."""
+        report = ImportReport()
+        bloque = []
+        try:
+            for linea, row in rows:
+                report.total += 1
+                params, motivo = validate_vehicle(row)
+                if motivo:
+                    self._reject(report, linea, motivo)
+                    continue
+                bloque.append((linea, params))
+                if len(bloque) >= self.chunk_size:
+                    self._flush(bloque, report)
+                    bloque = []
+        except (ValueError, csv.Error) as e:
+            # Archivo mal formado: se conserva lo ya insertado y se informa dónde paró
+            self._reject(report, None, f"Archivo inválido después de {report.total} registros: {e}")
+        self._flush(bloque, report)
+        return report
+
+    def _flush(self, bloque, report):
+        if not bloque:
+            return
+        inicio = time.perf_counter()
+        with get_cursor() as cursor:
+            cursor.fast_executemany = True
+            try:
+                cursor.executemany(_INSERT, [params for _, params in bloque])
+                cursor.connection.commit()
+            except pyodbc.Error as e:
+                cursor.connection.rollback()
+                record_query("executemany", _INSERT, time.perf_counter() - inicio, error=e)
+                logger.warning(f"⚠️ Bloque de {len(bloque)} vehículos rechazado, se reintenta por fila: {e}")
+                self._insert_one_by_one(cursor, bloque, report)
+                return
+        record_query("executemany", _INSERT, time.perf_counter() - inicio, len(bloque))
+        report.inserted += len(bloque)
+        report.image_urls.update(params[-1] for _, params in bloque if params[-1])
+
+    def _insert_one_by_one(self, cursor, bloque, report):
+        cursor.fast_executemany = False
+        for linea, params in bloque:
+            try:
+                cursor.execute(_INSERT, params)
+                cursor.connection.commit()
+            except pyodbc.Error as e:
+                cursor.connection.rollback()
+                self._reject(report, linea, f"SQL Server rechazó la fila: {e}")
+                continue
+            report.inserted += 1
+            if params[-1]:
+                report.image_urls.add(params[-1])
+
+
+def import_vehicles(stream, filename):
+    """Importar un archivo y refrescar inventario, dashboard e imágenes."""
+    from utils.dashboard import get_dashboard_summary
+    from utils.images import get_image_pipeline
+    from utils.inventory import get_inventory
+
+    importer = current_app.extensions["vehicle_importer"]
+    report = importer.run(read_rows(stream, filename))
+    if report.inserted:
+        get_inventory().vehicles_added()
+        get_dashboard_summary().invalidate()
+        pipeline = get_image_pipeline()
+        for url in report.image_urls:
+            pipeline.schedule(url)
+    logger.info(
+        f"📥 Importación de vehículos: {report.inserted} insertados, "
+        f"{report.rejected} rechazados de {report.total}"
+    )
+    return report
+
+
+# -------------------------------------------------------------------
+# Acciones masivas
+# -------------------------------------------------------------------
+def parse_ids(values):
+    """IDs enteros únicos (en orden) de una lista de valores de formulario."""
+    ids = []
+    for value in values:
+        try:
+            id_ = int(value)
+        except (TypeError, ValueError):
+            continue
+        if id_ > 0 and id_ not in ids:
+            ids.append(id_)
+    if len(ids) > MAX_IDS:
+        raise ValueError(f"Se pueden seleccionar como máximo {MAX_IDS} registros a la vez")
+    return ids
+
+
+def _placeholders(ids):
+    return ", ".join("?" * len(ids))
+
+
+def deactivate_clients(ids):
+    """Baja lógica de varios clientes en un UPDATE; devuelve las filas cambiadas."""
+    if not ids:
+        return 0
+    result = execute_query(
+        f"""
+        UPDATE Clientes
+        SET activo = 0
+        WHERE activo = 1 AND cliente_id IN ({_placeholders(ids)})
+    """,
+        tuple(ids),
+        fetch=False,
+    )
+    return result["rows_affected"]
+
+
+def set_vehicles_status(ids, estado):
+    """
+    Cambiar la disponibilidad de varios vehículos en un UPDATE. Los
+    vendidos no se tocan: ese estado lo controlan las ventas.
+    """
+    if estado not in ESTADOS or estado == "Vendido":
+        raise ValueError(f"Estado inválido: {estado!r}")
+    if not ids:
+        return 0
+    result = execute_query(
+        f"""
+        UPDATE Vehiculos
+        SET estado_disponibilidad = ?
+        WHERE estado_disponibilidad <> 'Vendido'
+          AND vehiculo_id IN ({_placeholders(ids)})
+    """,
+        (estado, *ids),
+        fetch=False,
+    )
+    return result["rows_affected"]
+
+
+def init_app(app):
+    """Registrar el importador y el comando ``flask importar-vehiculos``."""
+    app.config.setdefault("BULK_IMPORT_CHUNK_SIZE", 1000)
+    app.config.setdefault("BULK_IMPORT_MAX_ERRORS", 500)
+
+    app.extensions["vehicle_importer"] = VehicleImporter(
+        chunk_size=app.config["BULK_IMPORT_CHUNK_SIZE"],
+        max_errors=app.config["BULK_IMPORT_MAX_ERRORS"],
+    )
+
+    @app.cli.command("importar-vehiculos")
+    @click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+    def importar_vehiculos(archivo):
+        """Importar vehículos desde un CSV, JSON o JSON Lines."""
+        with open(archivo, "rb") as f:
+            try:
+                report = import_vehicles(f, archivo)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+        print(f"📥 {report.inserted} insertados, {report.rejected} rechazados de {report.total}")
+        for linea, motivo in report.errors:
+            print(f"   línea {linea or '-'}: {motivo}")
+        if report.truncated:
+            print(f"   ... y {report.rejected - len(report.errors)} errores más")
@@ -0,0 +1,218 @@
+"""
+Índice en memoria de emails y teléfonos de clientes (filtros de Bloom).
+
+El registro debe rechazar emails y teléfonos ya usados. Antes eran dos
+SELECT y luego el INSERT (tres viajes a SQL Server por intento). Ahora
+``ContactIndex`` responde "seguro que no existe" o "puede existir" sin ir
+a la base, y ``register_client`` sólo consulta cuando hace falta:
+
+- Si el índice dice que ni el email ni el teléfono existen, se va directo
+  a ``INSERT ... WHERE NOT EXISTS`` (la condición protege de un falso
+  negativo, p. ej. un alta hecha fuera de la app).
+- Si alguno puede existir, primero se consulta cuál está en uso.
+
+El hash de la contraseña (PBKDF2, lo caro del registro) se calcula recién
+después de descartar duplicados, así un reenvío o un bot no lo paga.
+
+Un filtro de Bloom no tiene falsos negativos para lo que se le agregó y
+ocupa ~1,2 bytes por entrada con 1 % de falsos positivos. Se carga
+completo en el calentamiento del worker (o con el primer registro), se
+recarga cada ``CONTACT_INDEX_REFRESH_SECONDS`` y cada alta o edición se
+agrega (y se avisa a los demás workers por utils.shared_cache). Los
+emails se comparan en minúsculas, como la intercalación de SQL Server.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from flask import current_app
+
+from utils.database import execute_batch, execute_query, iter_query
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Conjunto aproximado: ``in`` puede dar falsos positivos, nunca falsos negativos."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Doble hash (Kirsch-Mitzenmacher) a partir de un solo blake2b
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return ((a + i * b) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for pos in self._positions(value):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(value))
+
+
+def _norm_email(email):
+    return (email or "").strip().lower()
+
+
+def _norm_phone(telefono):
+    return (telefono or "").strip()
+
+
+class ContactIndex:
+    """Emails y teléfonos de Clientes, para descartar duplicados sin consultar."""
+
+    def __init__(self, max_age=3600, error_rate=0.01, events=None):
+        self.max_age = max_age
+        self.error_rate = error_rate
+        self.events = events  # utils.shared_cache.CacheManager
+        self.skipped = 0  # verificaciones evitadas
+        self.checked = 0  # verificaciones que fueron a SQL Server
+        self._emails = None
+        self._phones = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def load(self):
+        total = execute_query("SELECT COUNT(*) AS total FROM Clientes")[0]["total"]
+        # Margen para las altas hasta la próxima recarga
+        capacidad = max(1000, total * 2)
+        emails = BloomFilter(capacidad, self.error_rate)
+        phones = BloomFilter(capacidad, self.error_rate)
+        for row in iter_query("SELECT email, telefono FROM Clientes", batch_size=5000):
+            emails.add(_norm_email(row["email"]))
+            if row["telefono"]:
+                phones.add(_norm_phone(row["telefono"]))
+        with self._lock:
+            self._emails, self._phones = emails, phones
+            self._loaded_at = time.monotonic()
+        logger.info(f"📇 Índice de contactos cargado: {total} clientes")
+
+    def _is_stale(self):
+        loaded_at = self._loaded_at
+        return loaded_at is None or bool(
+            self.max_age and time.monotonic() - loaded_at > self.max_age
+        )
+
+    def ensure_loaded(self):
+        if self._is_stale():
+            with self._load_lock:
+                if self._is_stale():
+                    self.load()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def might_exist(self, email, telefono):
+        """``(email, teléfono)``: False = seguro que no está; True = hay que consultar."""
+        self.ensure_loaded()
+        with self._lock:
+            return (
+                _norm_email(email) in self._emails,
+                bool(telefono) and _norm_phone(telefono) in self._phones,
+            )
+
+    def _add(self, email, telefono):
+        with self._lock:
+            if self._emails is None:
+                return  # aún no se carga; la carga lo incluirá
+            if email:
+                self._emails.add(_norm_email(email))
+            if telefono:
+                self._phones.add(_norm_phone(telefono))
+
+    def add(self, email, telefono):
+        """Registrar un email/teléfono nuevo (alta o edición de un cliente)."""
+        self._add(email, telefono)
+        if self.events is not None:
+            self.events.publish("contactos", email, telefono)
+
+    def apply_event(self, email, telefono):
+        """Alta publicada por otro proceso (sin re-publicarla)."""
+        self._add(email, telefono)
+
+
+_CONFLICTS_SQL = """
+    SELECT
+        CASE WHEN EXISTS (SELECT 1 FROM Clientes WHERE email = ?) THEN 1 ELSE 0 END AS email,
+        CASE WHEN EXISTS (SELECT 1 FROM Clientes WHERE telefono = ?) THEN 1 ELSE 0 END AS telefono
+"""
+
+_INSERT_SQL = """
+    INSERT INTO Clientes
+        (nombre_completo, email, telefono, tipo_documento,
+         numero_documento, password_hash)
+    OUTPUT INSERTED.cliente_id
+    SELECT ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM Clientes WHERE email = ? OR telefono = ?)
+"""
+
+
+def _conflict(row):
+    if row["email"]:
+        return "email"
+    if row["telefono"]:
+        return "telefono"
+    return None
+
+
+def register_client(nombre, email, telefono, tipo_documento, numero_documento, hash_password):
+    """
+    Insertar un cliente si su email y teléfono están libres.
+
+    ``hash_password`` es una función sin argumentos que devuelve el hash;
+    sólo se llama si no hay conflicto conocido. Devuelve ``(cliente_id,
+    None)`` o ``(None, "email" | "telefono")``.
+    """
+    index = get_contact_index()
+    email_tal_vez, telefono_tal_vez = index.might_exist(email, telefono)
+
+    if email_tal_vez or telefono_tal_vez:
+        index.checked += 1
+        conflicto = _conflict(execute_query(_CONFLICTS_SQL, (email, telefono))[0])
+        if conflicto:
+            return None, conflicto
+    else:
+        index.skipped += 1
+
+    (insertado,) = execute_batch([(_INSERT_SQL, (
+        nombre, email, telefono, tipo_documento, numero_documento, hash_password(),
+        email, telefono,
+    ))], commit=True)
+    if not insertado:
+        # Falso negativo (alta fuera de la app) o alta concurrente: averiguar cuál choca
+        conflicto = _conflict(execute_query(_CONFLICTS_SQL, (email, telefono))[0])
+        return None, conflicto or "email"
+    index.add(email, telefono)
+    return insertado[0]["cliente_id"], None
+
+
+def init_app(app):
+    """Registrar el índice de contactos."""
+    app.config.setdefault("CONTACT_INDEX_REFRESH_SECONDS", 3600)
+    app.config.setdefault("CONTACT_INDEX_ERROR_RATE", 0.01)
+    events = app.extensions.get("cache_manager")
+    index = ContactIndex(
+        max_age=app.config["CONTACT_INDEX_REFRESH_SECONDS"],
+        error_rate=app.config["CONTACT_INDEX_ERROR_RATE"],
+        events=events,
+    )
+    if events is not None:
+        events.subscribe("contactos", index.apply_event, reset=index.invalidate)
+    app.extensions["contact_index"] = index
+
+
+def get_contact_index():
+    """Índice de contactos de la app actual."""
+    return current_app.extensions["contact_index"]
@@ -0,0 +1,228 @@
+"""
+Resumen materializado para el dashboard de administración.
+
+Los agregados caros sobre Ventas (conteo, ingresos, ventas por mes y
+modelos más vendidos) se calculan una vez y luego se actualizan de forma
+incremental leyendo sólo las ventas con ``venta_id`` mayor al último
+procesado. Cada reconstrucción de la vista va a SQL Server en un solo
+batch (execute_batch). Delante hay una caché TTL, de modo que varios
+admins con el dashboard abierto comparten el mismo resultado.
+
+Al igual que las consultas originales, los agregados cuentan todas las
+ventas sin importar su estado; la cancelación sólo cambia el estado que
+se muestra en "Ventas recientes". Una recarga completa cada
+``DASHBOARD_SUMMARY_MAX_AGE`` segundos corrige cualquier desviación.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+
+from utils.cache import TTLCache
+from utils.database import execute_batch
+
+logger = logging.getLogger(__name__)
+
+# Carga completa: @hasta fija el corte para que los tres agregados
+# vean el mismo conjunto de ventas.
+_LOAD_STATEMENTS = [
+    "DECLARE @hasta INT = (SELECT ISNULL(MAX(venta_id), 0) FROM Ventas)",
+    """
+    SELECT COUNT(*) AS ventas, SUM(total_venta) AS total, @hasta AS max_id
+    FROM Ventas
+    WHERE venta_id <= @hasta
+    """,
+    # YEAR/MONTH en lugar de FORMAT(): evita evaluar FORMAT por fila
+    """
+    SELECT YEAR(fecha_venta) AS anio, MONTH(fecha_venta) AS mes,
+           SUM(total_venta) AS total
+    FROM Ventas
+    WHERE venta_id <= @hasta
+    GROUP BY YEAR(fecha_venta), MONTH(fecha_venta)
+    """,
+    """
+    SELECT ve.marca, ve.modelo, ve.anio, COUNT(*) AS unidades
+    FROM Ventas v
+    JOIN Detalle_Ventas dv ON v.venta_id = dv.venta_id
+    JOIN Vehiculos ve      ON dv.vehiculo_id = ve.vehiculo_id
+    WHERE v.venta_id <= @hasta
+    GROUP BY ve.marca, ve.modelo, ve.anio
+    """,
+]
+
+# Ventas nuevas desde @desde (el último venta_id ya procesado)
+_CATCH_UP_STATEMENTS = [
+    "DECLARE @hasta INT = (SELECT ISNULL(MAX(venta_id), @desde) FROM Ventas)",
+    """
+    SELECT venta_id, fecha_venta, total_venta
+    FROM Ventas
+    WHERE venta_id > @desde AND venta_id <= @hasta
+    """,
+    """
+    SELECT ve.marca, ve.modelo, ve.anio
+    FROM Detalle_Ventas dv
+    JOIN Vehiculos ve ON dv.vehiculo_id = ve.vehiculo_id
+    WHERE dv.venta_id > @desde AND dv.venta_id <= @hasta
+    """,
+]
+
+# Datos baratos que se consultan en cada reconstrucción de la vista
+_VIEW_STATEMENTS = [
+    """
+    SELECT
+        (SELECT COUNT(*) FROM Vehiculos) AS vehiculos,
+        (SELECT COUNT(*) FROM Clientes WHERE activo = 1) AS clientes
+    """,
+    """
+    SELECT TOP 10
+        v.venta_id,
+        v.fecha_venta,
+        v.total_venta,
+        v.metodo_pago,
+        v.estado_venta,
+        c.nombre_completo AS cliente,
+        e.nombre_completo AS empleado
+    FROM Ventas v
+    JOIN Clientes c ON v.cliente_id = c.cliente_id
+    JOIN Empleados e ON v.empleado_id = e.empleado_id
+    ORDER BY v.fecha_venta DESC
+    """,
+]
+
+
+class DashboardSummary:
+    """Agregados de ventas mantenidos en memoria."""
+
+    def __init__(self, cache_ttl=30, max_age=3600, cache=None):
+        self.cache_ttl = cache_ttl
+        self.max_age = max_age
+        # TTLCache propia o, con varios workers, una caché de utils.shared_cache
+        self._cache = cache if cache is not None else TTLCache(default_ttl=cache_ttl)
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        # Huella de las gráficas del último snapshot servido (versión de la
+        # etiqueta "ventas" de utils.fragments)
+        self.digest = None
+        self._reset()
+
+    def _reset(self):
+        self._ventas = 0
+        self._ingresos = 0
+        self._por_mes = Counter()  # "yyyy-MM" -> total
+        self._modelos = Counter()  # "Marca Modelo Año" -> unidades
+        self._max_venta_id = 0
+
+    # ---------------------------------------------------------------
+    # Carga y actualización incremental
+    # ---------------------------------------------------------------
+    def _needs_load(self):
+        loaded_at = self._loaded_at
+        return loaded_at is None or bool(
+            self.max_age and time.monotonic() - loaded_at > self.max_age
+        )
+
+    def _apply_load(self, totales, por_mes, modelos):
+        totales = totales[0]
+        with self._lock:
+            self._reset()
+            self._ventas = totales["ventas"]
+            self._ingresos = totales["total"] or 0
+            for row in por_mes:
+                self._por_mes[f"{row['anio']:04d}-{row['mes']:02d}"] += row["total"] or 0
+            for row in modelos:
+                self._modelos[_etiqueta(row)] += row["unidades"]
+            self._max_venta_id = totales["max_id"] or 0
+            self._loaded_at = time.monotonic()
+        logger.info(f"📊 Resumen de dashboard cargado ({self._ventas} ventas)")
+
+    def _apply_catch_up(self, desde, ventas, modelos):
+        if not ventas:
+            return
+        with self._lock:
+            if self._max_venta_id != desde:
+                return  # otro hilo ya aplicó estas ventas
+            for v in ventas:
+                self._ventas += 1
+                self._ingresos += v["total_venta"] or 0
+                self._por_mes[v["fecha_venta"].strftime("%Y-%m")] += v["total_venta"] or 0
+            for row in modelos:
+                self._modelos[_etiqueta(row)] += 1
+            self._max_venta_id = max(v["venta_id"] for v in ventas)
+
+    # ---------------------------------------------------------------
+    # API pública
+    # ---------------------------------------------------------------
+    def _build(self):
+        """Actualizar agregados y leer conteos/recientes en un solo batch."""
+        full = self._needs_load()
+        with self._lock:
+            desde = self._max_venta_id
+
+        if full:
+            statements = _LOAD_STATEMENTS + _VIEW_STATEMENTS
+        else:
+            statements = [("DECLARE @desde INT = ?", (desde,))]
+            statements += _CATCH_UP_STATEMENTS + _VIEW_STATEMENTS
+        results = execute_batch(statements)
+
+        if full:
+            self._apply_load(*results[:3])
+        else:
+            self._apply_catch_up(desde, *results[:2])
+        conteos, ventas_recientes = results[-2][0], results[-1]
+
+        with self._lock:
+            periodos = sorted(self._por_mes)
+            top = self._modelos.most_common(5)
+            graficas = (periodos, [self._por_mes[p] for p in periodos], top)
+            return {
+                "graficas_version": hashlib.sha1(repr(graficas).encode("utf-8")).hexdigest()[:16],
+                "stats": {
+                    "vehiculos": conteos["vehiculos"],
+                    "clientes": conteos["clientes"],
+                    "ventas": self._ventas,
+                    "total_ingresos": self._ingresos,
+                },
+                "ventas_recientes": ventas_recientes,
+                "ventas_por_mes_labels": periodos,
+                "ventas_por_mes_valores": [float(self._por_mes[p]) for p in periodos],
+                "top_modelos_labels": [etiqueta for etiqueta, _ in top],
+                "top_modelos_valores": [int(unidades) for _, unidades in top],
+            }
+
+    def snapshot(self):
+        """Datos del dashboard (cacheados ``cache_ttl`` segundos)."""
+        datos = self._cache.get_or_set("dashboard", self._build, self.cache_ttl)
+        # El snapshot puede venir de otro worker: la huella viaja con él
+        self.digest = datos["graficas_version"]
+        return datos
+
+    def invalidate(self):
+        """Una venta, vehículo o cliente cambió: recalcular en la siguiente vista."""
+        self._cache.delete("dashboard")
+
+
+def _etiqueta(row):
+    return f"{row['marca']} {row['modelo']} {row['anio']}"
+
+
+def init_app(app):
+    """Registrar el resumen del dashboard en la app."""
+    app.config.setdefault("DASHBOARD_CACHE_TTL", 30)
+    app.config.setdefault("DASHBOARD_SUMMARY_MAX_AGE", 3600)
+    manager = app.extensions.get("cache_manager")
+    app.extensions["dashboard_summary"] = DashboardSummary(
+        cache_ttl=app.config["DASHBOARD_CACHE_TTL"],
+        max_age=app.config["DASHBOARD_SUMMARY_MAX_AGE"],
+        # Compartido entre workers: todos ven el mismo snapshot
+        cache=manager.cache("dashboard", max_entries=4) if manager is not None else None,
+    )
+
+
+def get_dashboard_summary():
+    """Resumen del dashboard de la app actual."""
+    return current_app.extensions["dashboard_summary"]
@@ -3,51 +3,320 @@ Conexión unificada a SQL Server 2022 Express.
 Elimina todas las referencias a SQLite.
 """
 
-import pyodbc
-from flask import g
+import importlib
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from functools import lru_cache
+from operator import itemgetter
+from flask import g, current_app
 import logging
 from contextlib import contextmanager
-from werkzeug.security import generate_password_hash, check_password_hash
+
+from utils.audit import record_error
+from utils.instrumentation import record_query
+from utils.passwords import get_password_hasher
 
 logger = logging.getLogger(__name__)
 
 
+class _LazyModule:
+    """Importa el módulo en el primer uso (pyodbc carga el driver ODBC)."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+pyodbc = _LazyModule("pyodbc")
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones pyodbc acotado y seguro entre hilos.
+
+    - Mantiene entre ``min_size`` y ``max_size`` conexiones abiertas.
+    - Si no hay conexiones libres y se alcanzó ``max_size``, espera hasta
+      ``timeout`` segundos antes de lanzar ConnectionError.
+    - ``pre_ping`` valida la conexión con ``SELECT 1`` antes de entregarla.
+    - ``recycle`` cierra conexiones con más de N segundos de vida.
+    - Es de un solo proceso: tras un fork (gunicorn con ``preload_app``)
+      el hijo empieza con el pool vacío y nunca usa ni cierra las
+      conexiones heredadas, cuyo socket sigue siendo del padre.
+    """
+
+    def __init__(self, connection_string, min_size=2, max_size=10, timeout=10.0,
+                 pre_ping=True, recycle=3600, connect_timeout=0, connect=None):
+        if max_size < 1:
+            raise ValueError("max_size debe ser al menos 1")
+        self.connection_string = connection_string
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+        self.connect_timeout = connect_timeout
+        # Función de conexión (por defecto pyodbc.connect; el benchmark usa otra)
+        self.connect = connect or (lambda *args, **kwargs: pyodbc.connect(*args, **kwargs))
+
+        self._idle = deque()  # (conn, creada_en)
+        self._created_at = {}  # id(conn) -> creada_en (para las prestadas)
+        self._size = 0
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False  # close_all(): lo que se devuelva se cierra
+        self._pid = os.getpid()
+        self._inherited = []  # conexiones del proceso padre (ver _after_fork)
+
+        if hasattr(os, "register_at_fork"):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+
+        self._stats = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "checkouts": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "recycled": 0,
+        }
+
+    # ---------------------------------------------------------------
+    # Conexiones físicas
+    # ---------------------------------------------------------------
+    def _connect(self):
+        try:
+            conn = self.connect(self.connection_string, timeout=self.connect_timeout)
+        except pyodbc.Error as e:
+            logger.error(f"❌ Error conexión SQL Server: {e}")
+            raise ConnectionError(f"No se pudo conectar a SQL Server: {e}")
+
+        conn.autocommit = False
+        with self._cond:
+            self._stats["connections_opened"] += 1
+        logger.info("✅ Conexión SQL Server Express establecida")
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+            logger.debug("🔌 Conexión SQL Server cerrada")
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["connections_closed"] += 1
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except pyodbc.Error:
+            return False
+
+    def _after_fork(self):
+        """Empezar de cero en el proceso hijo."""
+        # Se guardan sin cerrarlas: al liberarlas, pyodbc se desconectaría
+        # por el socket que el proceso padre todavía usa
+        self._inherited.extend(conn for conn, _ in self._idle)
+        self._idle = deque()
+        self._created_at = {}
+        self._size = 0
+        # El lock pudo quedar tomado por un hilo del padre que no existe aquí
+        self._cond = threading.Condition(threading.Lock())
+        self._closed = False
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # Respaldo por si el fork no pasó por os.register_at_fork
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    # ---------------------------------------------------------------
+    # API pública
+    # ---------------------------------------------------------------
+    def prefill(self):
+        """Abrir conexiones hasta alcanzar min_size."""
+        self._check_pid()
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Obtener una conexión del pool (o abrir una nueva si hay cupo)."""
+        self._check_pid()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            self._stats["checkouts"] += 1
+
+        while True:
+            with self._cond:
+                waited = False
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise ConnectionError(
+                            "Tiempo de espera agotado obteniendo conexión del pool "
+                            f"({self.max_size} conexiones en uso)"
+                        )
+                    if not waited:
+                        self._stats["waits"] += 1
+                        waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, created = self._idle.pop()
+                else:
+                    conn, created = None, None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                created = time.monotonic()
+            elif self.recycle and time.monotonic() - created > self.recycle:
+                with self._cond:
+                    self._stats["recycled"] += 1
+                self._discard(conn)
+                continue
+            elif self.pre_ping and not self._ping(conn):
+                with self._cond:
+                    self._stats["ping_failures"] += 1
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._created_at[id(conn)] = created
+            return conn
+
+    def release(self, conn):
+        """Devolver una conexión al pool, descartando transacciones abiertas."""
+        self._check_pid()
+        with self._cond:
+            if id(conn) not in self._created_at:
+                # Prestada por el proceso padre antes del fork: no es de este pool
+                self._inherited.append(conn)
+                return
+            created = self._created_at.pop(id(conn))
+            closed = self._closed
+
+        if closed:
+            self._discard(conn)
+            return
+
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, created if created is not None else time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._cond.notify()
+        self._close(conn)
+
+    def close_all(self):
+        """
+        Cerrar todas las conexiones libres; las prestadas se cierran al
+        devolverse. El pool sigue entregando conexiones, pero ya no las
+        guarda (antes de un fork no debe quedar ninguna abierta).
+        """
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        """Estadísticas del pool."""
+        with self._cond:
+            data = dict(self._stats)
+            data.update(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+                min_size=self.min_size,
+                max_size=self.max_size,
+            )
+        return data
+
+    @classmethod
+    def from_config(cls, config):
+        engine_options = config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+        connect_args = engine_options.get("connect_args") or {}
+        return cls(
+            config["DB_CONNECTION_STRING"],
+            min_size=config.get("DB_POOL_MIN_SIZE", 2),
+            max_size=config.get("DB_POOL_MAX_SIZE", 10),
+            timeout=config.get("DB_POOL_TIMEOUT", 10.0),
+            pre_ping=engine_options.get("pool_pre_ping", True),
+            recycle=engine_options.get("pool_recycle", 3600),
+            connect_timeout=connect_args.get("timeout", 0),
+            connect=config.get("DB_CONNECT_FACTORY"),
+        )
+
+
+def get_pool():
+    """Pool de conexiones de la app actual."""
+    return current_app.extensions["sqlserver_pool"]
+
+
 class SQLServerConnection:
     """Manejador de conexión unificado a SQL Server Express"""
 
     @staticmethod
     def get_connection():
-        """Obtener conexión desde el contexto de Flask"""
+        """Obtener conexión del pool para el contexto de Flask"""
         if "sqlserver_conn" not in g:
-            try:
-                # Conexión a la instancia local SQLEXPRESS y BD RustEze_Agency
-                connection_string = (
-                    "DRIVER={ODBC Driver 17 for SQL Server};"
-                    "SERVER=localhost\\SQLEXPRESS;"
-                    "DATABASE=RustEze_Agency;"
-                    "Trusted_Connection=yes;"
-                )
-
-                g.sqlserver_conn = pyodbc.connect(connection_string)
-                g.sqlserver_conn.autocommit = False
-                logger.info("✅ Conexión SQL Server Express establecida")
-
-            except pyodbc.Error as e:
-                logger.error(f"❌ Error conexión SQL Server: {e}")
-                raise ConnectionError(f"No se pudo conectar a SQL Server: {e}")
+            g.sqlserver_conn = get_pool().acquire()
 
         return g.sqlserver_conn
 
     @staticmethod
     def close_connection(e=None):
-        """Cerrar conexión al final del contexto"""
+        """Devolver la conexión al pool al final del contexto"""
         conn = g.pop("sqlserver_conn", None)
         if conn is not None:
-            try:
-                conn.close()
-                logger.debug("🔌 Conexión SQL Server cerrada")
-            except Exception:
-                pass
+            get_pool().release(conn)
 
 
 @contextmanager
@@ -64,27 +333,112 @@ def get_cursor():
         cursor.close()
 
 
-def execute_query(query, params=None, fetch=True):
+class Row(tuple):
+    """
+    Fila compacta de resultado (tupla con nombres de columna).
+
+    Admite ``row["col"]``, ``row.col``, ``row[0]`` y ``row.get("col")``,
+    igual que los dicts que devuelve execute_query por defecto, pero sin
+    crear un dict por fila. Es de solo lectura; iterarla devuelve valores.
+    """
+
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return tuple(zip(self._fields, self))
+
+    def _asdict(self):
+        return dict(zip(self._fields, self))
+
+    def __repr__(self):
+        pares = ", ".join(f"{k}={v!r}" for k, v in zip(self._fields, self))
+        return f"Row({pares})"
+
+    def __reduce__(self):
+        # Las clases Row se crean al vuelo; pickle las reconstruye por columnas
+        return _make_row, (self._fields, tuple(self))
+
+
+@lru_cache(maxsize=256)
+def _row_class(columns):
+    """Clase Row (cacheada) para una firma de columnas."""
+    namespace = {
+        "__slots__": (),
+        "_fields": columns,
+        "_index": {name: i for i, name in enumerate(columns)},
+    }
+    for i, name in enumerate(columns):
+        if name.isidentifier() and not hasattr(Row, name):
+            namespace[name] = property(itemgetter(i))
+    return type("Row", (Row,), namespace)
+
+
+def _make_row(columns, values):
+    return tuple.__new__(_row_class(columns), values)
+
+
+@lru_cache(maxsize=1024)
+def _returns_rows(query):
+    """¿La sentencia es un SELECT? (cacheado por texto de consulta)"""
+    return query.lstrip().upper().startswith("SELECT")
+
+
+def _fetch_results(cursor, as_rows=False):
+    """Materializar el resultset actual del cursor como dicts o Rows."""
+    columns = tuple(col[0] for col in cursor.description) if cursor.description else ()
+    if as_rows:
+        cls = _row_class(columns)
+        new = tuple.__new__
+        return [new(cls, row) for row in cursor.fetchall()]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def execute_query(query, params=None, fetch=True, as_rows=False):
     """
     Ejecutar consulta SQL con manejo de errores.
     Devuelve lista de dicts si es SELECT, o dict con rows_affected en DML.
+    Con as_rows=True devuelve filas Row (más ligeras) en lugar de dicts.
     """
+    inicio = time.perf_counter()
     try:
         with get_cursor() as cursor:
+            inicio = time.perf_counter()
             if params:
                 cursor.execute(query, params)
             else:
                 cursor.execute(query)
 
-            if fetch and query.strip().upper().startswith("SELECT"):
-                columns = [col[0] for col in cursor.description] if cursor.description else []
-                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                return results
+            if fetch and _returns_rows(query):
+                rows = _fetch_results(cursor, as_rows)
+                record_query("execute_query", query, time.perf_counter() - inicio, len(rows))
+                return rows
             else:
                 cursor.connection.commit()
+                record_query("execute_query", query, time.perf_counter() - inicio, cursor.rowcount)
                 return {"success": True, "rows_affected": cursor.rowcount}
 
     except pyodbc.Error as e:
+        record_query("execute_query", query, time.perf_counter() - inicio, error=e)
         logger.error(f"Error en execute_query: {e}")
 
         try:
@@ -93,37 +447,120 @@ def execute_query(query, params=None, fetch=True):
         except Exception:
             pass
 
-        # Registrar error en auditoría (si la tabla existe)
-        try:
-            error_query = """
-                INSERT INTO Auditoria_Errores (procedimiento, mensaje_error, numero_error, usuario)
-                VALUES (?, ?, ?, ?)
-            """
-            with get_cursor() as error_cursor:
-                error_cursor.execute(
-                    error_query,
-                    ("execute_query", str(e), 0, "SYSTEM"),
-                )
-                error_cursor.connection.commit()
-        except Exception:
-            pass
+        # Registrar error en auditoría (asíncrono, ver utils.audit)
+        record_error("execute_query", e)
 
         raise e
 
 
-def call_stored_procedure(proc_name, params=None):
+def execute_batch(statements, as_rows=True, commit=False):
     """
-    Ejecutar procedimiento almacenado con parámetros en dbo de RustEze_Agency.
-    IMPORTANTE: siempre hacer COMMIT aunque el SP devuelva filas.
+    Ejecutar varias sentencias en un solo viaje al servidor.
+
+    ``statements`` es una lista de SQL o de tuplas ``(sql, params)``; se
+    envían juntas como un batch y se devuelve una lista con un resultset
+    por cada sentencia que produce filas (en el mismo orden), leídos con
+    ``cursor.nextset()``. Sentencias como DECLARE/SET no producen
+    resultset, así que pueden usarse para compartir variables. Con
+    ``commit=True`` el batch puede modificar datos (INSERT ... OUTPUT).
+    """
+    parts, params = ["SET NOCOUNT ON"], []
+    for statement in statements:
+        if isinstance(statement, str):
+            sql, stmt_params = statement, ()
+        else:
+            sql, stmt_params = statement
+        parts.append(sql.strip().rstrip(";"))
+        params.extend(stmt_params or ())
+    batch = ";\n".join(parts) + ";"
+
+    inicio = time.perf_counter()
+    try:
+        with get_cursor() as cursor:
+            inicio = time.perf_counter()
+            if params:
+                cursor.execute(batch, params)
+            else:
+                cursor.execute(batch)
+
+            results = []
+            while True:
+                if cursor.description:
+                    results.append(_fetch_results(cursor, as_rows))
+                if not cursor.nextset():
+                    break
+            if commit:
+                cursor.connection.commit()
+            record_query(
+                "execute_batch", batch, time.perf_counter() - inicio,
+                sum(len(rows) for rows in results),
+            )
+            return results
+
+    except pyodbc.Error as e:
+        record_query("execute_batch", batch, time.perf_counter() - inicio, error=e)
+        logger.error(f"Error en execute_batch: {e}")
+
+        # Registrar error en auditoría (asíncrono, ver utils.audit)
+        record_error("execute_batch", e)
+
+        raise e
+
+
+def iter_query(query, params=None, batch_size=500):
+    """
+    Recorrer un SELECT en bloques de ``batch_size`` con fetchmany,
+    devolviendo filas Row sin materializar todo el resultset.
     """
+    with get_cursor() as cursor:
+        inicio = time.perf_counter()
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+
+        # Sólo se mide el tiempo en el driver, no lo que hace el consumidor
+        duracion = time.perf_counter() - inicio
+        total = 0
+
+        columns = tuple(col[0] for col in cursor.description) if cursor.description else ()
+        cls = _row_class(columns)
+        new = tuple.__new__
+        try:
+            while True:
+                t0 = time.perf_counter()
+                batch = cursor.fetchmany(batch_size)
+                duracion += time.perf_counter() - t0
+                if not batch:
+                    break
+                total += len(batch)
+                for row in batch:
+                    yield new(cls, row)
+        finally:
+            record_query("iter_query", query, duracion, total)
+
+
+def is_transient_error(error):
+    """
+    Interbloqueo (1205) o tiempo de espera de bloqueo (1222): SQL Server
+    ya deshizo la sentencia y repetirla puede funcionar.
+    """
+    sqlstate = error.args[0] if error.args else ""
+    texto = " ".join(str(arg) for arg in error.args)
+    return sqlstate == "40001" or "(1205)" in texto or "(1222)" in texto
+
+
+def _run_procedure(proc_name, params):
+    sql = f"EXEC dbo.{proc_name}"
+    inicio = time.perf_counter()
     try:
         with get_cursor() as cursor:
+            inicio = time.perf_counter()
             if params:
                 placeholders = ', '.join(['?'] * len(params))
                 sql = f"EXEC dbo.{proc_name} {placeholders}"
                 cursor.execute(sql, params)
             else:
-                sql = f"EXEC dbo.{proc_name}"
                 cursor.execute(sql)
 
             rows = None
@@ -134,6 +571,10 @@ def call_stored_procedure(proc_name, params=None):
 
             # AQUÍ el cambio importante: SIEMPRE COMMIT
             cursor.connection.commit()
+            record_query(
+                "call_stored_procedure", sql, time.perf_counter() - inicio,
+                len(rows) if rows is not None else cursor.rowcount,
+            )
 
             if rows is not None:
                 return rows
@@ -141,30 +582,64 @@ def call_stored_procedure(proc_name, params=None):
                 return {"success": True, "rows_affected": cursor.rowcount}
 
     except pyodbc.Error as e:
-        logger.error(f"Error en {proc_name}: {e}")
+        record_query("call_stored_procedure", sql, time.perf_counter() - inicio, error=e)
+        raise
+
+
+def call_stored_procedure(proc_name, params=None, retries=None):
+    """
+    Ejecutar procedimiento almacenado con parámetros en dbo de RustEze_Agency.
+    IMPORTANTE: siempre hacer COMMIT aunque el SP devuelva filas.
+
+    Si SQL Server elige la transacción como víctima de un interbloqueo o
+    se agota la espera de un bloqueo, se reintenta hasta ``retries`` veces
+    (por defecto ``DB_DEADLOCK_RETRIES``) con una espera corta y aleatoria.
+    """
+    if retries is None:
+        retries = current_app.config.get("DB_DEADLOCK_RETRIES", 2)
+    espera = current_app.config.get("DB_RETRY_BACKOFF", 0.05)
 
-        # Registrar error en auditoría
+    for intento in range(retries + 1):
         try:
-            error_query = """
-                INSERT INTO Auditoria_Errores (procedimiento, mensaje_error, numero_error, usuario)
-                VALUES (?, ?, ?, ?)
-            """
-            with get_cursor() as error_cursor:
-                error_cursor.execute(error_query, (proc_name, str(e), 0, 'SYSTEM'))
-                error_cursor.connection.commit()
-        except Exception:
-            pass
+            return _run_procedure(proc_name, params)
+        except pyodbc.Error as e:
+            if intento < retries and is_transient_error(e):
+                logger.warning(f"⚠️ {proc_name}: conflicto de bloqueo, reintento {intento + 1}/{retries}")
+                time.sleep(espera * (2 ** intento) * random.uniform(0.5, 1.5))
+                continue
+            logger.error(f"Error en {proc_name}: {e}")
 
-        raise e
+            # Registrar error en auditoría (asíncrono, ver utils.audit)
+            record_error(proc_name, e)
+
+            raise e
 
 def init_app(app):
     """Inicializar extensión con Flask app"""
+    for key, default in (
+        ("DB_POOL_MIN_SIZE", 2),
+        ("DB_POOL_MAX_SIZE", 10),
+        ("DB_POOL_TIMEOUT", 10.0),
+        ("DB_LAZY_INIT", True),
+        ("DB_DEADLOCK_RETRIES", 2),
+        ("DB_RETRY_BACKOFF", 0.05),
+    ):
+        app.config.setdefault(key, default)
+
+    app.extensions["sqlserver_pool"] = ConnectionPool.from_config(app.config)
     app.teardown_appcontext(SQLServerConnection.close_connection)
 
+    if app.config["DB_LAZY_INIT"]:
+        # Se conecta con la primera consulta; utils.health verifica en segundo plano
+        return
+
     # Verificar conexión al inicio
     with app.app_context():
         try:
             test = execute_query("SELECT @@VERSION AS version")
+            get_pool().prefill()
+            # utils.health toma el resultado de aquí en vez de volver a consultar
+            app.extensions["sqlserver_version"] = test[0]["version"]
             logger.info(f"✅ SQL Server inicializado: {test[0]['version'][:50]}...")
         except Exception as e:
             logger.error(f"❌ Error inicialización SQL Server: {e}")
@@ -180,8 +655,8 @@ class User:
 
     @staticmethod
     def hash_password(password: str) -> str:
-        """Generar hash seguro de contraseña."""
-        return generate_password_hash(password)
+        """Generar hash seguro de contraseña (en el pool de utils.passwords)."""
+        return get_password_hasher().hash(password)
 
     @staticmethod
     def authenticate(email, password, is_admin=False):
@@ -189,82 +664,112 @@ class User:
         Autenticar usuario contra SQL Server.
 
         1) Busca por email y activo = 1.
-        2) Compara contraseña con check_password_hash.
+        2) Compara la contraseña en el pool de hash (utils.passwords).
+        3) Si el valor guardado está en texto plano o con parámetros
+           viejos, lo vuelve a calcular en segundo plano.
+
+        HasherBusy se propaga: no es lo mismo que credenciales inválidas.
         """
-        try:
-            if is_admin:
-                query = """
-                    SELECT 
-                        empleado_id AS id,
-                        nombre_completo,
-                        email,
-                        puesto,
-                        es_administrador,
-                        password_hash
-                    FROM Empleados
-                    WHERE email = ? AND activo = 1
-                """
-            else:
-                query = """
-                    SELECT 
-                        cliente_id AS id,
-                        nombre_completo,
-                        email,
-                        telefono,
-                        password_hash,
-                        activo
-                    FROM Clientes
-                    WHERE email = ? AND activo = 1
-                """
+        if is_admin:
+            tabla, id_col = "Empleados", "empleado_id"
+            query = """
+                SELECT 
+                    empleado_id AS id,
+                    nombre_completo,
+                    email,
+                    puesto,
+                    es_administrador,
+                    password_hash
+                FROM Empleados
+                WHERE email = ? AND activo = 1 AND es_administrador = 1
+            """
+        else:
+            tabla, id_col = "Clientes", "cliente_id"
+            query = """
+                SELECT 
+                    cliente_id AS id,
+                    nombre_completo,
+                    email,
+                    telefono,
+                    direccion,
+                    fecha_registro,
+                    password_hash,
+                    activo
+                FROM Clientes
+                WHERE email = ? AND activo = 1
+            """
 
+        try:
             rows = execute_query(query, (email,))
-            if not rows:
-                return None
+        except Exception as e:
+            logger.error(f"Error en autenticación: {e}")
+            return None
+        if not rows:
+            return None
 
-            user = rows[0]
+        user = rows[0]
 
-            # Validar contraseña
-            if not check_password_hash(user["password_hash"], password):
-                return None
+        # Validar contraseña
+        hasher = get_password_hasher()
+        guardado = user.pop("password_hash", None)  # No exponer hash
+        if not hasher.verify(guardado, password):
+            return None
 
-            # No exponer hash
-            user.pop("password_hash", None)
+        if hasher.needs_rehash(guardado):
+            def guardar(nuevo, user_id=user["id"]):
+                execute_query(
+                    f"UPDATE {tabla} SET password_hash = ? WHERE {id_col} = ? AND password_hash = ?",
+                    (nuevo, user_id, guardado),
+                    fetch=False,
+                )
+                logger.info(f"🔐 Hash de contraseña actualizado ({tabla} {user_id})")
 
-            # Campos de compatibilidad usados en la app
-            if is_admin:
-                user["empleado_id"] = user["id"]
-                user["es_administrador"] = True
-                user["tipo"] = "admin"
-            else:
-                user["cliente_id"] = user["id"]
-                user["es_administrador"] = False
-                user["tipo"] = "client"
+            hasher.rehash_later(current_app._get_current_object(), password, guardar)
 
-            return user
+        # Campos de compatibilidad usados en la app
+        if is_admin:
+            user["empleado_id"] = user["id"]
+            user["es_administrador"] = True
+            user["tipo"] = "admin"
+        else:
+            user["cliente_id"] = user["id"]
+            user["es_administrador"] = False
+            user["tipo"] = "client"
 
-        except Exception as e:
-            logger.error(f"Error en autenticación: {e}")
-            return None
+        # Las siguientes peticiones de la sesión no vuelven a leer el registro
+        cache = current_app.extensions.get("user_cache")
+        if cache is not None:
+            cache.put(is_admin, user["id"], user)
+
+        return user
+
+    @staticmethod
+    def load_by_id(user_id, is_admin=False):
+        """Leer de SQL Server el usuario activo (None si no existe o está inactivo)."""
+        if is_admin:
+            query = """
+                SELECT empleado_id, nombre_completo, email, puesto, es_administrador
+                FROM Empleados
+                WHERE empleado_id = ? AND activo = 1
+            """
+        else:
+            query = """
+                SELECT cliente_id, nombre_completo, email, telefono, direccion, fecha_registro
+                FROM Clientes
+                WHERE cliente_id = ? AND activo = 1
+            """
+
+        result = execute_query(query, (user_id,))
+        return result[0] if result else None
 
     @staticmethod
     def get_by_id(user_id, is_admin=False):
-        """Obtener usuario por ID"""
+        """Obtener usuario por ID (desde la caché de utils.users)"""
         try:
-            if is_admin:
-                query = """
-                    SELECT empleado_id, nombre_completo, email, puesto, es_administrador
-                    FROM Empleados
-                    WHERE empleado_id = ? AND activo = 1
-                """
-            else:
-                query = """
-                    SELECT cliente_id, nombre_completo, email, telefono, direccion
-                    FROM Clientes
-                    WHERE cliente_id = ? AND activo = 1
-                """
-
-            result = execute_query(query, (user_id,))
-            return result[0] if result else None
+            cache = current_app.extensions.get("user_cache")
+            if cache is not None:
+                return cache.get(is_admin, user_id)
+            return User.load_by_id(user_id, is_admin)
 
         except Exception as e:
             logger.error(f"Error obteniendo usuario: {e}")
@@ -0,0 +1,170 @@
+"""
+Caché de fragmentos de plantilla.
+
+Las plantillas pueden envolver bloques caros (la grilla de tarjetas del
+catálogo, las gráficas del dashboard...) en::
+
+    {% cache ("catalogo-grid", filtros, orden, pagina.page), 300, "inventario" %}
+        ...
+    {% endcache %}
+
+El primer argumento es la clave (cualquier expresión con ``repr``
+estable), el segundo el TTL en segundos (opcional, por defecto
+``FRAGMENT_CACHE_TTL``) y el resto, etiquetas de las que depende el
+bloque. Cada etiqueta aporta una versión a la clave, así que cuando
+cambian los datos la entrada vieja simplemente deja de usarse (y el LRU
+la descarta):
+
+- ``inventario``: huella del índice de inventario (utils.inventory);
+  cambia con cualquier alta, edición, baja o venta de un vehículo.
+- ``ventas``: huella de los agregados del dashboard (utils.dashboard).
+- ``imagenes``: variantes de fotos generadas (utils.images), para no
+  seguir sirviendo la foto original cuando ya existe la redimensionada.
+
+Las huellas de inventario y ventas dependen del contenido y no del
+proceso, así que los fragmentos se guardan en la caché de
+utils.shared_cache y, con ``CACHE_BACKEND`` compartido, un worker
+reutiliza lo que renderizó otro. ``invalidate_fragments(*tags)``
+fuerza además una nueva versión de esas etiquetas en todos los workers.
+
+Los fragmentos no deben incluir datos de la sesión (nombre del usuario,
+tokens...): se comparten entre todos los usuarios.
+"""
+
+import hashlib
+import threading
+
+from flask import current_app, has_app_context
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from utils.cache import LRUCache
+
+
+class FragmentCache:
+    """HTML renderizado por clave y versión de sus etiquetas."""
+
+    def __init__(self, store, default_ttl=300, namespace="", events=None):
+        self.store = store  # get(key) / set(key, value, ttl)
+        self.default_ttl = default_ttl
+        self.namespace = namespace  # versión de las plantillas
+        self.events = events  # utils.shared_cache.CacheManager
+        self._providers = {}  # etiqueta -> fn() con la versión actual
+        self._generations = {}  # etiqueta -> contador de invalidate()
+        self._lock = threading.Lock()
+
+    def register_tag(self, tag, provider):
+        """Asociar a ``tag`` una función que devuelve su versión actual."""
+        self._providers[tag] = provider
+
+    def invalidate(self, *tags):
+        self._bump(*tags)
+        if self.events is not None:
+            self.events.publish("fragmentos", *tags)
+
+    def _bump(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def _version(self, tag):
+        provider = self._providers.get(tag)
+        return (provider() if provider else None, self._generations.get(tag, 0))
+
+    def make_key(self, key, tags=()):
+        versiones = tuple((tag, self._version(tag)) for tag in tags)
+        raw = repr((self.namespace, key, versiones)).encode("utf-8")
+        return "fragment:" + hashlib.sha1(raw).hexdigest()
+
+    def render(self, key, ttl, tags, render):
+        """HTML cacheado de ``key`` o el resultado de ``render()``."""
+        full_key = self.make_key(key, tags)
+        html = self.store.get(full_key)
+        if html is None:
+            html = str(render())
+            self.store.set(full_key, html, ttl or self.default_ttl)
+        return Markup(html)
+
+
+class FragmentCacheExtension(Extension):
+    """Etiqueta ``{% cache clave[, ttl[, etiqueta...]] %}...{% endcache %}``."""
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = parser.parse_expression()
+        ttl = nodes.Const(None)
+        tags = []
+        if parser.stream.skip_if("comma"):
+            ttl = parser.parse_expression()
+            while parser.stream.skip_if("comma"):
+                tags.append(parser.parse_expression())
+
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method("_render", [key, ttl, nodes.List(tags)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render(self, key, ttl, tags, caller):
+        cache = current_app.extensions.get("fragment_cache") if has_app_context() else None
+        if cache is None:
+            return caller()
+        return cache.render(key, ttl, tags, caller)
+
+
+def _register_default_tags(app, cache):
+    def inventario():
+        return app.extensions["inventory_index"].digest
+
+    def ventas():
+        return app.extensions["dashboard_summary"].digest
+
+    def imagenes():
+        return app.extensions["image_pipeline"].generation
+
+    cache.register_tag("inventario", inventario)
+    cache.register_tag("ventas", ventas)
+    cache.register_tag("imagenes", imagenes)
+
+
+def init_app(app):
+    """Registrar la etiqueta ``{% cache %}`` y la caché de fragmentos."""
+    app.config.setdefault("FRAGMENT_CACHE_ENABLED", True)
+    app.config.setdefault("FRAGMENT_CACHE_SIZE", 512)
+    app.config.setdefault("FRAGMENT_CACHE_TTL", 300)
+
+    # La etiqueta se registra siempre: sin caché el bloque se renderiza tal cual
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    if not app.config["FRAGMENT_CACHE_ENABLED"]:
+        return
+
+    manager = app.extensions.get("cache_manager")
+    if manager is not None:
+        store = manager.cache("fragmentos", max_entries=app.config["FRAGMENT_CACHE_SIZE"])
+    else:
+        store = LRUCache(max_entries=app.config["FRAGMENT_CACHE_SIZE"])
+
+    cache = FragmentCache(
+        store,
+        default_ttl=app.config["FRAGMENT_CACHE_TTL"],
+        # Si cambian las plantillas cambian todas las claves (ver utils.http)
+        namespace=app.extensions.get("http_build_id", ""),
+        events=manager,
+    )
+    if manager is not None:
+        manager.subscribe("fragmentos", cache._bump)
+    _register_default_tags(app, cache)
+    app.extensions["fragment_cache"] = cache
+
+
+def get_fragment_cache():
+    """Caché de fragmentos de la app actual (None si está desactivada)."""
+    return current_app.extensions.get("fragment_cache")
+
+
+def invalidate_fragments(*tags):
+    """Descartar los fragmentos que dependen de ``tags`` (en todos los workers)."""
+    cache = get_fragment_cache()
+    if cache is not None:
+        cache.invalidate(*tags)
@@ -0,0 +1,260 @@
+"""
+Endpoints de liveness y readiness para el balanceador.
+
+- ``HEALTH_LIVE_PATH`` (``/health``): el proceso responde. No toca la
+  base ni la sesión; siempre 200.
+- ``HEALTH_READY_PATH`` (``/ready``): el worker puede atender tráfico.
+  Informa la saturación del pool, la latencia del último ``SELECT 1`` y
+  si existen las tablas de auditoría. 503 si SQL Server no responde o no
+  hay conexión libre en ``HEALTH_PING_TIMEOUT`` segundos (pool agotado);
+  que falten tablas de auditoría se informa pero no saca al worker.
+  El resultado se cachea ``HEALTH_CACHE_SECONDS`` y sólo un hilo sondea
+  a la vez, así que los health checks no pueden convertirse en carga.
+
+Con ``DB_LAZY_INIT`` (por defecto) ``create_app`` ya no se conecta a SQL
+Server: la primera consulta abre la conexión y ``DatabaseStatus``
+verifica en un hilo aparte que el servidor responda (``SELECT
+@@VERSION``) y el esquema. El hilo se lanza con la primera petición (o en
+el calentamiento del worker), nunca en ``create_app``: con
+``preload_app`` esa corre en el maestro de gunicorn, antes del fork.
+Mientras tanto ``/ready`` responde 503 (se reintenta cada
+``HEALTH_RETRY_SECONDS``); así un SQL Server lento no detiene el
+arranque de los workers, el balanceador simplemente no les envía
+tráfico hasta que estén listos. Sin ``DB_LAZY_INIT`` se usa la versión
+que utils.database ya obtuvo al arrancar, sin repetir la consulta.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from flask import current_app, jsonify, request
+
+from utils.database import execute_query
+
+logger = logging.getLogger(__name__)
+
+AUDIT_TABLES = ("Auditoria_Ventas", "Auditoria_Vehiculos", "Auditoria_Errores")
+
+_AUDIT_TABLES_SQL = """
+    SELECT TABLE_NAME
+    FROM INFORMATION_SCHEMA.TABLES
+    WHERE TABLE_NAME IN ('Auditoria_Ventas', 'Auditoria_Vehiculos', 'Auditoria_Errores')
+"""
+
+_STARTED_AT = time.time()
+
+
+def _missing(presentes):
+    return [tabla for tabla in AUDIT_TABLES if tabla not in presentes]
+
+
+def check_audit_tables():
+    """Tablas de auditoría que faltan en la base (lista vacía si están todas)."""
+    return _missing({row["TABLE_NAME"] for row in execute_query(_AUDIT_TABLES_SQL)})
+
+
+class DatabaseStatus:
+    """Resultado de la última verificación de SQL Server y del esquema."""
+
+    PENDING, OK, ERROR = "pendiente", "ok", "error"
+
+    def __init__(self, app, retry_after=5.0):
+        self.app = app
+        self.retry_after = retry_after
+        self.state = self.PENDING
+        self.version = None
+        self.missing_tables = []
+        self.error = None
+        self.checked_at = None  # time.time() de la última verificación
+        self.duration = None  # segundos
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == self.OK
+
+    def check(self):
+        """Verificar ahora (bloquea); devuelve True si la base respondió."""
+        inicio = time.perf_counter()
+        try:
+            with self.app.app_context():
+                version = execute_query("SELECT @@VERSION AS version")[0]["version"]
+                faltan = check_audit_tables()
+        except Exception as e:
+            self.state, self.error = self.ERROR, str(e)
+            logger.error(f"❌ SQL Server no disponible: {e}")
+        else:
+            self.mark_ok(version, faltan)
+            logger.info(f"✅ SQL Server verificado: {version[:50]}...")
+            if faltan:
+                logger.warning(f"⚠️ Faltan tablas de auditoría: {', '.join(faltan)}")
+                logger.warning("   Ejecuta el script BD_Definitiva.txt en SQL Server")
+        finally:
+            self.duration = time.perf_counter() - inicio
+            self.checked_at = time.time()
+        return self.ready
+
+    def mark_ok(self, version, missing_tables=()):
+        """Registrar una verificación hecha en otro lado (p. ej. al arrancar)."""
+        self.version, self.missing_tables, self.error = version, list(missing_tables), None
+        self.state = self.OK
+        if self.checked_at is None:
+            self.checked_at, self.duration = time.time(), 0.0
+
+    def start(self):
+        """Verificar en segundo plano si aún no hay un resultado válido."""
+        if self.ready:
+            return
+        with self._lock:
+            # El hilo es del proceso que lo creó (tras fork se vuelve a lanzar)
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self.state == self.ERROR and time.time() - self.checked_at < self.retry_after:
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self.check, name="db-check", daemon=True)
+            self._thread.start()
+
+    def as_dict(self):
+        return {
+            "estado": self.state,
+            "version": self.version[:80] if self.version else None,
+            "tablas_auditoria_faltantes": self.missing_tables,
+            "error": self.error,
+            "verificado_hace_s": (
+                round(time.time() - self.checked_at, 1) if self.checked_at else None
+            ),
+            "duracion_ms": round(self.duration * 1000, 1) if self.duration else None,
+        }
+
+
+class ReadinessProbe:
+    """Sondeo de pool y base, cacheado unos segundos y de a un hilo."""
+
+    def __init__(self, pool, status, cache_seconds=5.0, ping_timeout=1.0):
+        self.pool = pool
+        self.status = status
+        self.cache_seconds = cache_seconds
+        self.ping_timeout = ping_timeout
+        self._last = None  # (monotonic, listo, cuerpo)
+        self._lock = threading.Lock()
+
+    def result(self):
+        """``(listo, cuerpo)`` del último sondeo, renovándolo si expiró."""
+        last = self._last
+        if last is not None and time.monotonic() - last[0] < self.cache_seconds:
+            return last[1], last[2]
+        # Si otro hilo ya está sondeando, se responde con el resultado anterior
+        if not self._lock.acquire(blocking=last is None):
+            return last[1], last[2]
+        try:
+            listo, cuerpo = self._probe()
+            self._last = (time.monotonic(), listo, cuerpo)
+            return listo, cuerpo
+        finally:
+            self._lock.release()
+
+    def _probe(self):
+        stats = self.pool.stats()
+        pool = {
+            "en_uso": stats["in_use"],
+            "libres": stats["idle"],
+            "maximo": stats["max_size"],
+            "saturacion": round(stats["in_use"] / stats["max_size"], 2),
+            "esperas": stats["waits"],
+            "timeouts": stats["timeouts"],
+        }
+        cuerpo = {"pool": pool, "inicio": self.status.as_dict()}
+
+        if not self.status.ready:
+            self.status.start()
+            cuerpo["error"] = "verificación inicial de la base pendiente o fallida"
+            return False, cuerpo
+
+        try:
+            ping_ms, faltan = self._ping()
+        except Exception as e:
+            cuerpo["error"] = str(e)
+            return False, cuerpo
+
+        cuerpo["ping_ms"] = round(ping_ms, 2)
+        cuerpo["tablas_auditoria"] = {t: t not in faltan for t in AUDIT_TABLES}
+        if faltan:
+            cuerpo["advertencias"] = [f"Falta la tabla {t}" for t in faltan]
+        return True, cuerpo
+
+    def _ping(self):
+        # Conexión del pool directa (sin g): con el pool agotado falla rápido
+        conn = self.pool.acquire(timeout=self.ping_timeout)
+        try:
+            cursor = conn.cursor()
+            try:
+                inicio = time.perf_counter()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                ping_ms = (time.perf_counter() - inicio) * 1000
+                cursor.execute(_AUDIT_TABLES_SQL)
+                faltan = _missing({row[0] for row in cursor.fetchall()})
+            finally:
+                cursor.close()
+        finally:
+            self.pool.release(conn)
+        return ping_ms, faltan
+
+
+def liveness():
+    return jsonify({
+        "estado": "vivo",
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - _STARTED_AT, 1),
+    })
+
+
+def readiness():
+    listo, cuerpo = current_app.extensions["readiness_probe"].result()
+    response = jsonify({"listo": listo, **cuerpo})
+    response.status_code = 200 if listo else 503
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+def init_app(app):
+    """Lanzar la verificación de la base y registrar liveness/readiness."""
+    app.config.setdefault("HEALTH_LIVE_PATH", "/health")
+    app.config.setdefault("HEALTH_READY_PATH", "/ready")
+    app.config.setdefault("HEALTH_RETRY_SECONDS", 5.0)
+    app.config.setdefault("HEALTH_CACHE_SECONDS", 5.0)
+    app.config.setdefault("HEALTH_PING_TIMEOUT", 1.0)
+
+    status = DatabaseStatus(app, retry_after=app.config["HEALTH_RETRY_SECONDS"])
+    app.extensions["db_status"] = status
+    app.extensions["readiness_probe"] = ReadinessProbe(
+        app.extensions["sqlserver_pool"],
+        status,
+        cache_seconds=app.config["HEALTH_CACHE_SECONDS"],
+        ping_timeout=app.config["HEALTH_PING_TIMEOUT"],
+    )
+    app.add_url_rule(app.config["HEALTH_LIVE_PATH"], endpoint="liveness", view_func=liveness)
+    app.add_url_rule(app.config["HEALTH_READY_PATH"], endpoint="readiness", view_func=readiness)
+
+    if app.config.get("DB_LAZY_INIT", True):
+        # No se lanza aquí: con preload_app create_app corre en el maestro de
+        # gunicorn y el hilo tomaría una conexión que heredarían los workers.
+        # La lanza la primera petición (o el calentamiento del worker).
+        @app.before_request
+        def verificar_base():
+            if not status.ready and request.endpoint != "liveness":
+                status.start()
+    else:
+        # utils.database ya verificó la conexión de forma síncrona; las
+        # tablas de auditoría las revisa /ready en cada sondeo
+        status.mark_ok(app.extensions["sqlserver_version"])
+
+
+def get_db_status():
+    """Estado de la verificación de la base de la app actual."""
+    return current_app.extensions["db_status"]
@@ -0,0 +1,177 @@
+"""
+Compresión de respuestas y GET condicional.
+
+- Las respuestas de texto (HTML, JSON...) de más de ``COMPRESS_MIN_SIZE``
+  bytes se comprimen con brotli (si está instalado) o gzip según
+  ``Accept-Encoding``. Los estáticos no pasan por aquí: utils.assets
+  los sirve ya precomprimidos.
+- ``@conditional(huella)`` agrega ETag/Last-Modified a vistas de sólo
+  lectura. Si el navegador ya tiene la versión vigente, responde 304 sin
+  ejecutar la vista (ni plantilla ni consultas). ``huella`` devuelve
+  ``(valor, modificado_en)``; p. ej. ``inventory_validator`` para las
+  páginas que dependen sólo del inventario.
+"""
+
+import gzip
+import hashlib
+import os
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+
+from utils.inventory import get_inventory
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/plain",
+    "text/css",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "image/svg+xml",
+}
+
+
+# -------------------------------------------------------------------
+# Compresión
+# -------------------------------------------------------------------
+def _choose_encoding():
+    aceptadas = request.accept_encodings
+    if brotli is not None and aceptadas.quality("br") > 0:
+        return "br"
+    if aceptadas.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """after_request: comprimir respuestas de texto grandes."""
+    config = current_app.config
+    if (
+        not config.get("COMPRESS_ENABLED", True)
+        or response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    data = response.get_data()
+    if len(data) < config.get("COMPRESS_MIN_SIZE", 500):
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        comprimido = brotli.compress(data, quality=config.get("COMPRESS_BR_QUALITY", 4))
+    else:
+        comprimido = gzip.compress(data, compresslevel=config.get("COMPRESS_LEVEL", 6), mtime=0)
+
+    response.set_data(comprimido)
+    response.headers["Content-Encoding"] = encoding
+    # Un ETag fuerte identifica bytes exactos; la versión comprimida es otra
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+# -------------------------------------------------------------------
+# GET condicional
+# -------------------------------------------------------------------
+def _build_id(app):
+    """Identificador del despliegue: cambia si cambian las plantillas."""
+    digest = hashlib.sha1()
+    carpeta = os.path.join(app.root_path, app.template_folder or "templates")
+    for raiz, _, archivos in sorted(os.walk(carpeta)):
+        for nombre in sorted(archivos):
+            stat = os.stat(os.path.join(raiz, nombre))
+            digest.update(f"{raiz}/{nombre}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()[:12]
+
+
+def conditional(validator):
+    """
+    Decorador de vistas GET: ETag + Last-Modified y 304 si no hay cambios.
+
+    La ETag combina el valor de ``validator()``, la URL completa, el
+    usuario de la sesión y la versión del despliegue. Si hay mensajes
+    flash pendientes no se responde 304 (se perderían).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if (
+                request.method not in ("GET", "HEAD")
+                or not current_app.config.get("CONDITIONAL_GET", True)
+                or session.get("_flashes")
+            ):
+                return view(*args, **kwargs)
+
+            valor, modificado = validator()
+            clave = "|".join((
+                str(valor),
+                request.full_path,
+                str(session.get("user_id")),
+                current_app.extensions["http_build_id"],
+            ))
+            etag = hashlib.sha1(clave.encode("utf-8")).hexdigest()[:20]
+
+            if _not_modified(etag, modificado):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if modificado is not None:
+                response.last_modified = modificado
+            # Depende de la sesión: sólo caché del navegador, revalidando siempre
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Cookie")
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _not_modified(etag, modificado):
+    if request.if_none_match:
+        # Con If-None-Match se ignora If-Modified-Since (RFC 9110 §13.1.3)
+        return request.if_none_match.contains_weak(etag)
+    desde = request.if_modified_since
+    if desde is not None and modificado is not None:
+        return modificado <= desde
+    return False
+
+
+def inventory_validator():
+    """Validador para páginas que sólo dependen del inventario disponible."""
+    inventario = get_inventory()
+    return inventario.digest, inventario.updated_at
+
+
+def init_app(app):
+    """Registrar compresión y datos para el GET condicional."""
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BR_QUALITY", 4)
+    app.config.setdefault("CONDITIONAL_GET", True)
+
+    app.extensions["http_build_id"] = _build_id(app)
+    app.after_request(compress_response)
@@ -0,0 +1,334 @@
+"""
+Variantes redimensionadas de las fotos de vehículos.
+
+Las fotos originales en ``static/`` pesan más de 1 MB y se mostraban tal
+cual en cada tarjeta. Aquí se generan (una vez, y se guardan en
+``static/images/variants/``) copias a los anchos que usa cada vista,
+a 1x y 2x (pantallas retina), en JPEG y opcionalmente WebP. Las
+plantillas las usan con el macro ``imagen_vehiculo`` de
+``templates/_imagen.html``, que arma ``<picture>`` con ``srcset``.
+
+- El nombre de cada variante incluye un hash del original (ruta, tamaño
+  y fecha de modificación): si la foto cambia, se generan nuevas.
+- Sólo se procesan imágenes locales bajo ``static/``; las URLs externas
+  se muestran sin cambios.
+- Si una variante aún no existe, la vista usa el original y la
+  generación se encola en segundo plano (nunca bloquea la petición).
+- Requiere Pillow; sin Pillow todo se sirve como antes. Pillow se importa
+  con la primera imagen (no al arrancar).
+"""
+
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from flask import current_app, has_app_context, url_for
+
+logger = logging.getLogger(__name__)
+
+# Ancho en px (1x) de cada uso; también se genera el doble para retina
+VARIANTS = {
+    "thumb": 160,  # miniaturas ("populares" del dashboard)
+    "card": 480,  # tarjetas del catálogo, dashboard y listado admin
+    "detail": 1200,  # vista ampliada
+}
+
+SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+class ResponsiveImage:
+    """URLs de una imagen para una variante: ``src`` + ``srcset`` (y WebP)."""
+
+    __slots__ = ("src", "srcset", "webp_srcset", "width", "height")
+
+    def __init__(self, src, srcset, webp_srcset, width, height):
+        self.src = src
+        self.srcset = srcset
+        self.webp_srcset = webp_srcset
+        self.width = width
+        self.height = height
+
+
+class ImagePipeline:
+    """Genera y localiza las variantes redimensionadas."""
+
+    def __init__(self, static_folder, static_url_path="/static",
+                 output_dir="images/variants", webp=True, quality=80):
+        self.static_folder = os.path.realpath(static_folder)
+        self.static_url_path = static_url_path.rstrip("/") + "/"
+        self.output_dir = output_dir
+        self._webp = webp
+        self.quality = quality
+
+        self._known = {}  # (ruta, firma) -> {ancho: (jpg, webp, alto)}
+        self.generation = 0  # aumenta cada vez que hay variantes nuevas listas
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return _pillow_installed()
+
+    @property
+    def webp(self):
+        return self._webp and self.enabled and _webp_supported()
+
+    # ---------------------------------------------------------------
+    # Rutas
+    # ---------------------------------------------------------------
+    def source_path(self, url):
+        """Archivo local de ``url`` dentro de static/, o None si no es local."""
+        if not url:
+            return None
+        parsed = urlparse(url)
+        if parsed.scheme or parsed.netloc:
+            return None
+        path = parsed.path
+        if path.startswith(self.static_url_path):
+            path = path[len(self.static_url_path):]
+        elif path.startswith("static/"):
+            path = path[len("static/"):]
+        path = path.lstrip("/")
+        # URL con huella de utils.assets (p. ej. corolla.<hash>.jpg)
+        assets = current_app.extensions.get("static_assets") if has_app_context() else None
+        if assets is not None:
+            path = assets.resolve(path) or path
+        if path.startswith(self.output_dir + "/"):
+            return None
+        if os.path.splitext(path)[1].lower() not in SOURCE_EXTENSIONS:
+            return None
+
+        full = os.path.realpath(os.path.join(self.static_folder, path))
+        if not full.startswith(self.static_folder + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    def _signature(self, source):
+        stat = os.stat(source)
+        rel = os.path.relpath(source, self.static_folder)
+        raw = f"{rel}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()[:10]
+
+    def _variant_rel(self, source, signature, width, ext):
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return f"{self.output_dir}/{stem}-{signature}-{width}w.{ext}"
+
+    def _widths(self, original_width):
+        widths = set()
+        for width in VARIANTS.values():
+            for w in (width, width * 2):
+                widths.add(min(w, original_width))
+        return sorted(widths)
+
+    # ---------------------------------------------------------------
+    # Generación
+    # ---------------------------------------------------------------
+    def generate(self, source):
+        """Generar (si faltan) todas las variantes de ``source``."""
+        signature = self._signature(source)
+        key = (source, signature)
+        if key in self._known:
+            return self._known[key]
+
+        Image, ImageOps = _pil()
+        with Image.open(source) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ("RGB", "L"):
+                original = original.convert("RGB")
+            ancho, alto = original.size
+
+            variantes = {}
+            for width in self._widths(ancho):
+                height = round(alto * width / ancho)
+                jpg = self._variant_rel(source, signature, width, "jpg")
+                webp = self._variant_rel(source, signature, width, "webp") if self.webp else None
+                pendientes = [
+                    (rel, fmt) for rel, fmt in ((jpg, "JPEG"), (webp, "WEBP"))
+                    if rel and not os.path.exists(self._abs(rel))
+                ]
+                if pendientes:
+                    resized = original if width == ancho else original.resize(
+                        (width, height), Image.LANCZOS
+                    )
+                    for rel, fmt in pendientes:
+                        self._save(resized, rel, fmt)
+                variantes[width] = (jpg, webp, height)
+
+        with self._lock:
+            self._known[key] = variantes
+            self.generation += 1
+        return variantes
+
+    def _abs(self, rel):
+        return os.path.join(self.static_folder, *rel.split("/"))
+
+    def _save(self, image, rel, fmt):
+        path = self._abs(rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        options = {"quality": self.quality}
+        if fmt == "JPEG":
+            options.update(optimize=True, progressive=True)
+        else:
+            options.update(method=4)
+        image.save(tmp, fmt, **options)
+        os.replace(tmp, path)  # atómico: nunca se sirve un archivo a medias
+
+    def schedule(self, url):
+        """Encolar la generación de variantes de ``url`` (no bloquea)."""
+        if not self.enabled:
+            return
+        source = self.source_path(url)
+        if source is None:
+            return
+        executor = self._get_executor()
+        with self._lock:
+            if source in self._pending:
+                return
+            self._pending.add(source)
+        executor.submit(self._generate_safely, source)
+
+    def _get_executor(self):
+        # Los hilos no sobreviven a un fork (workers con preload): uno por proceso
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imagenes")
+                self._pid = os.getpid()
+                self._pending.clear()
+            return self._executor
+
+    def _generate_safely(self, source):
+        try:
+            self.generate(source)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron generar variantes de {source}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(source)
+
+    # ---------------------------------------------------------------
+    # Uso desde plantillas
+    # ---------------------------------------------------------------
+    def _ready(self, source):
+        """Variantes ya generadas de ``source`` (sin generar nada)."""
+        signature = self._signature(source)
+        variantes = self._known.get((source, signature))
+        if variantes is not None:
+            return variantes
+
+        # Tras reiniciar el proceso: si los archivos ya están en disco, basta con ubicarlos
+        try:
+            with _pil()[0].open(source) as original:
+                ancho, alto = original.size
+        except Exception:
+            return None
+        variantes = {}
+        for width in self._widths(ancho):
+            jpg = self._variant_rel(source, signature, width, "jpg")
+            webp = self._variant_rel(source, signature, width, "webp") if self.webp else None
+            if not os.path.exists(self._abs(jpg)) or (webp and not os.path.exists(self._abs(webp))):
+                return None
+            variantes[width] = (jpg, webp, round(alto * width / ancho))
+        with self._lock:
+            self._known[(source, signature)] = variantes
+            self.generation += 1
+        return variantes
+
+    def responsive(self, url, variante="card"):
+        """``ResponsiveImage`` para ``url`` o None (usar la URL original)."""
+        if not self.enabled or variante not in VARIANTS:
+            return None
+        source = self.source_path(url)
+        if source is None:
+            return None
+
+        variantes = self._ready(source)
+        if variantes is None:
+            self.schedule(url)
+            return None
+
+        base = VARIANTS[variante]
+        anchos = sorted({w for w in variantes if w <= base * 2} or {min(variantes)})
+        principal = max((w for w in anchos if w <= base), default=anchos[0])
+        jpg, _, alto = variantes[principal]
+
+        def srcset(indice):
+            return ", ".join(
+                f"{url_for('static', filename=variantes[w][indice])} {w}w" for w in anchos
+            )
+
+        return ResponsiveImage(
+            src=url_for("static", filename=jpg),
+            srcset=srcset(0),
+            webp_srcset=srcset(1) if self.webp else None,
+            width=principal,
+            height=alto,
+        )
+
+
+@lru_cache(maxsize=None)
+def _pillow_installed():
+    return importlib.util.find_spec("PIL") is not None
+
+
+@lru_cache(maxsize=None)
+def _pil():
+    from PIL import Image, ImageOps
+
+    return Image, ImageOps
+
+
+@lru_cache(maxsize=None)
+def _webp_supported():
+    try:
+        from PIL import features
+
+        return features.check("webp")
+    except Exception:
+        return False
+
+
+def init_app(app):
+    """Registrar el pipeline de imágenes y el helper de plantillas."""
+    app.config.setdefault("IMAGE_WEBP", True)
+    app.config.setdefault("IMAGE_QUALITY", 80)
+
+    pipeline = ImagePipeline(
+        app.static_folder,
+        static_url_path=app.static_url_path,
+        webp=app.config["IMAGE_WEBP"],
+        quality=app.config["IMAGE_QUALITY"],
+    )
+    app.extensions["image_pipeline"] = pipeline
+    if not pipeline.enabled:
+        logger.warning("⚠️ Pillow no está instalado: las fotos se sirven sin redimensionar")
+
+    app.add_template_global(pipeline.responsive, name="imagen_responsive")
+
+    @app.cli.command("generar-imagenes")
+    def generar_imagenes():
+        """Generar las variantes de todas las fotos locales de static/."""
+        if not pipeline.enabled:
+            print("❌ Pillow no está instalado (pip install Pillow)")
+            return
+        generadas = 0
+        for carpeta, _, archivos in os.walk(pipeline.static_folder):
+            if os.path.realpath(carpeta).startswith(pipeline._abs(pipeline.output_dir)):
+                continue
+            for nombre in archivos:
+                if os.path.splitext(nombre)[1].lower() in SOURCE_EXTENSIONS:
+                    pipeline.generate(os.path.join(carpeta, nombre))
+                    generadas += 1
+        print(f"🖼️  Variantes listas para {generadas} imágenes")
+
+
+def get_image_pipeline():
+    """Pipeline de imágenes de la app actual."""
+    return current_app.extensions["image_pipeline"]
@@ -0,0 +1,146 @@
+"""
+Instrumentación de consultas SQL.
+
+Cada sentencia que pasa por utils.database (execute_query, execute_batch,
+iter_query, call_stored_procedure) se mide y se reporta con
+``record_query``: duración, filas y una huella normalizada del SQL (sin
+literales ni espacios extra), de modo que la misma consulta con distintos
+parámetros cuente como una sola.
+
+- Las sentencias más lentas que ``SLOW_QUERY_MS`` se registran en el
+  logger ``rusteze.slow_query``.
+- Por petición se acumulan número de consultas y tiempo total en BD
+  (``g.db_stats``), que se exponen en la cabecera ``Server-Timing``.
+- Si una petición ejecuta más de ``QUERY_COUNT_WARNING`` consultas, o
+  repite la misma huella muchas veces (patrón N+1), se registra un aviso.
+- Otros módulos pueden suscribirse con ``add_query_listener``.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from functools import lru_cache
+
+from flask import current_app, g, has_app_context, request
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("rusteze.slow_query")
+
+_listeners = []
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w@.])-?\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Huella normalizada de una sentencia (literales -> ?, IN (...) colapsado)."""
+    sql = _COMMENTS.sub(" ", sql)
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip().rstrip(";").strip()
+
+
+class RequestQueryStats:
+    """Consultas ejecutadas durante una petición."""
+
+    __slots__ = ("count", "total", "por_huella", "inicio")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0  # segundos
+        self.por_huella = Counter()
+        self.inicio = time.perf_counter()
+
+    def add(self, huella, duration):
+        self.count += 1
+        self.total += duration
+        self.por_huella[huella] += 1
+
+
+def add_query_listener(listener):
+    """
+    Suscribir ``listener(kind, huella, duration, rows, error)`` a todas las
+    sentencias. ``duration`` en segundos; ``error`` es None si no falló.
+    """
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_query_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def record_query(kind, sql, duration, rows=None, error=None):
+    """Registrar una sentencia ejecutada (llamado desde utils.database)."""
+    huella = fingerprint(sql)
+
+    if has_app_context():
+        stats = g.get("db_stats")
+        if stats is not None:
+            stats.add(huella, duration)
+        threshold = current_app.config.get("SLOW_QUERY_MS", 0)
+    else:
+        threshold = 0
+
+    if threshold and duration * 1000 >= threshold:
+        slow_query_logger.warning(
+            f"🐢 {kind} lenta ({duration * 1000:.1f} ms, filas={rows}): {huella[:300]}"
+        )
+
+    for listener in _listeners:
+        try:
+            listener(kind, huella, duration, rows, error)
+        except Exception as e:  # un listener roto no debe tumbar la consulta
+            logger.debug(f"Listener de consultas falló: {e}")
+
+
+def _start_request():
+    g.db_stats = RequestQueryStats()
+
+
+def _finish_request(response):
+    stats = g.get("db_stats")
+    if stats is None:
+        return response
+
+    config = current_app.config
+    app_ms = (time.perf_counter() - stats.inicio) * 1000
+    db_ms = stats.total * 1000
+
+    if config.get("SERVER_TIMING", True):
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={db_ms:.2f};desc="{stats.count} consultas", app;dur={app_ms:.2f}',
+        )
+
+    limite = config.get("QUERY_COUNT_WARNING", 0)
+    if limite and stats.por_huella:
+        huella, repeticiones = stats.por_huella.most_common(1)[0]
+        if stats.count > limite or repeticiones > limite // 2:
+            logger.warning(
+                f"⚠️ {request.method} {request.path}: {stats.count} consultas "
+                f"({db_ms:.1f} ms en BD de {app_ms:.1f} ms); más repetida "
+                f"x{repeticiones}: {huella[:200]}"
+            )
+    logger.debug(
+        f"{request.method} {request.path}: {stats.count} consultas, "
+        f"{db_ms:.1f} ms en BD, {app_ms:.1f} ms total"
+    )
+    return response
+
+
+def init_app(app):
+    """Registrar la instrumentación por petición en la app."""
+    app.config.setdefault("SLOW_QUERY_MS", 200)
+    app.config.setdefault("QUERY_COUNT_WARNING", 25)
+    app.config.setdefault("SERVER_TIMING", True)
+
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
@@ -0,0 +1,367 @@
+"""
+Índice en memoria del inventario disponible.
+
+Mantiene los vehículos con estado 'Disponible' junto con listas de
+postings por faceta (marca, modelo, tipo, color, año) y un arreglo de
+precios ordenado, para responder las búsquedas del catálogo y los
+conteos por faceta sin ir a SQL Server. Se actualiza de forma
+incremental cuando el panel de admin o las ventas cambian un vehículo,
+y se recarga completo cada ``INVENTORY_REFRESH_SECONDS`` como red de
+seguridad ante cambios hechos fuera de la app.
+"""
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from utils.database import execute_query
+
+logger = logging.getLogger(__name__)
+
+FACETS = ("marca", "modelo", "tipo", "color", "anio")
+
+_SELECT = """
+    SELECT
+        vehiculo_id,
+        marca,
+        modelo,
+        anio,
+        precio,
+        color,
+        tipo,
+        estado_disponibilidad,
+        LEFT(descripcion, 160) AS descripcion,
+        imagen_url,
+        fecha_ingreso
+    FROM Vehiculos
+"""
+
+_SORT_KEYS = {
+    "recientes": (lambda v: (v["fecha_ingreso"] or datetime.min, v["vehiculo_id"]), True),
+    "precio_asc": (lambda v: (v["precio"] or 0, v["vehiculo_id"]), False),
+    "precio_desc": (lambda v: (v["precio"] or 0, v["vehiculo_id"]), True),
+    "anio_desc": (lambda v: (v["anio"] or 0, v["vehiculo_id"]), True),
+    "anio_asc": (lambda v: (v["anio"] or 0, v["vehiculo_id"]), False),
+    "marca": (
+        lambda v: ((v["marca"] or "").casefold(), (v["modelo"] or "").casefold(), v["vehiculo_id"]),
+        False,
+    ),
+}
+
+
+def _norm(value):
+    return value.strip().casefold() if isinstance(value, str) else value
+
+
+def _row_digest(vehiculo):
+    # Hash estable entre procesos (hash() de str cambia en cada arranque)
+    raw = repr(tuple(vehiculo)).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "big")
+
+
+class InventoryIndex:
+    """Índice invertido del inventario disponible (seguro entre hilos)."""
+
+    def __init__(self, max_age=300, events=None):
+        self.max_age = max_age
+        self.events = events  # utils.shared_cache.CacheManager (avisos a otros workers)
+        self.version = 0
+        self.updated_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self._last_digest = None
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._loaded_at = None
+        self._reset()
+
+    def _reset(self):
+        self._vehiculos = {}
+        self._postings = {facet: {} for facet in FACETS}
+        self._labels = {facet: {} for facet in FACETS}
+        self._precios = []  # [(precio, vehiculo_id)] ordenado
+        self._max_id = 0
+        self._digest = 0  # XOR de los hashes de cada vehículo indexado
+
+    # ---------------------------------------------------------------
+    # Mantenimiento del índice
+    # ---------------------------------------------------------------
+    def _add(self, vehiculo):
+        vid = vehiculo["vehiculo_id"]
+        self._vehiculos[vid] = vehiculo
+        for facet in FACETS:
+            key = _norm(vehiculo[facet])
+            self._postings[facet].setdefault(key, set()).add(vid)
+            self._labels[facet].setdefault(key, vehiculo[facet])
+        bisect.insort(self._precios, (vehiculo["precio"] or 0, vid))
+        self._max_id = max(self._max_id, vid)
+        self._digest ^= _row_digest(vehiculo)
+
+    def _remove(self, vid):
+        vehiculo = self._vehiculos.pop(vid, None)
+        if vehiculo is None:
+            return
+        self._digest ^= _row_digest(vehiculo)
+        for facet in FACETS:
+            key = _norm(vehiculo[facet])
+            posting = self._postings[facet].get(key)
+            if posting is not None:
+                posting.discard(vid)
+                if not posting:
+                    del self._postings[facet][key]
+                    self._labels[facet].pop(key, None)
+        entry = (vehiculo["precio"] or 0, vid)
+        i = bisect.bisect_left(self._precios, entry)
+        if i < len(self._precios) and self._precios[i] == entry:
+            del self._precios[i]
+
+    def _upsert(self, rows, ids=()):
+        """Reemplazar en el índice los vehículos ``ids`` por ``rows``."""
+        with self._lock:
+            for vid in ids:
+                self._remove(vid)
+            for row in rows:
+                self._remove(row["vehiculo_id"])
+                if row["estado_disponibilidad"] == "Disponible":
+                    self._add(row)
+            self._bump()
+
+    def load(self):
+        """Carga completa desde SQL Server."""
+        rows = execute_query(
+            _SELECT + " WHERE estado_disponibilidad = 'Disponible'", as_rows=True
+        )
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self._loaded_at = time.monotonic()
+            self._bump()
+        logger.info(f"📦 Índice de inventario cargado: {len(rows)} vehículos")
+
+    def _bump(self):
+        self.version += 1
+        if self._digest != self._last_digest:
+            self.updated_at = datetime.now(timezone.utc).replace(microsecond=0)
+            self._last_digest = self._digest
+
+    @property
+    def digest(self):
+        """
+        Huella del contenido indexado. A diferencia de ``version`` (que es
+        propia de cada proceso), dos workers con el mismo inventario tienen
+        la misma huella, así que sirve para ETags.
+        """
+        self.ensure_loaded()
+        return f"{self._digest:016x}"
+
+    def _is_stale(self):
+        loaded_at = self._loaded_at
+        return loaded_at is None or bool(
+            self.max_age and time.monotonic() - loaded_at > self.max_age
+        )
+
+    def ensure_loaded(self):
+        if self._is_stale():
+            # Un solo hilo recarga; los demás esperan y reutilizan el resultado
+            with self._load_lock:
+                if self._is_stale():
+                    self.load()
+
+    def invalidate(self):
+        """Forzar recarga completa en la siguiente lectura."""
+        self._loaded_at = None
+
+    def _safe_refresh(self, fn, *args):
+        if self._loaded_at is None:
+            return  # aún no se carga; la primera lectura traerá todo
+        try:
+            fn(*args)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo actualizar el índice de inventario: {e}")
+            self.invalidate()
+
+    def _refresh_vehicle(self, vehiculo_id):
+        rows = execute_query(_SELECT + " WHERE vehiculo_id = ?", (vehiculo_id,), as_rows=True)
+        self._upsert(rows, ids=(vehiculo_id,))
+
+    def _refresh_vehicles(self, ids):
+        marcas = ", ".join("?" * len(ids))
+        rows = execute_query(_SELECT + f" WHERE vehiculo_id IN ({marcas})", tuple(ids), as_rows=True)
+        self._upsert(rows, ids=ids)
+
+    def _refresh_new(self):
+        rows = execute_query(
+            _SELECT + " WHERE vehiculo_id > ? AND estado_disponibilidad = 'Disponible'",
+            (self._max_id,),
+            as_rows=True,
+        )
+        self._upsert(rows)
+
+    def _refresh_sale(self, venta_id):
+        rows = execute_query(
+            """
+            SELECT dv.vehiculo_id
+            FROM Detalle_Ventas dv
+            WHERE dv.venta_id = ?
+            """,
+            (venta_id,),
+            as_rows=True,
+        )
+        for row in rows:
+            self._refresh_vehicle(row["vehiculo_id"])
+
+    def vehicle_changed(self, vehiculo_id):
+        """Un vehículo fue editado, vendido o cambió de estado."""
+        self._safe_refresh(self._refresh_vehicle, vehiculo_id)
+        self._publish("vehicle_changed", vehiculo_id)
+
+    def vehicles_changed(self, ids):
+        """Varios vehículos cambiaron a la vez (acciones masivas): una sola consulta."""
+        ids = tuple(ids)
+        if not ids:
+            return
+        self._safe_refresh(self._refresh_vehicles, ids)
+        self._publish("vehicles_changed", ids)
+
+    def vehicle_removed(self, vehiculo_id):
+        """Un vehículo fue eliminado."""
+        self._upsert((), ids=(vehiculo_id,))
+        self._publish("vehicle_removed", vehiculo_id)
+
+    def vehicles_added(self):
+        """Se insertaron vehículos nuevos (IDs mayores al último indexado)."""
+        self._safe_refresh(self._refresh_new)
+        self._publish("vehicles_added")
+
+    def sale_changed(self, venta_id):
+        """Se registró o canceló una venta: refrescar sus vehículos."""
+        self._safe_refresh(self._refresh_sale, venta_id)
+        self._publish("sale_changed", venta_id)
+
+    # ---------------------------------------------------------------
+    # Otros workers (utils.shared_cache)
+    # ---------------------------------------------------------------
+    def _publish(self, evento, *args):
+        if self.events is not None:
+            self.events.publish("inventario", evento, *args)
+
+    def apply_event(self, evento, *args):
+        """Aplicar un cambio publicado por otro proceso (sin re-publicarlo)."""
+        if evento == "vehicle_changed":
+            self._safe_refresh(self._refresh_vehicle, *args)
+        elif evento == "vehicles_changed":
+            self._safe_refresh(self._refresh_vehicles, tuple(*args))
+        elif evento == "vehicle_removed":
+            self._upsert((), ids=args)
+        elif evento == "vehicles_added":
+            self._safe_refresh(self._refresh_new)
+        elif evento == "sale_changed":
+            self._safe_refresh(self._refresh_sale, *args)
+
+    # ---------------------------------------------------------------
+    # Consultas
+    # ---------------------------------------------------------------
+    def _price_range(self, low, high):
+        lo = 0 if low is None else bisect.bisect_left(self._precios, (low, -1))
+        hi = (
+            len(self._precios)
+            if high is None
+            else bisect.bisect_right(self._precios, (high, float("inf")))
+        )
+        return {vid for _, vid in self._precios[lo:hi]}
+
+    def _matching_ids(self, filtros):
+        candidates = []
+        postings = self._postings
+
+        for facet in ("marca", "tipo", "color"):
+            if filtros.get(facet):
+                candidates.append(postings[facet].get(_norm(filtros[facet]), set()))
+
+        if filtros.get("modelo"):
+            prefix = _norm(filtros["modelo"])
+            ids = set()
+            for key, posting in postings["modelo"].items():
+                if key.startswith(prefix):
+                    ids |= posting
+            candidates.append(ids)
+
+        anio_min, anio_max = filtros.get("anio_min"), filtros.get("anio_max")
+        if anio_min is not None or anio_max is not None:
+            ids = set()
+            for anio, posting in postings["anio"].items():
+                if (anio_min is None or anio >= anio_min) and (anio_max is None or anio <= anio_max):
+                    ids |= posting
+            candidates.append(ids)
+
+        if filtros.get("precio_min") is not None or filtros.get("precio_max") is not None:
+            candidates.append(self._price_range(filtros.get("precio_min"), filtros.get("precio_max")))
+
+        if not candidates:
+            return set(self._vehiculos)
+
+        # Intersección empezando por la lista más corta
+        candidates.sort(key=len)
+        result = set(candidates[0])
+        for ids in candidates[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def search(self, filtros, orden="recientes", offset=0, limit=None):
+        """Devuelve (vehículos de la página, total de coincidencias)."""
+        self.ensure_loaded()
+        key, reverse = _SORT_KEYS.get(orden, _SORT_KEYS["recientes"])
+        with self._lock:
+            ids = self._matching_ids(filtros)
+            vehiculos = sorted((self._vehiculos[vid] for vid in ids), key=key, reverse=reverse)
+        end = None if limit is None else offset + limit
+        return vehiculos[offset:end], len(vehiculos)
+
+    def facet_counts(self, facet):
+        """[(valor, cantidad)] ordenado por valor, p. ej. [('Toyota', 12), ...]."""
+        self.ensure_loaded()
+        with self._lock:
+            pairs = [
+                (self._labels[facet][key], len(posting))
+                for key, posting in self._postings[facet].items()
+            ]
+        return sorted(pairs, key=lambda p: (str(p[0]).casefold(), p[0]))
+
+    def is_available(self, vehiculo_id):
+        """
+        False si el índice sabe que el vehículo no está disponible. Los IDs
+        mayores al último indexado (altas aún no vistas) cuentan como
+        disponibles: la última palabra la tiene SQL Server.
+        """
+        self.ensure_loaded()
+        return vehiculo_id in self._vehiculos or vehiculo_id > self._max_id
+
+    @property
+    def size(self):
+        """Vehículos indexados ahora mismo, sin cargar ni recargar (métricas)."""
+        return len(self._vehiculos)
+
+    def __len__(self):
+        self.ensure_loaded()
+        return len(self._vehiculos)
+
+
+def init_app(app):
+    """Registrar el índice de inventario en la app."""
+    app.config.setdefault("INVENTORY_REFRESH_SECONDS", 300)
+    events = app.extensions.get("cache_manager")
+    index = InventoryIndex(max_age=app.config["INVENTORY_REFRESH_SECONDS"], events=events)
+    if events is not None:
+        events.subscribe("inventario", index.apply_event, reset=index.invalidate)
+    app.extensions["inventory_index"] = index
+
+
+def get_inventory():
+    """Índice de inventario de la app actual."""
+    return current_app.extensions["inventory_index"]
@@ -0,0 +1,86 @@
+"""
+Arranque de la app en producción.
+
+- ``warmup``: verifica la base (utils.health), abre las conexiones
+  mínimas del pool, levanta los procesos de hash de contraseñas, carga
+  los índices de inventario y de contactos y el resumen del dashboard y
+  compila las plantillas más usadas. gunicorn lo llama en
+  cada worker antes de que acepte peticiones (ver gunicorn.conf.py), de
+  modo que un worker recién creado no paga esos costos con la primera
+  petición de un usuario. Si tarda más de ``WARMUP_TIMEOUT`` segundos
+  (p. ej. SQL Server lento) el worker empieza a atender igual y el
+  calentamiento sigue en segundo plano.
+- ``before_fork``: con ``preload_app`` el proceso maestro crea la app una
+  sola vez; las conexiones y procesos que abrió no pueden compartirse
+  con los workers, así que se cierran antes de hacer fork.
+"""
+
+import logging
+import threading
+import time
+
+from utils.database import get_pool
+
+logger = logging.getLogger(__name__)
+
+# Plantillas de las páginas con más tráfico
+HOT_TEMPLATES = (
+    "client/catalogo.html",
+    "client/dashboard.html",
+    "admin/dashboard.html",
+    "auth/login.html",
+)
+
+
+def _step(nombre, fn, tiempos):
+    inicio = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        # Un worker frío es mejor que un worker caído: se registra y sigue
+        logger.warning(f"⚠️ Calentamiento '{nombre}' falló: {e}")
+    tiempos.append(f"{nombre} {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+
+def _warm(app):
+    tiempos = []
+    _step("contraseñas", app.extensions["password_hasher"].start, tiempos)
+    status = app.extensions["db_status"]
+    if not status.ready:
+        _step("base", status.check, tiempos)
+        if not status.ready:
+            logger.warning("⚠️ Worker sin calentar: SQL Server no responde")
+            return
+
+    with app.app_context():
+        _step("pool", lambda: get_pool().prefill(), tiempos)
+        _step("inventario", lambda: app.extensions["inventory_index"].ensure_loaded(), tiempos)
+        _step("contactos", lambda: app.extensions["contact_index"].ensure_loaded(), tiempos)
+        _step("dashboard", lambda: app.extensions["dashboard_summary"].snapshot(), tiempos)
+
+        def plantillas():
+            for nombre in HOT_TEMPLATES:
+                app.jinja_env.get_template(nombre)
+
+        _step("plantillas", plantillas, tiempos)
+
+    logger.info(f"🔥 Worker listo: {', '.join(tiempos)}")
+
+
+def warmup(app):
+    """Llenar pool, índices y cachés antes de atender tráfico (con tope de tiempo)."""
+    timeout = app.config.get("WARMUP_TIMEOUT", 10.0)
+    thread = threading.Thread(target=_warm, args=(app,), name="warmup", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        logger.warning(
+            f"⚠️ Calentamiento sin terminar tras {timeout:.0f} s; "
+            "el worker empieza a atender y sigue en segundo plano"
+        )
+
+
+def before_fork(app):
+    """Cerrar en el maestro las conexiones que no deben heredar los workers."""
+    app.extensions["sqlserver_pool"].close_all()
+    app.extensions["password_hasher"].shutdown()
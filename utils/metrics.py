@@ -0,0 +1,345 @@
+"""
+Métricas en formato de texto de Prometheus.
+
+Sin dependencias externas: contadores e histogramas propios, pensados
+para costar pocos microsegundos por observación (un bisect y un lock por
+métrica). Se exponen en ``METRICS_PATH`` (por defecto ``/metrics``):
+
+- Peticiones por blueprint/endpoint/método/estado y su latencia.
+- Latencia de execute_query/execute_batch/call_stored_procedure por
+  huella de SQL (ver utils.instrumentation) y errores de BD.
+- Pool de conexiones (aperturas, cierres, préstamos, esperas...).
+- Errores enviados a Auditoria_Errores y estado de la cola de auditoría.
+- Índice de inventario y caché del dashboard.
+- Intentos de login admitidos y rechazados por el límite de utils.ratelimit.
+
+Las métricas del pool, auditoría y cachés se leen al momento del scrape,
+así que no añaden trabajo a las peticiones.
+"""
+
+import bisect
+import hashlib
+import hmac
+import threading
+import time
+from functools import lru_cache
+
+from flask import Response, current_app, g, has_app_context, request
+
+from utils.instrumentation import add_query_listener
+
+# Segundos; cubren desde un SELECT por PK hasta un reporte pesado
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pares = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Contador con etiquetas."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Histograma acumulativo con buckets fijos."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [conteos por bucket..., +Inf, suma]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            serie = self._series.get(labels)
+            if serie is None:
+                serie = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            serie[i] += 1
+            serie[-1] += value
+
+    def render(self):
+        with self._lock:
+            items = [(labels, list(serie)) for labels, serie in self._series.items()]
+        for labels, serie in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), serie):
+                acumulado += conteo
+                le = f'le="{_number(float(limite))}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {acumulado}"
+            base = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{base} {serie[-1]:.6f}"
+            yield f"{self.name}_count{base} {acumulado}"
+
+
+class MetricsRegistry:
+    """Métricas de la app y colectores que se evalúan en cada scrape."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []  # fn() -> [(nombre, tipo, ayuda, [(labels_dict, valor)])]
+
+        self.requests = self.register(Counter(
+            "rusteze_http_requests_total", "Peticiones HTTP atendidas",
+            ("blueprint", "endpoint", "method", "status"),
+        ))
+        self.request_latency = self.register(Histogram(
+            "rusteze_http_request_duration_seconds", "Latencia de peticiones HTTP",
+            ("blueprint", "endpoint"), REQUEST_BUCKETS,
+        ))
+        self.query_latency = self.register(Histogram(
+            "rusteze_db_query_duration_seconds", "Latencia de sentencias SQL por huella",
+            ("kind", "fingerprint"), QUERY_BUCKETS,
+        ))
+        self.query_errors = self.register(Counter(
+            "rusteze_db_query_errors_total", "Sentencias SQL que fallaron",
+            ("kind", "fingerprint"),
+        ))
+        # Texto de cada huella, publicado aparte para no repetirlo en cada bucket
+        self.statements = {}
+        self.add_collector(self._statements_collector)
+
+    def _statements_collector(self):
+        return [(
+            "rusteze_db_query_info", "gauge", "Texto normalizado de cada huella SQL",
+            [({"fingerprint": fid, "statement": sql}, 1) for fid, sql in list(self.statements.items())],
+        )]
+
+    def observe_query(self, kind, huella, duration, error=None):
+        fid = _fingerprint_id(huella)
+        self.query_latency.observe(duration, kind, fid)
+        if error is not None:
+            self.query_errors.inc(kind, fid)
+        if fid not in self.statements:
+            self.statements[fid] = huella[:200]
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    values = tuple(labels.values())
+                    lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+@lru_cache(maxsize=1024)
+def _fingerprint_id(huella):
+    """Identificador corto y estable de una huella SQL (etiqueta acotada)."""
+    return hashlib.sha1(huella.encode("utf-8")).hexdigest()[:12]
+
+
+# -------------------------------------------------------------------
+# Colectores (se leen en el scrape)
+# -------------------------------------------------------------------
+def _pool_collector(pool):
+    def collect():
+        stats = pool.stats()
+        return [
+            ("rusteze_db_connections_opened_total", "counter",
+             "Conexiones abiertas contra SQL Server", [({}, stats["connections_opened"])]),
+            ("rusteze_db_connections_closed_total", "counter",
+             "Conexiones cerradas", [({}, stats["connections_closed"])]),
+            ("rusteze_db_pool_checkouts_total", "counter",
+             "Préstamos de conexión del pool", [({}, stats["checkouts"])]),
+            ("rusteze_db_pool_waits_total", "counter",
+             "Préstamos que tuvieron que esperar una conexión libre", [({}, stats["waits"])]),
+            ("rusteze_db_pool_timeouts_total", "counter",
+             "Préstamos que agotaron el tiempo de espera", [({}, stats["timeouts"])]),
+            ("rusteze_db_pool_ping_failures_total", "counter",
+             "Conexiones descartadas por fallar el pre-ping", [({}, stats["ping_failures"])]),
+            ("rusteze_db_pool_connections", "gauge", "Conexiones del pool por estado", [
+                ({"state": "idle"}, stats["idle"]),
+                ({"state": "in_use"}, stats["in_use"]),
+            ]),
+            ("rusteze_db_pool_max_size", "gauge",
+             "Tamaño máximo del pool", [({}, stats["max_size"])]),
+        ]
+    return collect
+
+
+def _audit_collector(sink):
+    def collect():
+        return [
+            ("rusteze_audit_errors_total", "counter",
+             "Errores enviados a Auditoria_Errores por procedimiento",
+             [({"procedimiento": p}, n) for p, n in sink.por_procedimiento.items()]),
+            ("rusteze_audit_records_total", "counter",
+             "Registros de auditoría por destino", [
+                 ({"outcome": k}, v) for k, v in sink.stats.items()
+             ]),
+            ("rusteze_audit_queue_depth", "gauge",
+             "Registros de auditoría pendientes en la cola", [({}, sink.queue_depth())]),
+        ]
+    return collect
+
+
+def _cache_collector(app):
+    def collect():
+        samples = []
+        inventario = app.extensions.get("inventory_index")
+        if inventario is not None:
+            samples += [
+                ("rusteze_inventory_vehicles", "gauge",
+                 "Vehículos disponibles en el índice en memoria", [({}, inventario.size)]),
+                ("rusteze_inventory_version", "gauge",
+                 "Versión del índice de inventario", [({}, inventario.version)]),
+            ]
+        # Una sola familia para todas las cachés (HELP/TYPE no pueden repetirse)
+        cache_requests = []
+        dashboard = app.extensions.get("dashboard_summary")
+        if dashboard is not None:
+            cache = dashboard._cache
+            cache_requests += [
+                ({"cache": "dashboard", "result": "hit"}, cache.hits),
+                ({"cache": "dashboard", "result": "miss"}, cache.misses),
+            ]
+        contactos = app.extensions.get("contact_index")
+        if contactos is not None:
+            samples.append((
+                "rusteze_registration_checks_total", "counter",
+                "Verificaciones de email/teléfono del registro (skipped = resueltas en memoria)", [
+                    ({"result": "skipped"}, contactos.skipped),
+                    ({"result": "checked"}, contactos.checked),
+                ],
+            ))
+        fragmentos = app.extensions.get("fragment_cache")
+        if fragmentos is not None:
+            store = fragmentos.store
+            cache_requests += [
+                ({"cache": "fragmentos", "result": "hit"}, store.hits),
+                ({"cache": "fragmentos", "result": "miss"}, store.misses),
+            ]
+        if cache_requests:
+            samples.append((
+                "rusteze_cache_requests_total", "counter", "Consultas a cachés en memoria",
+                cache_requests,
+            ))
+        return samples
+    return collect
+
+
+def _login_collector(limiter):
+    def collect():
+        return [
+            ("rusteze_login_admitted_total", "counter",
+             "Intentos de login que pasaron el límite", [({}, limiter.admitted)]),
+            ("rusteze_login_rejected_total", "counter",
+             "Intentos de login rechazados por el límite, por regla", [
+                 ({"rule": regla}, limiter.rejected[regla]) for regla in limiter.rules
+             ]),
+        ]
+    return collect
+
+
+# -------------------------------------------------------------------
+# Integración con Flask
+# -------------------------------------------------------------------
+def _on_query(kind, huella, duration, rows, error):
+    registry = current_app.extensions.get("metrics") if has_app_context() else None
+    if registry is not None:
+        registry.observe_query(kind, huella, duration, error)
+
+
+def _start_timer():
+    g.metrics_start = time.perf_counter()
+
+
+def _observe_request(response):
+    start = g.pop("metrics_start", None)
+    if start is None:
+        return response
+    registry = current_app.extensions["metrics"]
+    endpoint = request.endpoint or "desconocido"
+    blueprint = request.blueprint or "app"
+    registry.request_latency.observe(time.perf_counter() - start, blueprint, endpoint)
+    registry.requests.inc(blueprint, endpoint, request.method, response.status_code)
+    return response
+
+
+def init_app(app):
+    """Registrar las métricas y el endpoint de scrape en la app."""
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_PATH", "/metrics")
+    app.config.setdefault("METRICS_TOKEN", None)
+
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    registry = MetricsRegistry()
+    app.extensions["metrics"] = registry
+
+    add_query_listener(_on_query)
+    registry.add_collector(_pool_collector(app.extensions["sqlserver_pool"]))
+    if "audit_sink" in app.extensions:
+        registry.add_collector(_audit_collector(app.extensions["audit_sink"]))
+    registry.add_collector(_cache_collector(app))
+    if "login_limiter" in app.extensions:
+        registry.add_collector(_login_collector(app.extensions["login_limiter"]))
+
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+
+    @app.route(app.config["METRICS_PATH"], endpoint="metrics")
+    def metrics():
+        token = current_app.config.get("METRICS_TOKEN")
+        if token:
+            enviado = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(enviado.encode("utf-8"), token.encode("utf-8")):
+                return Response("No autorizado\n", status=401, content_type=CONTENT_TYPE)
+        return Response(registry.render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,178 @@
+"""
+Paginación por keyset (seek) para los listados del panel.
+
+En lugar de OFFSET, cada página se pide "después de" (o "antes de") los
+valores de ordenamiento de la última (o primera) fila vista, de modo que
+SQL Server puede buscar directo en el índice sin recorrer las filas previas.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import request, url_for
+
+from utils.database import execute_query
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ["dt", value.isoformat()]
+    if isinstance(value, date):
+        return ["d", value.isoformat()]
+    if isinstance(value, Decimal):
+        return ["dec", str(value)]
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, list) and len(value) == 2:
+        tag, raw = value
+        if tag == "dt":
+            return datetime.fromisoformat(raw)
+        if tag == "d":
+            return date.fromisoformat(raw)
+        if tag == "dec":
+            return Decimal(raw)
+    return value
+
+
+def encode_cursor(values):
+    """Serializar valores de ordenamiento como token opaco para la URL."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token, size):
+    """Leer un token de cursor; devuelve None si es inválido."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    try:
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """Página de resultados con cursores hacia adelante y hacia atrás."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def _url(self, **cursor):
+        args = request.args.to_dict()
+        args.pop("after", None)
+        args.pop("before", None)
+        args.update(cursor)
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+    @property
+    def next_url(self):
+        return self._url(after=self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return self._url(before=self.prev_cursor) if self.has_prev else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _placeholder(value):
+    # Un datetime de Python llega como datetime2; contra una columna DATETIME
+    # (redondeada a .xx0/.xx3/.xx7 ms) la igualdad falla desde el nivel de
+    # compatibilidad 130 y se saltarían las filas con la misma fecha.
+    return "CAST(? AS DATETIME)" if isinstance(value, datetime) else "?"
+
+
+def _seek_predicate(keys, values, op):
+    """(k1 op ?) OR (k1 = ? AND k2 op ?) OR ..."""
+    marks = [_placeholder(v) for v in values]
+    clauses, params = [], []
+    for i, key in enumerate(keys):
+        parts = [f"q.{k} = {marks[j]}" for j, k in enumerate(keys[:i])]
+        parts.append(f"q.{key} {op} {marks[i]}")
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[: i + 1])
+    return " OR ".join(clauses), params
+
+
+def keyset_paginate(query, keys, params=(), descending=True, per_page=None):
+    """
+    Paginar ``query`` (un SELECT sin ORDER BY) por las columnas ``keys``.
+
+    ``keys`` son nombres de columna del SELECT, en orden de prioridad; la
+    última debe ser única (p. ej. el ID) para que el orden sea total.
+    Los cursores se leen de ``?after=`` / ``?before=`` y el tamaño de
+    ``?per_page=``.
+    """
+    if per_page is None:
+        per_page = request.args.get("per_page", DEFAULT_PER_PAGE, type=int)
+    per_page = max(1, min(per_page or DEFAULT_PER_PAGE, MAX_PER_PAGE))
+
+    after = decode_cursor(request.args.get("after"), len(keys))
+    before = decode_cursor(request.args.get("before"), len(keys)) if after is None else None
+    backwards = before is not None
+    seek = before if backwards else after
+
+    # Hacia atrás se invierte el orden y luego se voltea la página
+    desc = descending != backwards
+    direction = "DESC" if desc else "ASC"
+    order_by = ", ".join(f"q.{k} {direction}" for k in keys)
+
+    where, seek_params = "", []
+    if seek is not None:
+        predicate, seek_params = _seek_predicate(keys, seek, "<" if desc else ">")
+        where = f"WHERE {predicate}"
+
+    sql = f"""
+        SELECT TOP ({per_page + 1}) q.*
+        FROM ({query}) AS q
+        {where}
+        ORDER BY {order_by}
+    """
+    rows = execute_query(sql, tuple(params) + tuple(seek_params), as_rows=True)
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_of(row):
+        return encode_cursor([row[k] for k in keys])
+
+    # Si venimos hacia atrás, siempre hay página siguiente; si venimos
+    # hacia adelante desde un cursor, siempre hay página anterior.
+    next_cursor = prev_cursor = None
+    if rows:
+        if backwards or has_more:
+            next_cursor = cursor_of(rows[-1])
+        if has_more if backwards else after is not None:
+            prev_cursor = cursor_of(rows[0])
+
+    return KeysetPage(rows, per_page, next_cursor=next_cursor, prev_cursor=prev_cursor)
@@ -0,0 +1,155 @@
+"""
+Hash de contraseñas fuera de los hilos de la app.
+
+PBKDF2 con cientos de miles de iteraciones ocupa la CPU unos cientos de
+milisegundos por login o alta de usuario; con varios a la vez, los
+hilos del worker (y el GIL) quedan ocupados y las demás peticiones
+esperan. ``PasswordHasher`` manda ese cálculo a un pool de procesos:
+
+- ``PASSWORD_HASH_WORKERS`` procesos (``0`` = en el hilo de la petición,
+  útil en desarrollo y pruebas). Como mucho ``PASSWORD_HASH_QUEUE``
+  hashes por proceso esperan turno; si el pool está saturado por más de
+  ``PASSWORD_HASH_TIMEOUT`` segundos se lanza ``HasherBusy`` en lugar de
+  acumular peticiones.
+- El costo (``PASSWORD_HASH_ITERATIONS``) es configurable. Al iniciar
+  sesión, un hash guardado con otros parámetros se recalcula en segundo
+  plano (``User.authenticate``), sin alargar el login.
+- Las contraseñas heredadas en texto plano (la base original las guardaba
+  así) se aceptan mientras ``PASSWORD_ALLOW_PLAINTEXT`` esté activo y se
+  migran a hash en su primer login.
+"""
+
+import hmac
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+HASH_PREFIXES = ("pbkdf2:", "scrypt:")
+
+
+class HasherBusy(RuntimeError):
+    """El pool de hash está saturado."""
+
+
+# Se ejecutan en los procesos del pool (deben poder importarse por nombre)
+def _generate(password, method):
+    from werkzeug.security import generate_password_hash
+
+    return generate_password_hash(password, method=method)
+
+
+def _check(pwhash, password):
+    from werkzeug.security import check_password_hash
+
+    return check_password_hash(pwhash, password)
+
+
+def is_hashed(stored):
+    return bool(stored) and stored.startswith(HASH_PREFIXES) and stored.count("$") == 2
+
+
+class PasswordHasher:
+    """Genera y verifica hashes en un pool de procesos acotado."""
+
+    def __init__(self, iterations=600_000, workers=2, queue=4, timeout=10.0,
+                 allow_plaintext=True):
+        self.method = f"pbkdf2:sha256:{iterations}"
+        self.workers = workers
+        self.timeout = timeout
+        self.allow_plaintext = allow_plaintext
+        self._slots = threading.BoundedSemaphore(max(1, workers) * queue)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Un pool por proceso: tras el fork de gunicorn cada worker crea el suyo
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                metodos = multiprocessing.get_all_start_methods()
+                # forkserver/spawn: no hereda los hilos ni los locks del worker
+                contexto = multiprocessing.get_context(
+                    "forkserver" if "forkserver" in metodos else "spawn"
+                )
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=contexto)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy("Demasiadas operaciones de contraseña en curso")
+        try:
+            return self._get_executor().submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def start(self):
+        """Levantar los procesos del pool (calentamiento del worker)."""
+        if self.workers:
+            self._run(_check, _generate("calentamiento", "pbkdf2:sha256:1"), "calentamiento")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def hash(self, password):
+        return self._run(_generate, password, self.method)
+
+    def verify(self, stored, password):
+        """True si ``password`` corresponde a ``stored`` (hash o texto plano heredado)."""
+        if not stored or not password:
+            return False
+        if is_hashed(stored):
+            return self._run(_check, stored, password)
+        if not self.allow_plaintext:
+            return False
+        return hmac.compare_digest(stored.encode("utf-8"), password.encode("utf-8"))
+
+    def needs_rehash(self, stored):
+        """El valor guardado es texto plano o usa parámetros distintos a los actuales."""
+        return not is_hashed(stored) or stored.split("$", 1)[0] != self.method
+
+    def rehash_later(self, app, password, store):
+        """Calcular el hash nuevo en segundo plano y guardarlo con ``store(hash)``."""
+
+        def run():
+            try:
+                nuevo = self.hash(password)
+                with app.app_context():
+                    store(nuevo)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo actualizar el hash de la contraseña: {e}")
+
+        threading.Thread(target=run, name="rehash", daemon=True).start()
+
+
+def init_app(app):
+    """Registrar el servicio de hash de contraseñas."""
+    app.config.setdefault("PASSWORD_HASH_ITERATIONS", 600_000)
+    app.config.setdefault("PASSWORD_HASH_WORKERS", min(2, os.cpu_count() or 1))
+    app.config.setdefault("PASSWORD_HASH_QUEUE", 4)
+    app.config.setdefault("PASSWORD_HASH_TIMEOUT", 10.0)
+    app.config.setdefault("PASSWORD_ALLOW_PLAINTEXT", True)
+
+    app.extensions["password_hasher"] = PasswordHasher(
+        iterations=app.config["PASSWORD_HASH_ITERATIONS"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        queue=app.config["PASSWORD_HASH_QUEUE"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"],
+        allow_plaintext=app.config["PASSWORD_ALLOW_PLAINTEXT"],
+    )
+
+
+def get_password_hasher():
+    """Servicio de hash de la app actual."""
+    return current_app.extensions["password_hasher"]
@@ -0,0 +1,143 @@
+"""
+Control de admisión del login (token bucket).
+
+Cada POST a ``/auth/login`` consume una ficha del bucket de su IP y otra
+del bucket del email. Los buckets se rellenan de forma continua: con
+``LOGIN_RATE_IP = "20/60"`` una IP puede intentar 20 veces seguidas y
+después una vez cada 3 segundos. Si no quedan fichas se responde 429 con
+``Retry-After`` antes de consultar SQL Server o calcular hashes, así que
+una ráfaga de credential stuffing no llega a la base ni al pool de
+utils.passwords. Un login correcto devuelve las fichas de su email.
+
+``LOGIN_RATE_BACKEND``:
+
+- ``local`` (por defecto): buckets en memoria de cada proceso. Con N
+  workers el límite efectivo por IP es hasta N veces el configurado.
+- ``shared``: buckets en el nivel compartido de utils.shared_cache
+  (``CACHE_BACKEND`` filesystem o redis), comunes a todos los workers.
+  La actualización no es atómica entre procesos: en ráfagas simultáneas
+  pueden pasar unos pocos intentos de más.
+
+Detrás de un proxy inverso, ``LOGIN_RATE_TRUSTED_PROXIES`` indica cuántos
+proxies agregan ``X-Forwarded-For`` para tomar la IP real del cliente.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, request
+
+from utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(value):
+    """``"20/60"`` -> ``(20, 60.0)``: capacidad y segundos para rellenarla."""
+    capacidad, periodo = str(value).split("/", 1)
+    capacidad, periodo = int(capacidad), float(periodo)
+    if capacidad < 1 or periodo <= 0:
+        raise ValueError(f"Límite inválido: {value!r}")
+    return capacidad, periodo
+
+
+class TokenBucketLimiter:
+    """Buckets por regla (``ip``, ``email``...) y clave."""
+
+    def __init__(self, rules, store=None, max_keys=100_000):
+        self.rules = rules  # regla -> (capacidad, periodo)
+        # get / set(key, value, ttl): LRU local o nivel compartido
+        self.store = store if store is not None else LRUCache(max_entries=max_keys)
+        self.admitted = 0
+        self.rejected = Counter()  # regla -> intentos rechazados
+        self._lock = threading.Lock()
+
+    def _key(self, rule, key):
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        return f"login:{rule}:{digest}"
+
+    def _take(self, rule, key, now):
+        """Consumir una ficha; devuelve 0 o los segundos hasta la próxima."""
+        capacidad, periodo = self.rules[rule]
+        tasa = capacidad / periodo
+        k = self._key(rule, key)
+        try:
+            estado = self.store.get(k)
+        except Exception as e:
+            logger.warning(f"⚠️ Límite de login sin almacenamiento, se admite: {e}")
+            return 0
+        fichas, desde = estado or (capacidad, now)
+        fichas = min(capacidad, fichas + (now - desde) * tasa)
+        if fichas < 1:
+            return (1 - fichas) / tasa
+        try:
+            # Sin actividad el bucket se llena en ``periodo``: no hace falta guardarlo más
+            self.store.set(k, (fichas - 1, now), periodo)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo guardar el límite de login: {e}")
+        return 0
+
+    def hit(self, **keys):
+        """``(admitido, segundos_de_espera)``; las reglas se evalúan en orden."""
+        now = time.time()
+        with self._lock:
+            for rule, key in keys.items():
+                if key is None or rule not in self.rules:
+                    continue
+                espera = self._take(rule, key, now)
+                if espera:
+                    self.rejected[rule] += 1
+                    return False, espera
+            self.admitted += 1
+        return True, 0
+
+    def reset(self, rule, key):
+        """Devolver todas las fichas de ``key`` (p. ej. tras un login correcto)."""
+        try:
+            self.store.delete(self._key(rule, key))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo reiniciar el límite de login: {e}")
+
+
+def client_ip():
+    """IP del cliente, saltando ``LOGIN_RATE_TRUSTED_PROXIES`` proxies."""
+    proxies = current_app.config.get("LOGIN_RATE_TRUSTED_PROXIES", 0)
+    if proxies and request.headers.get("X-Forwarded-For"):
+        ruta = request.access_route
+        return ruta[-proxies] if len(ruta) >= proxies else ruta[0]
+    return request.remote_addr
+
+
+def init_app(app):
+    """Registrar el limitador del login."""
+    app.config.setdefault("LOGIN_RATE_LIMIT_ENABLED", True)
+    app.config.setdefault("LOGIN_RATE_IP", "20/60")
+    app.config.setdefault("LOGIN_RATE_EMAIL", "5/300")
+    app.config.setdefault("LOGIN_RATE_BACKEND", "local")
+    app.config.setdefault("LOGIN_RATE_TRUSTED_PROXIES", 0)
+
+    if not app.config["LOGIN_RATE_LIMIT_ENABLED"]:
+        return
+
+    store = None
+    if app.config["LOGIN_RATE_BACKEND"] == "shared":
+        manager = app.extensions.get("cache_manager")
+        store = manager.shared if manager is not None else None
+        if store is None:
+            logger.warning("⚠️ LOGIN_RATE_BACKEND=shared sin caché compartida; se usa memoria local")
+
+    app.extensions["login_limiter"] = TokenBucketLimiter(
+        {
+            "ip": parse_rate(app.config["LOGIN_RATE_IP"]),
+            "email": parse_rate(app.config["LOGIN_RATE_EMAIL"]),
+        },
+        store=store,
+    )
+
+
+def get_login_limiter():
+    """Limitador del login de la app actual (None si está desactivado)."""
+    return current_app.extensions.get("login_limiter")
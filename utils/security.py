@@ -1,5 +1,6 @@
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from utils.users import session_user_active
 
 def login_required(f):
     @wraps(f)
@@ -19,6 +20,10 @@ def admin_required(f):
         if not session.get('es_administrador'):
             flash('No tienes permisos de administrador para acceder a esta página.', 'danger')
             return redirect(url_for('client.dashboard'))
+        if not session_user_active(is_admin=True):
+            session.clear()
+            flash('Tu cuenta ya no tiene acceso de administrador.', 'warning')
+            return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -31,5 +36,9 @@ def client_required(f):
         if session.get('es_administrador'):
             flash('Esta área es exclusiva para clientes.', 'info')
             return redirect(url_for('admin.dashboard'))
+        if not session_user_active(is_admin=False):
+            session.clear()
+            flash('Tu cuenta ya no está activa.', 'warning')
+            return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return decorated_function
\ No newline at end of file
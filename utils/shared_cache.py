@@ -0,0 +1,542 @@
+"""
+Caché en dos niveles y mensajes de invalidación entre procesos.
+
+Con varios workers (gunicorn) cada proceso tiene su propio índice de
+inventario, resumen del dashboard y cachés; sin coordinación, una edición
+en un worker no se ve en los demás hasta que expiran. Este módulo añade:
+
+- ``TieredCache``: un LRU en memoria (utils.cache.LRUCache) delante de
+  un nivel compartido. Lo usan el snapshot del dashboard y la caché de
+  fragmentos. Borrar una clave la borra del nivel compartido y avisa a
+  los demás procesos para que la quiten de su LRU.
+- Un bus de eventos: utils.inventory y utils.dashboard publican cada
+  cambio (``vehicle_changed(5)``, ``invalidate``...) y los demás workers
+  lo aplican sobre su propio estado.
+
+``CACHE_BACKEND`` elige el nivel compartido:
+
+- ``local`` (por defecto): sin nivel compartido ni bus; un solo proceso.
+- ``filesystem``: archivos en ``CACHE_DIR`` (mismo servidor). Los eventos
+  se agregan a ``CACHE_DIR/events.log`` y cada worker lee los nuevos al
+  empezar cada petición (un ``stat`` por petición; ``/health`` y
+  ``/ready`` no los leen), así que la edición ya se ve en la siguiente
+  petición atendida por cualquier worker.
+- ``redis``: un servidor compatible con Redis (``CACHE_REDIS_URL``,
+  también ``unix:///ruta/redis.sock``); requiere ``pip install redis``.
+  Los eventos van por un stream que lee un hilo de cada worker.
+
+Los valores se guardan con pickle: el directorio o el servidor deben ser
+de confianza (sólo accesibles por la app).
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import pickle
+import random
+import threading
+import time
+import uuid
+
+from flask import current_app, request
+
+from utils.cache import LRUCache
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - depende del entorno
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# mtime de las entradas sin expiración (los archivos usan mtime = expira_en)
+_NEVER = 2 ** 31 - 1
+
+
+# -------------------------------------------------------------------
+# Nivel compartido
+# -------------------------------------------------------------------
+class FileSystemStore:
+    """Entradas en archivos; el mtime de cada archivo es su expiración."""
+
+    def __init__(self, directory, sweep_every=500):
+        self.directory = os.path.join(directory, "data")
+        self.sweep_every = sweep_every
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if os.stat(path).st_mtime < time.time():
+                return None
+            with open(path, "rb") as fh:
+                return pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _write_tmp(self, path, value, ttl):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        expira = time.time() + ttl if ttl else _NEVER
+        os.utime(tmp, (expira, expira))
+        return tmp
+
+    def set(self, key, value, ttl=None):
+        path = self._path(key)
+        tmp = self._write_tmp(path, value, ttl)
+        os.replace(tmp, path)  # atómico: otro worker nunca lee un archivo a medias
+        if random.randrange(self.sweep_every) == 0:
+            self.sweep()
+
+    def add(self, key, value, ttl=None):
+        """Crear la entrada sólo si no existe (o expiró); atómico entre procesos."""
+        path = self._path(key)
+        tmp = self._write_tmp(path, value, ttl)
+        try:
+            for _ in range(2):
+                try:
+                    os.link(tmp, path)  # falla si ya existe: sólo un proceso gana
+                    return True
+                except FileExistsError:
+                    try:
+                        if os.stat(path).st_mtime >= time.time():
+                            return False
+                        os.remove(path)  # expirada: se reemplaza
+                    except FileNotFoundError:
+                        pass
+            return False
+        finally:
+            os.remove(tmp)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self):
+        """Borrar entradas expiradas (se llama de vez en cuando desde set)."""
+        ahora = time.time()
+        for carpeta in os.scandir(self.directory):
+            if not carpeta.is_dir():
+                continue
+            for entrada in os.scandir(carpeta.path):
+                try:
+                    if entrada.stat().st_mtime < ahora:
+                        os.remove(entrada.path)
+                except OSError:
+                    pass
+
+
+class RedisStore:
+    """Entradas en Redis (o un servidor compatible) con expiración nativa."""
+
+    def __init__(self, client, prefix="rusteze"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(f"{self.prefix}:{key}")
+        return None if data is None else pickle.loads(data)
+
+    def set(self, key, value, ttl=None):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self.client.set(f"{self.prefix}:{key}", data, ex=math.ceil(ttl) if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        return bool(
+            self.client.set(f"{self.prefix}:{key}", data, ex=math.ceil(ttl) if ttl else None, nx=True)
+        )
+
+    def delete(self, key):
+        self.client.delete(f"{self.prefix}:{key}")
+
+
+# -------------------------------------------------------------------
+# Bus de eventos
+# -------------------------------------------------------------------
+class _Bus:
+    """Base: suscripciones y despacho. ``publish`` sólo avisa a los otros procesos."""
+
+    # Más eventos de un tema en una sola lectura: se pide un reinicio completo
+    MAX_EVENTS_PER_TOPIC = 200
+
+    def __init__(self):
+        self._handlers = {}  # tema -> (handler(*args), reset())
+        self._token = uuid.uuid4().hex[:8]
+
+    @property
+    def origin(self):
+        # Incluye el pid: tras un fork (preload) cada worker es otro origen
+        return f"{os.getpid()}:{self._token}"
+
+    def subscribe(self, topic, handler, reset=None):
+        """
+        ``handler(*args)`` se llama por cada evento de ``topic`` publicado
+        por otro proceso; ``reset()`` cuando pudieron perderse eventos.
+        """
+        self._handlers[topic] = (handler, reset)
+
+    def _encode(self, topic, args):
+        return json.dumps({"o": self.origin, "t": topic, "a": list(args)})
+
+    def _dispatch(self, mensajes):
+        propio = self.origin
+        por_tema = {}
+        for raw in mensajes:
+            try:
+                mensaje = json.loads(raw)
+            except ValueError:
+                continue
+            if mensaje.get("o") != propio:
+                por_tema.setdefault(mensaje.get("t"), []).append(mensaje.get("a") or [])
+
+        for topic, eventos in por_tema.items():
+            if topic not in self._handlers:
+                continue
+            handler, reset = self._handlers[topic]
+            try:
+                if reset is not None and len(eventos) > self.MAX_EVENTS_PER_TOPIC:
+                    reset()
+                    continue
+                for args in eventos:
+                    handler(*args)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo aplicar un evento de '{topic}': {e}")
+
+    def _reset_all(self):
+        for topic, (_, reset) in self._handlers.items():
+            if reset is not None:
+                try:
+                    reset()
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo reiniciar '{topic}': {e}")
+
+    def poll(self):
+        """Aplicar eventos pendientes (se llama al inicio de cada petición)."""
+
+
+class FileSystemBus(_Bus):
+    """Eventos como líneas JSON agregadas a un archivo compartido."""
+
+    def __init__(self, directory, max_size=1 << 20):
+        super().__init__()
+        self.path = os.path.join(directory, "events.log")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Sólo interesan los eventos posteriores al arranque
+        os.close(os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644))
+        stat = os.stat(self.path)
+        self._inode, self._offset = stat.st_ino, stat.st_size
+
+    def publish(self, topic, *args):
+        linea = (self._encode(topic, args) + "\n").encode("utf-8")
+        try:
+            if os.path.getsize(self.path) > self.max_size:
+                # Rotación: quien lea el archivo viejo a medias hará un reset
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
+        # O_APPEND + una sola escritura corta: las líneas no se mezclan entre procesos
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, linea)
+        finally:
+            os.close(fd)
+
+    def poll(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino == self._inode and stat.st_size == self._offset:
+            return  # camino habitual: nada nuevo
+
+        with self._lock:
+            try:
+                stat = os.stat(self.path)  # otro hilo pudo adelantarse
+                if stat.st_ino != self._inode or stat.st_size < self._offset:
+                    # Otro proceso rotó el archivo: pudieron perderse eventos
+                    self._offset = 0
+                    self._reset_all()
+                self._inode = stat.st_ino
+                with open(self.path, "rb") as fh:
+                    fh.seek(self._offset)
+                    data = fh.read()
+            except FileNotFoundError:
+                return  # en plena rotación; se lee en la próxima petición
+            fin = data.rfind(b"\n") + 1  # una línea a medio escribir se lee luego
+            if not fin:
+                return
+            self._offset += fin
+        self._dispatch(data[:fin].decode("utf-8").splitlines())
+
+
+class RedisBus(_Bus):
+    """Eventos en un stream de Redis, leídos por un hilo de cada worker."""
+
+    def __init__(self, client, app, stream="rusteze:events", max_len=10000):
+        super().__init__()
+        self.client = client
+        self.app = app
+        self.stream = stream
+        self.max_len = max_len
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def publish(self, topic, *args):
+        self.client.xadd(
+            self.stream, {"m": self._encode(topic, args)},
+            maxlen=self.max_len, approximate=True,
+        )
+
+    def poll(self):
+        # El hilo se crea en el proceso que lo usa (seguro tras fork en workers)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="cache-bus", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        ultimo = "$"
+        while True:
+            try:
+                respuesta = self.client.xread({self.stream: ultimo}, block=1000, count=500)
+            except Exception as e:
+                logger.warning(f"⚠️ Bus de caché sin conexión a Redis: {e}")
+                time.sleep(1.0)
+                if ultimo != "$":
+                    ultimo = "$"
+                    with self.app.app_context():
+                        self._reset_all()
+                continue
+            for _, entradas in respuesta or ():
+                ultimo = entradas[-1][0]
+                mensajes = [campos.get(b"m", b"").decode("utf-8") for _, campos in entradas]
+                with self.app.app_context():
+                    self._dispatch(mensajes)
+
+
+# -------------------------------------------------------------------
+# Caché en dos niveles
+# -------------------------------------------------------------------
+class TieredCache:
+    """
+    LRU del proceso delante del nivel compartido (si lo hay).
+
+    Las copias locales duran como mucho ``local_ttl`` segundos; un
+    ``delete`` se propaga a los LRU de los demás procesos por el bus.
+    """
+
+    def __init__(self, namespace, local, shared=None, bus=None, default_ttl=None, local_ttl=None):
+        self.namespace = namespace
+        self.local = local
+        self.shared = shared
+        self.bus = bus
+        self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.hits = 0
+        self.misses = 0
+        if bus is not None:
+            bus.subscribe(f"cache:{namespace}", self._drop_local, reset=self.local.clear)
+
+    def _key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _drop_local(self, *keys):
+        # Un evento del bus trae una clave (delete) o varias (delete_many)
+        self.local.delete_many(keys)
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is _MISSING and self.shared is not None:
+            try:
+                value = self.shared.get(self._key(key))
+            except Exception as e:
+                logger.warning(f"⚠️ Caché compartida no disponible: {e}")
+                value = None
+            if value is None:
+                value = _MISSING
+            else:
+                self.local.set(key, value, self.local_ttl)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        local_ttl = min(filter(None, (ttl, self.local_ttl)), default=None)
+        self.local.set(key, value, local_ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(self._key(key), value, ttl)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo guardar en la caché compartida: {e}")
+
+    def add(self, key, value, ttl=None):
+        """
+        Guardar sólo si ningún proceso guardó antes la clave; True si se
+        guardó. Sirve como candado de corta duración (ver client.purchases).
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if self.shared is None:
+            return self.local.add(key, value, ttl)
+        try:
+            added = self.shared.add(self._key(key), value, ttl)
+        except Exception as e:
+            logger.warning(f"⚠️ Caché compartida no disponible: {e}")
+            return self.local.add(key, value, ttl)
+        if added:
+            self.local.set(key, value, min(filter(None, (ttl, self.local_ttl)), default=None))
+        return added
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(self._key(key))
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo borrar de la caché compartida: {e}")
+        if self.bus is not None:
+            try:
+                self.bus.publish(f"cache:{self.namespace}", key)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo avisar el borrado a otros procesos: {e}")
+
+    def delete_many(self, keys):
+        """Como ``delete`` para varias claves, con un solo aviso por el bus."""
+        keys = list(keys)
+        if not keys:
+            return
+        self.local.delete_many(keys)
+        if self.shared is not None:
+            try:
+                for key in keys:
+                    self.shared.delete(self._key(key))
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo borrar de la caché compartida: {e}")
+        if self.bus is not None:
+            try:
+                self.bus.publish(f"cache:{self.namespace}", *keys)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo avisar el borrado a otros procesos: {e}")
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Devolver el valor cacheado o calcularlo con ``factory()``."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def __len__(self):
+        return len(self.local)
+
+
+class CacheManager:
+    """Nivel compartido y bus configurados; crea las cachés de cada módulo."""
+
+    def __init__(self, backend="local", shared=None, bus=None, local_ttl=None):
+        self.backend = backend
+        self.shared = shared
+        self.bus = bus
+        self.local_ttl = local_ttl
+
+    def cache(self, namespace, max_entries=1024, default_ttl=None):
+        return TieredCache(
+            namespace,
+            LRUCache(max_entries=max_entries),
+            shared=self.shared,
+            bus=self.bus,
+            default_ttl=default_ttl,
+            local_ttl=self.local_ttl,
+        )
+
+    def publish(self, topic, *args):
+        """Avisar de un cambio a los demás procesos (no-op sin bus)."""
+        if self.bus is None:
+            return
+        try:
+            self.bus.publish(topic, *args)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo publicar el evento '{topic}': {e}")
+
+    def subscribe(self, topic, handler, reset=None):
+        if self.bus is not None:
+            self.bus.subscribe(topic, handler, reset)
+
+
+def _build(app):
+    backend = app.config["CACHE_BACKEND"]
+    local_ttl = app.config["CACHE_LOCAL_TTL"]
+    if backend == "filesystem":
+        directory = app.config["CACHE_DIR"]
+        return CacheManager(
+            backend, FileSystemStore(directory), FileSystemBus(directory), local_ttl
+        )
+    if backend == "redis":
+        if redis is None:
+            raise RuntimeError("CACHE_BACKEND=redis requiere el paquete redis (pip install redis)")
+        client = redis.Redis.from_url(app.config["CACHE_REDIS_URL"])
+        prefix = app.config["CACHE_PREFIX"]
+        return CacheManager(
+            backend,
+            RedisStore(client, prefix),
+            RedisBus(client, app, stream=f"{prefix}:events"),
+            local_ttl,
+        )
+    if backend != "local":
+        raise ValueError(f"CACHE_BACKEND desconocido: {backend!r}")
+    return CacheManager(backend)
+
+
+# Endpoints de utils.health
+SKIP_POLL_ENDPOINTS = frozenset({"liveness", "readiness"})
+
+
+def init_app(app):
+    """Configurar la caché compartida y el bus de invalidación."""
+    app.config.setdefault("CACHE_BACKEND", "local")
+    if not app.config.get("CACHE_DIR"):
+        app.config["CACHE_DIR"] = os.path.join(app.instance_path, "shared-cache")
+    app.config.setdefault("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    app.config.setdefault("CACHE_PREFIX", "rusteze")
+    app.config.setdefault("CACHE_LOCAL_TTL", 60)
+
+    manager = _build(app)
+    app.extensions["cache_manager"] = manager
+    if manager.bus is not None:
+        bus = manager.bus
+
+        def poll_events():
+            # Los sondeos de salud no aplican eventos: un refresco del
+            # inventario consultaría SQL Server desde /health
+            if request.endpoint not in SKIP_POLL_ENDPOINTS:
+                bus.poll()
+
+        app.before_request(poll_events)
+        logger.info(f"🔁 Caché compartida: {manager.backend}")
+
+
+def get_cache_manager():
+    """Caché compartida de la app actual."""
+    return current_app.extensions["cache_manager"]
@@ -0,0 +1,99 @@
+"""
+Caché de los registros de usuario de la sesión.
+
+``User.get_by_id``, el perfil del cliente y las verificaciones de rol
+(``admin_required``, el filtro del blueprint de clientes) leen aquí el
+registro de Clientes/Empleados por ``(rol, id)`` en lugar de consultarlo
+en cada petición. Se llena al iniciar sesión y las rutas de admin que
+editan o desactivan clientes y empleados lo invalidan (en todos los
+workers si hay caché compartida, ver utils.shared_cache).
+
+Los registros duran ``USER_CACHE_TTL`` segundos: un cambio hecho fuera
+de la app (o una desactivación directa en SQL Server) se nota a más
+tardar en ese plazo. También se cachea "no existe o está inactivo", así
+que una sesión de un usuario dado de baja no vuelve a consultar la base
+en cada petición.
+"""
+
+import logging
+
+from flask import current_app, session
+
+from utils.cache import LRUCache
+from utils.database import User
+
+logger = logging.getLogger(__name__)
+
+FIELDS = {
+    True: ("empleado_id", "nombre_completo", "email", "puesto", "es_administrador"),
+    False: ("cliente_id", "nombre_completo", "email", "telefono", "direccion", "fecha_registro"),
+}
+
+# Marca de "no existe o está inactivo" (None es "no está en la caché")
+_INACTIVE = False
+
+
+class UserCache:
+    """Registros de usuario por ``(rol, id)`` con TTL corto."""
+
+    def __init__(self, store, loader, ttl=60):
+        self.store = store  # get / set / delete / delete_many
+        self.loader = loader  # fn(user_id, is_admin) -> dict | None
+        self.ttl = ttl
+
+    def _key(self, is_admin, user_id):
+        return f"{'admin' if is_admin else 'client'}:{user_id}"
+
+    def get(self, is_admin, user_id):
+        """Registro activo del usuario o None; va a SQL Server sólo si no está cacheado."""
+        valor = self.store.get(self._key(is_admin, user_id))
+        if valor is None:
+            fila = self.loader(user_id, is_admin)
+            valor = {k: fila.get(k) for k in FIELDS[is_admin]} if fila else _INACTIVE
+            self.store.set(self._key(is_admin, user_id), valor, self.ttl)
+        # Copia: quien lo use puede modificarlo sin tocar la caché
+        return dict(valor) if valor else None
+
+    def put(self, is_admin, user_id, fila):
+        """Guardar el registro recién leído (p. ej. al iniciar sesión)."""
+        valor = {k: fila.get(k) for k in FIELDS[is_admin]}
+        self.store.set(self._key(is_admin, user_id), valor, self.ttl)
+
+    def invalidate(self, is_admin, user_id):
+        self.store.delete(self._key(is_admin, user_id))
+
+    def invalidate_many(self, is_admin, user_ids):
+        """Invalidar varios usuarios (acciones masivas) con un solo aviso a los workers."""
+        self.store.delete_many([self._key(is_admin, user_id) for user_id in user_ids])
+
+
+def session_user_active(is_admin):
+    """
+    False si el usuario de la sesión fue desactivado (o dejó de ser
+    administrador). Si la base no responde se da por activo: una caída de
+    SQL Server no debe cerrar todas las sesiones.
+    """
+    try:
+        user = get_user_cache().get(is_admin, session["user_id"])
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo verificar el usuario de la sesión: {e}")
+        return True
+    return user is not None and (not is_admin or bool(user.get("es_administrador")))
+
+
+def init_app(app):
+    """Registrar la caché de usuarios."""
+    app.config.setdefault("USER_CACHE_TTL", 60)
+    manager = app.extensions.get("cache_manager")
+    if manager is not None:
+        store = manager.cache("usuarios", max_entries=10_000)
+    else:
+        store = LRUCache(max_entries=10_000)
+    app.extensions["user_cache"] = UserCache(
+        store, User.load_by_id, ttl=app.config["USER_CACHE_TTL"]
+    )
+
+
+def get_user_cache():
+    """Caché de usuarios de la app actual."""
+    return current_app.extensions["user_cache"]
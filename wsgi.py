@@ -0,0 +1,11 @@
+"""
+Punto de entrada WSGI para producción.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+``app.py`` sigue siendo el servidor de desarrollo (``python app.py``).
+"""
+
+from app import create_app
+
+app = create_app()